@@ -30,6 +30,7 @@ class RiverApp(AppConfig):
         if isinstance(callback_backend, DatabaseHookingBackend):
             try:
                 self.get_model('Callback').objects.exists()
+                callback_backend.flush()
                 callback_backend.initialize_callbacks()
             except (OperationalError, ProgrammingError):
                 pass
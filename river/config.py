@@ -18,10 +18,18 @@ class RiverConfig(object):
         self.PERMISSION_CLASS = getattr(settings, self.get_with_prefix('PERMISSION_CLASS'), Permission)
         self.GROUP_CLASS = getattr(settings, self.get_with_prefix('GROUP_CLASS'), Group)
         self.HOOKING_BACKEND = getattr(settings, self.get_with_prefix('HOOKING_BACKEND'), {'backend': 'river.hooking.backends.database.DatabaseHookingBackend'})
+        self.CACHE_ALIAS = getattr(settings, self.get_with_prefix('CACHE_ALIAS'), 'default')
+        self.WORKFLOW_GRAPH_TTL = getattr(settings, self.get_with_prefix('WORKFLOW_GRAPH_TTL'), 5)
+        self.OBJECT_ID_TYPE = getattr(settings, self.get_with_prefix('OBJECT_ID_TYPE'), 'char')
+        self.INBOX_ENABLED = getattr(settings, self.get_with_prefix('INBOX_ENABLED'), False)
+        self.HOOK_METRICS_ENABLED = getattr(settings, self.get_with_prefix('HOOK_METRICS_ENABLED'), False)
+        self.SLOW_HOOK_THRESHOLD = getattr(settings, self.get_with_prefix('SLOW_HOOK_THRESHOLD'), None)
 
         # Generated
         self.HOOKING_BACKEND_CLASS = self.HOOKING_BACKEND.get('backend')
         self.HOOKING_BACKEND_CONFIG = self.HOOKING_BACKEND.get('config', {})
+        self.HOOKING_EXECUTOR_CLASS = self.HOOKING_BACKEND.get('executor', 'river.hooking.executors.HookingExecutor')
+        self.HOOKING_EXECUTOR_CONFIG = self.HOOKING_BACKEND.get('executor_config', {})
 
 
 app_config = RiverConfig()
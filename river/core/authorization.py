@@ -0,0 +1,81 @@
+from django.contrib import auth
+from django.db.models import Exists, OuterRef, Q
+
+from river.models import TransitionApproval
+
+__author__ = 'ahmetdal'
+
+AUTHORIZATION_CACHE_ATTRIBUTE = '_river_authorization_cache'
+
+
+def get_authorization(as_user):
+    """
+    Resolves the permissions and the groups of the given user into their ids. Permission ids are ``None`` for
+    active superusers since they hold every permission. The result is cached on the user object the same way
+    Django caches the permissions of a user.
+    """
+    if not hasattr(as_user, AUTHORIZATION_CACHE_ATTRIBUTE):
+        if getattr(as_user, 'is_active', False) and getattr(as_user, 'is_superuser', False):
+            permission_ids = None
+        else:
+            permissions = set()
+            for backend in auth.get_backends():
+                if hasattr(backend, 'get_all_permissions'):
+                    permissions.update(backend.get_all_permissions(as_user))
+            permission_ids = _get_permission_ids(permissions)
+
+        group_ids = set(as_user.groups.values_list('pk', flat=True))
+        setattr(as_user, AUTHORIZATION_CACHE_ATTRIBUTE, (permission_ids, group_ids))
+    return getattr(as_user, AUTHORIZATION_CACHE_ATTRIBUTE)
+
+
+def authorize(approvals, as_user):
+    """
+    Narrows down the given transition approvals to the ones that the user is authorized for. Permissions and
+    groups are matched by their ids with EXISTS sub queries so that the size of the query does not depend on
+    how many permissions the user has.
+    """
+    permission_ids, group_ids = get_authorization(as_user)
+    approvals = approvals.filter(Q(transactioner__isnull=True) | Q(transactioner=as_user))
+    if permission_ids is not None:
+        approvals = _authorize_by(approvals, TransitionApproval.permissions, 'permission', permission_ids)
+    return _authorize_by(approvals, TransitionApproval.groups, 'group', group_ids)
+
+
+def authorize_inbox(entries, as_user):
+    """
+    Narrows down the given inbox entries to the ones that the user is entitled to. Since there is an entry for
+    each permission and group combination of an approval, matching a single entry is enough.
+    """
+    permission_ids, group_ids = get_authorization(as_user)
+    entries = entries.filter(Q(user__isnull=True) | Q(user=as_user)).filter(Q(group__isnull=True) | Q(group__in=group_ids))
+    if permission_ids is not None:
+        entries = entries.filter(Q(permission__isnull=True) | Q(permission__in=permission_ids))
+    return entries
+
+
+def _authorize_by(approvals, many_to_many, name, ids):
+    field = many_to_many.field
+    source, target = field.m2m_field_name(), field.m2m_reverse_field_name()
+    through = many_to_many.through.objects
+
+    approvals = approvals.annotate(**{'requires_%s' % name: Exists(through.filter(**{source: OuterRef('pk')}))})
+    if not ids:
+        return approvals.filter(**{'requires_%s' % name: False})
+
+    return approvals.annotate(
+        **{'authorized_by_%s' % name: Exists(through.filter(**{source: OuterRef('pk'), target + '__in': ids}))}
+    ).filter(Q(**{'requires_%s' % name: False}) | Q(**{'authorized_by_%s' % name: True}))
+
+
+def _get_permission_ids(permissions):
+    if not permissions:
+        return set()
+
+    codenames = set(permission.split('.', 1)[1] for permission in permissions)
+    return set(
+        pk for pk, app_label, codename in TransitionApproval.permissions.field.related_model.objects.filter(
+            codename__in=codenames
+        ).values_list('pk', 'content_type__app_label', 'codename')
+        if '%s.%s' % (app_label, codename) in permissions
+    )
@@ -1,12 +1,32 @@
-from django.contrib import auth
+import operator
+from functools import reduce
+
+try:
+    from contextlib import ExitStack
+except ImportError:  # pragma: no cover
+    from contextlib2 import ExitStack
+
 from django.contrib.contenttypes.models import ContentType
-from django.db.models import F, Q, IntegerField, Min
-from django.db.models.functions import Cast
+from django.db import transaction
+from django.db.models import F, IntegerField, Min, Case, When, Value, Q
+from django.utils import timezone
 from django_cte import With
 
-from river.hooking.completed import PostCompletedHooking, PreCompletedHooking
-from river.hooking.transition import PostTransitionHooking, PreTransitionHooking
-from river.models import State, TransitionApprovalMeta, TransitionApproval, PENDING, Workflow
+from river.config import app_config
+from river.core.authorization import authorize, authorize_inbox
+from river.core.workflowgraph import workflow_graph_registry
+from river.hooking.backends.loader import callback_backend
+from river.hooking.completed import PostCompletedHooking, PreCompletedHooking, PostCompletedBatchHooking
+from river.hooking.transition import PostTransitionHooking, PreTransitionHooking, PostTransitionBatchHooking
+from river.models import State, TransitionApproval, TransitionApprovalHistory, InboxEntry, PENDING, APPROVED
+from river.models.fields.objectid import to_object_id, object_id_expression
+from river.signals import ApproveSignal, TransitionSignal, OnCompleteSignal
+from river.utils.bulk import batches, bulk_add
+from river.utils.error_code import ErrorCode
+from river.utils.exceptions import RiverException
+
+# The hookings whose callbacks can be registered for specific workflow objects.
+OBJECT_HOOKINGS = [PreTransitionHooking, PostTransitionHooking, PreCompletedHooking, PostCompletedHooking]
 
 
 class ClassWorkflowObject(object):
@@ -15,19 +35,233 @@ class ClassWorkflowObject(object):
         self.wokflow_object_class = wokflow_object_class
         self.name = name
         self.field_name = field_name
-        self._cached_workflow = None
+
+    @property
+    def graph(self):
+        return workflow_graph_registry.get(self._content_type, self.field_name)
 
     @property
     def workflow(self):
-        if not self._cached_workflow:
-            self._cached_workflow = Workflow.objects.filter(field_name=self.field_name, content_type=self._content_type).first()
-        return self._cached_workflow
+        graph = self.graph
+        return graph.workflow if graph else None
+
+    def initialize_approvals(self, workflow_objects, batch_size=1000):
+        initial_state = self.initial_state
+        number_of_initialized = 0
+        for workflow_object_ids in batches(workflow_objects, batch_size):
+            with transaction.atomic():
+                if initial_state:
+                    self.wokflow_object_class.objects.filter(pk__in=workflow_object_ids, **{self.field_name: None}).update(**{self.field_name: initial_state})
+                number_of_initialized += self._initialize_approvals(workflow_object_ids)
+        return number_of_initialized
+
+    def _initialize_approvals(self, workflow_object_ids):
+        graph = self.graph
+        if not graph or not graph.reachable_metas:
+            return 0
+
+        content_type = self._content_type
+        initialized_object_ids = set(
+            TransitionApproval.objects.filter(
+                workflow=graph.workflow, content_type=content_type, object_id__in=workflow_object_ids
+            ).values_list('object_id', flat=True).distinct()
+        )
+        object_ids = [to_object_id(pk) for pk in workflow_object_ids if to_object_id(pk) not in initialized_object_ids]
+        if not object_ids:
+            return 0
+
+        approvals = TransitionApproval.objects.bulk_create([
+            TransitionApproval(
+                content_type=content_type,
+                object_id=object_id,
+                workflow=graph.workflow,
+                meta=meta,
+                source_state_id=meta.source_state_id,
+                destination_state_id=meta.destination_state_id,
+                priority=meta.priority,
+                status=PENDING
+            )
+            for object_id in object_ids for meta in graph.reachable_metas
+        ])
+        if any(approval.pk is None for approval in approvals):
+            approval_ids = {
+                (object_id, meta_id): pk for pk, object_id, meta_id in TransitionApproval.objects.filter(
+                    workflow=graph.workflow, content_type=content_type, object_id__in=object_ids
+                ).values_list('pk', 'object_id', 'meta_id')
+            }
+            for approval in approvals:
+                approval.pk = approval_ids[(approval.object_id, approval.meta_id)]
+
+        bulk_add(TransitionApproval.permissions, [(approval.pk, permission_id) for approval in approvals for permission_id in graph.permissions[approval.meta_id]])
+        bulk_add(TransitionApproval.groups, [(approval.pk, group_id) for approval in approvals for group_id in graph.groups[approval.meta_id]])
+        InboxEntry.objects.refresh(graph.workflow, object_ids)
+        return len(object_ids)
+
+    @transaction.atomic
+    def approve_many(self, workflow_objects, as_user, next_state=None, save=False):
+        """
+        Approves the next approvals of the given workflow objects at once. Only the state fields of the transitioned
+        ones are updated, in bulk, so the save signals of the model are not sent for them. They are saved one by one
+        like ``approve`` does when ``save`` is given.
+        """
+        workflow_objects = list(workflow_objects)
+        approvals, errors = {}, {}
+
+        available_approvals = {}
+        for approval in self.get_available_approvals(as_user).filter(
+                object_id__in=[workflow_object.pk for workflow_object in workflow_objects]
+        ).select_related('source_state', 'destination_state').order_by('pk'):
+            available_approvals.setdefault(approval.object_id, []).append(approval)
+
+        for workflow_object in workflow_objects:
+            try:
+                approvals[workflow_object] = self._pick_approval(available_approvals.get(to_object_id(workflow_object), []), next_state)
+            except RiverException as e:
+                errors[workflow_object] = e
+
+        if approvals:
+            self._approve_all(approvals, as_user, save)
+        return approvals, errors
+
+    @staticmethod
+    def _pick_approval(available_approvals, next_state):
+        if not available_approvals:
+            raise RiverException(ErrorCode.NO_AVAILABLE_NEXT_STATE_FOR_USER, "There is no available approval for the user.")
+        elif next_state:
+            approvals = [approval for approval in available_approvals if approval.destination_state_id == next_state.pk]
+            if not approvals:
+                available_states = []
+                for approval in available_approvals:
+                    if approval.destination_state not in available_states:
+                        available_states.append(approval.destination_state)
+                raise RiverException(ErrorCode.INVALID_NEXT_STATE_FOR_USER, "Invalid state is given(%s). Valid states is(are) %s" % (
+                    next_state.__str__(), ','.join([ast.__str__() for ast in available_states])))
+            return approvals[0]
+        elif len(available_approvals) > 1:
+            raise RiverException(ErrorCode.NEXT_STATE_IS_REQUIRED, "State must be given when there are multiple states for destination")
+        return available_approvals[0]
+
+    def _approve_all(self, approvals, as_user, save):
+        graph = self.graph
+        content_type = self._content_type
+        object_ids = [to_object_id(workflow_object) for workflow_object in approvals]
+
+        recent_approvals = {}
+        for object_id, approval_id in TransitionApproval.objects.filter(
+                content_type=content_type, object_id__in=object_ids, transaction_date__isnull=False
+        ).order_by('transaction_date').values_list('object_id', 'pk'):
+            recent_approvals[object_id] = approval_id
+
+        transaction_date = timezone.now()
+        for workflow_object, approval in approvals.items():
+            approval.status = APPROVED
+            approval.transactioner = as_user
+            approval.transaction_date = transaction_date
+            approval.previous_id = recent_approvals.get(to_object_id(workflow_object))
+
+        TransitionApproval.objects.filter(pk__in=[approval.pk for approval in approvals.values()]).update(
+            status=APPROVED,
+            transactioner=as_user,
+            transaction_date=transaction_date,
+            previous=Case(
+                *[When(pk=approval.pk, then=Value(approval.previous_id)) for approval in approvals.values() if approval.previous_id],
+                default=Value(None),
+                output_field=IntegerField()
+            )
+        )
+
+        pending_transitions = set(TransitionApproval.objects.filter(
+            workflow=graph.workflow, content_type=content_type, object_id__in=object_ids, status=PENDING
+        ).values_list('object_id', 'source_state_id', 'destination_state_id'))
+
+        transitions = dict(
+            (workflow_object, approval) for workflow_object, approval in approvals.items()
+            if (approval.object_id, approval.source_state_id, approval.destination_state_id) not in pending_transitions
+        )
+
+        visited_states = set(TransitionApproval.objects.filter(
+            workflow=graph.workflow, content_type=content_type, object_id__in=[approval.object_id for approval in transitions.values()], status=APPROVED
+        ).values_list('object_id', 'source_state_id')) if transitions else set()
+
+        for workflow_object in approvals:
+            state = graph.states.get(getattr(workflow_object, self.field_name + '_id'))
+            if state:
+                setattr(workflow_object, self.field_name, state)
+
+        for workflow_object, approval in transitions.items():
+            setattr(workflow_object, self.field_name, approval.destination_state)
+        self._reset_cycles([
+            approval for approval in transitions.values()
+            if (approval.object_id, approval.destination_state_id) in visited_states
+        ])
+
+        with ExitStack() as signals:
+            for workflow_object, approval in approvals.items():
+                signals.enter_context(ApproveSignal(workflow_object, self.field_name, approval))
+                signals.enter_context(TransitionSignal(workflow_object in transitions, workflow_object, self.field_name, approval))
+                signals.enter_context(OnCompleteSignal(workflow_object, self.field_name))
+
+            if save:
+                for workflow_object in approvals:
+                    workflow_object.save()
+            else:
+                transitioned_objects = {}
+                for workflow_object, approval in transitions.items():
+                    transitioned_objects.setdefault(approval.destination_state, []).append(workflow_object.pk)
+                for destination_state, pks in transitioned_objects.items():
+                    self.wokflow_object_class.objects.filter(pk__in=pks).update(**{self.field_name: destination_state})
+            InboxEntry.objects.refresh(graph.workflow, object_ids)
+
+    def _reset_cycles(self, cycled):
+        """
+        Resets the approvals of the cycles which the given approvals have looped back to, so that they can be approved
+        again. A cycle is the strongly connected component of the destination state in the workflow graph. The
+        decisions made on the approvals are appended to their history first, so the number of the approvals of an
+        object doesn't grow with the number of the times it cycles. The given approvals themselves are kept as they
+        are, so that the latest decisions stay reachable, until their source states are entered again.
+        """
+        graph = self.graph
+        object_ids_by_cycle = {}
+        for approval in cycled:
+            if approval.destination_state_id in graph.cycles:
+                object_ids_by_cycle.setdefault(graph.cycles[approval.destination_state_id], set()).add(approval.object_id)
+        if not object_ids_by_cycle:
+            return
+
+        kept_approval_ids = [approval.pk for approval in cycled]
+        approvals = TransitionApproval.objects.filter(
+            reduce(operator.or_, [Q(object_id__in=object_ids, source_state_id__in=cycle) for cycle, object_ids in object_ids_by_cycle.items()]),
+            workflow=graph.workflow,
+            content_type=self._content_type,
+        ).exclude(pk__in=kept_approval_ids)
+        decisions = list(approvals.filter(Q(status=APPROVED) | Q(skipped=True)).values(
+            'pk', 'transactioner_id', 'transaction_date', 'status', 'skipped', 'previous_id'
+        ))
+        if not decisions:
+            return
+
+        history = [TransitionApprovalHistory(transition_approval_id=decision.pop('pk'), **decision) for decision in decisions]
+        TransitionApprovalHistory.objects.bulk_create(history)
+        TransitionApproval.objects.filter(
+            previous__in=[decision.transition_approval_id for decision in history]
+        ).exclude(pk__in=kept_approval_ids).update(previous=None)
+        approvals.update(status=PENDING, transactioner=None, transaction_date=None, previous=None, skipped=False)
 
     def get_on_approval_objects(self, as_user):
-        approvals = self.get_available_approvals(as_user)
-        object_ids = list(approvals.values_list('object_id', flat=True))
+        if app_config.INBOX_ENABLED:
+            object_ids = list(self._inbox(as_user).values_list('object_id', flat=True))
+        else:
+            object_ids = list(self.get_available_approvals(as_user).values_list('object_id', flat=True))
         return self.wokflow_object_class.objects.filter(pk__in=object_ids)
 
+    def get_inbox(self, as_user, after=None, limit=100):
+        object_ids = self._inbox(as_user)
+        if after is not None:
+            object_ids = object_ids.filter(object_id__gt=to_object_id(after))
+        object_ids = list(object_ids.values_list('object_id', flat=True).distinct().order_by('object_id')[:limit])
+        workflow_objects = dict((to_object_id(workflow_object), workflow_object) for workflow_object in self.wokflow_object_class.objects.filter(pk__in=object_ids))
+        return [workflow_objects[object_id] for object_id in object_ids if object_id in workflow_objects]
+
     def get_available_approvals(self, as_user):
         those_with_max_priority = With(
             TransitionApproval.objects.filter(
@@ -38,7 +272,7 @@ class ClassWorkflowObject(object):
         )
 
         workflow_objects = With(
-            self.wokflow_object_class.objects.all(),
+            self.wokflow_object_class.objects.annotate(river_object_id=object_id_expression()),
             name="workflow_object"
         )
 
@@ -51,25 +285,24 @@ class ClassWorkflowObject(object):
         ).with_cte(
             those_with_max_priority
         ).annotate(
-            object_id_as_int=Cast('object_id', IntegerField()),
             min_priority=those_with_max_priority.col.min_priority
         ).filter(min_priority=F("priority"))
 
         return workflow_objects.join(
-            approvals_with_max_priority, object_id_as_int=workflow_objects.col.pk
+            approvals_with_max_priority, object_id=workflow_objects.col.river_object_id
         ).with_cte(
             workflow_objects
         ).filter(source_state=getattr(workflow_objects.col, self.field_name + "_id"))
 
     @property
     def initial_state(self):
-        workflow = Workflow.objects.filter(content_type=self._content_type, field_name=self.name).first()
-        return workflow.initial_state if workflow else None
+        graph = workflow_graph_registry.get(self._content_type, self.name)
+        return graph.initial_state if graph else None
 
     @property
     def final_states(self):
-        final_approvals = TransitionApprovalMeta.objects.filter(workflow=self.workflow, children__isnull=True)
-        return State.objects.filter(pk__in=final_approvals.values_list("destination_state", flat=True))
+        graph = self.graph
+        return State.objects.filter(pk__in=graph.final_state_ids if graph else [])
 
     def hook_post_transition(self, callback, *args, **kwargs):
         PostTransitionHooking.register(callback, None, self.field_name, *args, **kwargs)
@@ -83,29 +316,25 @@ class ClassWorkflowObject(object):
     def hook_pre_complete(self, callback):
         PreCompletedHooking.register(callback, None, self.field_name)
 
+    def hook_post_transition_batch(self, callback, *args, **kwargs):
+        PostTransitionBatchHooking.register(callback, None, self.field_name, *args, **kwargs)
+
+    def hook_post_complete_batch(self, callback):
+        PostCompletedBatchHooking.register(callback, None, self.field_name)
+
+    def unhook(self, workflow_objects, batch_size=500):
+        """
+        Unregisters all the callbacks registered for the given workflow objects, which can be a queryset, model
+        instances or primary keys, with one query for each batch.
+        """
+        for workflow_object_ids in batches(workflow_objects, batch_size):
+            callback_backend.unregister_objects(OBJECT_HOOKINGS, workflow_object_ids, [self.field_name])
+
     def _authorized_approvals(self, as_user):
-        group_q = Q()
-        for g in as_user.groups.all():
-            group_q = group_q | Q(groups__in=[g])
-
-        permissions = []
-        for backend in auth.get_backends():
-            permissions.extend(backend.get_all_permissions(as_user))
-
-        permission_q = Q()
-        for p in permissions:
-            label, codename = p.split('.')
-            permission_q = permission_q | Q(permissions__content_type__app_label=label,
-                                            permissions__codename=codename)
-
-        return TransitionApproval.objects.filter(
-            Q(workflow=self.workflow, status=PENDING) &
-            (
-                    (Q(transactioner__isnull=True) | Q(transactioner=as_user)) &
-                    (Q(permissions__isnull=True) | permission_q) &
-                    (Q(groups__isnull=True) | group_q)
-            )
-        )
+        return authorize(TransitionApproval.objects.filter(workflow=self.workflow, status=PENDING), as_user)
+
+    def _inbox(self, as_user):
+        return authorize_inbox(InboxEntry.objects.filter(workflow=self.workflow), as_user)
 
     @property
     def _content_type(self):
@@ -4,6 +4,10 @@ from river.core.classworkflowobject import ClassWorkflowObject
 from river.core.instanceworkflowobject import InstanceWorkflowObject
 from river.core.workflowregistry import workflow_registry
 
+RIVER_OBJECT_ATTRIBUTE = '_river_object'
+
+_class_river_objects = {}
+
 
 # noinspection PyMethodMayBeStatic
 class RiverObject(object):
@@ -12,15 +16,44 @@ class RiverObject(object):
         self.owner = owner
         self.field_name = field_name
         self.is_class = inspect.isclass(owner)
+        self._workflow_objects = {}
 
-    def __getattr__(self, field_name):
-        cls = self.owner if self.is_class else self.owner.__class__
-        if field_name not in workflow_registry.workflows[id(cls)]:
-            raise Exception("Workflow with name:%s doesn't exist for class:%s" % (field_name, cls.__name__))
-        if self.is_class:
-            return ClassWorkflowObject(self.owner, field_name, self.field_name)
+    @classmethod
+    def of(cls, owner, field_name):
+        """
+        Returns the river object of the given model class or model instance. It is memoized on the owner, so the
+        workflow objects it hands out are only built once for a class and once for an instance. The instance
+        workflow objects read the state from the instance every time, so they never go stale.
+        """
+        if inspect.isclass(owner):
+            river_object = _class_river_objects.get(owner)
+            if river_object is None:
+                river_object = _class_river_objects.setdefault(owner, cls(owner, field_name))
         else:
-            return InstanceWorkflowObject(self.owner, field_name, self.field_name)
+            river_object = owner.__dict__.get(RIVER_OBJECT_ATTRIBUTE)
+            if river_object is None or river_object.owner is not owner:
+                river_object = cls(owner, field_name)
+                owner.__dict__[RIVER_OBJECT_ATTRIBUTE] = river_object
+        return river_object
+
+    def __getattr__(self, field_name):
+        if field_name.startswith('__') or field_name in ('owner', 'field_name', 'is_class', '_workflow_objects'):
+            raise AttributeError(field_name)
+
+        workflow_object = self._workflow_objects.get(field_name)
+        if workflow_object is None:
+            cls = self.owner if self.is_class else self.owner.__class__
+            if field_name not in workflow_registry.workflows[id(cls)]:
+                raise Exception("Workflow with name:%s doesn't exist for class:%s" % (field_name, cls.__name__))
+            if self.is_class:
+                workflow_object = ClassWorkflowObject(self.owner, field_name, self.field_name)
+            else:
+                workflow_object = InstanceWorkflowObject(self.owner, field_name, self.field_name)
+            self._workflow_objects[field_name] = workflow_object
+        return workflow_object
+
+    def __reduce__(self):
+        return self.__class__, (self.owner, self.field_name)
 
     def all(self, cls):
         return list([getattr(self, field_name) for field_name in workflow_registry.workflows[id(cls)]])
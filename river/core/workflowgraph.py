@@ -0,0 +1,236 @@
+import logging
+import threading
+from collections import deque
+from timeit import default_timer
+from uuid import uuid4
+
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+
+from river.config import app_config
+from river.models import Workflow, TransitionApprovalMeta, State
+from river.models.transitionapprovalmeta import deferred_parents_rebuild
+from river.utils.transactions import is_pending_on_commit
+
+__author__ = 'ahmetdal'
+
+LOGGER = logging.getLogger(__name__)
+
+VERSION_CACHE_KEY = 'river_workflow_graph_version'
+
+
+class WorkflowGraph(object):
+    """
+    Compiled, read-only view of a workflow definition. It is built with a fixed number of queries and
+    answers every definition question (adjacency, parent/child edges, initial and final states,
+    authorization and priorities of the metas) from memory.
+
+    The workflow, the states and the metas of a graph are shared by all the callers in the process until
+    the graph is recompiled, so they must not be changed in place. Fetch them from the database to change them.
+    """
+
+    def __init__(self, workflow, metas, permissions, groups, parents):
+        self.workflow = workflow
+        self.initial_state = workflow.initial_state
+        self.metas = metas
+        self.meta_index = {}
+        self.states = {self.initial_state.pk: self.initial_state}
+        self.metas_by_source = {}
+        self.parents = {}
+        self.children = {}
+        self.permissions = {}
+        self.groups = {}
+        self.priority_tiers = {}
+
+        for meta in metas:
+            self.meta_index[meta.pk] = meta
+            self.states[meta.source_state_id] = meta.source_state
+            self.states[meta.destination_state_id] = meta.destination_state
+            self.metas_by_source.setdefault(meta.source_state_id, []).append(meta)
+            self.parents[meta.pk] = set()
+            self.children[meta.pk] = set()
+            self.permissions[meta.pk] = []
+            self.groups[meta.pk] = []
+            self.priority_tiers.setdefault((meta.source_state_id, meta.destination_state_id), set()).add(meta.priority)
+
+        for meta_id, parent_id in parents:
+            if meta_id in self.meta_index and parent_id in self.meta_index:
+                self.parents[meta_id].add(parent_id)
+                self.children[parent_id].add(meta_id)
+
+        for meta_id, permission_id in permissions:
+            self.permissions[meta_id].append(permission_id)
+
+        for meta_id, group_id in groups:
+            self.groups[meta_id].append(group_id)
+
+        self.priority_tiers = {transition: sorted(priorities, key=lambda p: (p is None, p)) for transition, priorities in self.priority_tiers.items()}
+
+        self.final_state_ids = set(meta.destination_state_id for meta in metas if not self.children[meta.pk])
+        self.final_states = [self.states[state_id] for state_id in sorted(self.final_state_ids)]
+        self.reachable_metas = self._walk(self.initial_state.pk)
+        self.cycles = self._find_cycles()
+
+    @classmethod
+    def build(cls, workflow):
+        metas = list(TransitionApprovalMeta.objects.filter(workflow=workflow).select_related('source_state', 'destination_state').order_by('pk'))
+        permissions = _edges(TransitionApprovalMeta.permissions, workflow)
+        groups = _edges(TransitionApprovalMeta.groups, workflow)
+        parents = _edges(TransitionApprovalMeta.parents, workflow)
+        return cls(workflow, metas, permissions, groups, parents)
+
+    def next_metas(self, state):
+        return self.metas_by_source.get(state.pk, [])
+
+    def _walk(self, state_id):
+        metas = []
+        visited = {state_id}
+        states = deque([state_id])
+        while states:
+            for meta in self.metas_by_source.get(states.popleft(), []):
+                metas.append(meta)
+                if meta.destination_state_id not in visited:
+                    visited.add(meta.destination_state_id)
+                    states.append(meta.destination_state_id)
+        return metas
+
+
+    def _find_cycles(self):
+        """
+        Returns the strongly connected components of the states which an object can cycle through, by their states.
+        It is Tarjan's algorithm without recursion, so that the long workflows don't hit the recursion limit.
+        """
+        successors = dict((state_id, sorted(set(meta.destination_state_id for meta in metas))) for state_id, metas in self.metas_by_source.items())
+        index, lowlink, stack, on_stack, cycles = {}, {}, [], set(), {}
+        for root in self.states:
+            if root in index:
+                continue
+            index[root] = lowlink[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            work = [(root, iter(successors.get(root, [])))]
+            while work:
+                state_id, children = work[-1]
+                for child in children:
+                    if child not in index:
+                        index[child] = lowlink[child] = len(index)
+                        stack.append(child)
+                        on_stack.add(child)
+                        work.append((child, iter(successors.get(child, []))))
+                        break
+                    elif child in on_stack:
+                        lowlink[state_id] = min(lowlink[state_id], index[child])
+                else:
+                    work.pop()
+                    if work:
+                        lowlink[work[-1][0]] = min(lowlink[work[-1][0]], lowlink[state_id])
+                    if lowlink[state_id] == index[state_id]:
+                        component = set()
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.add(member)
+                            if member == state_id:
+                                break
+                        if len(component) > 1 or state_id in successors.get(state_id, []):
+                            component = frozenset(component)
+                            cycles.update((member, component) for member in component)
+        return cycles
+
+
+def _edges(many_to_many, workflow):
+    field = many_to_many.field
+    source, target = field.m2m_field_name(), field.m2m_reverse_field_name()
+    return list(many_to_many.through.objects.filter(**{source + '__workflow': workflow}).values_list(source + '_id', target + '_id'))
+
+
+class WorkflowGraphRegistry(object):
+    """
+    Keeps one compiled graph per workflow in the process. Every cached graph is stamped with the definition
+    version it is built with. The version is bumped by any change on workflows, states or transition approval
+    metas both locally and in the configured cache, so that the other processes sharing the cache rebuild
+    their graphs too. The version in the cache is read at most once every ``RIVER_WORKFLOW_GRAPH_TTL``
+    seconds, so the changes made by the other processes are seen within that time.
+
+    A graph that is built from definition changes which are not committed yet is only trusted as long as
+    those changes are still pending in the transaction. It is recompiled once they are rolled back.
+    """
+
+    def __init__(self):
+        self._graphs = {}
+        self._lock = threading.Lock()
+        self._pending_change = None
+        self._remote_version = None
+        self._remote_version_expires_at = None
+        self.local_version = 0
+
+    @property
+    def version(self):
+        if self._remote_version_expires_at is None or self._remote_version_expires_at <= default_timer():
+            self._remember_remote_version(caches[app_config.CACHE_ALIAS].get(VERSION_CACHE_KEY))
+        return self.local_version, self._remote_version
+
+    def _remember_remote_version(self, remote_version):
+        self._remote_version = remote_version
+        self._remote_version_expires_at = default_timer() + app_config.WORKFLOW_GRAPH_TTL
+
+    def get(self, content_type, field_name):
+        key = (content_type.pk, field_name)
+        version = self.version
+        cached = self._graphs.get(key)
+        if cached is None or cached[0] != version or (cached[1] and not is_pending_on_commit(cached[1])):
+            pending_change = self._pending_change if is_pending_on_commit(self._pending_change) else None
+            workflow = Workflow.objects.filter(content_type=content_type, field_name=field_name).select_related('initial_state').first()
+            cached = (version, pending_change, WorkflowGraph.build(workflow) if workflow else None)
+            with self._lock:
+                self._graphs[key] = cached
+            LOGGER.debug("Workflow graph is compiled for content type %s and field %s" % (content_type.pk, field_name))
+        return cached[2]
+
+    def invalidate(self, *args, **kwargs):
+        remote_version = uuid4().hex
+        with self._lock:
+            self.local_version += 1
+            self._graphs = {}
+        caches[app_config.CACHE_ALIAS].set(VERSION_CACHE_KEY, remote_version, None)
+        self._remember_remote_version(remote_version)
+
+    def on_definition_changed(self):
+        """
+        Invalidates the graphs both right away and once the transaction is committed, since the other processes
+        may compile the old definition again in the meantime. The graphs compiled before the commit are tied to the
+        change, so that they are dropped if it is rolled back instead.
+        """
+        def pending_change():
+            self.invalidate()
+
+        self.invalidate()
+        self._pending_change = pending_change
+        transaction.on_commit(pending_change)
+
+
+workflow_graph_registry = WorkflowGraphRegistry()
+
+
+def _on_definition_changed(sender, instance, raw=False, using=None, *args, **kwargs):
+    if raw:
+        if sender is Workflow:
+            deferred_parents_rebuild.add(instance.pk, using)
+        elif sender is TransitionApprovalMeta:
+            deferred_parents_rebuild.add(instance.workflow_id, using)
+        else:
+            deferred_parents_rebuild.add(using=using)
+        return
+    # The graphs are invalidated once the raw saves of the transaction, like the ones of a fixture, are committed.
+    if deferred_parents_rebuild.is_pending(using):
+        return
+    workflow_graph_registry.on_definition_changed()
+
+
+for model in [Workflow, State, TransitionApprovalMeta]:
+    post_save.connect(_on_definition_changed, sender=model, dispatch_uid='river_workflow_graph_post_save_%s' % model.__name__)
+    post_delete.connect(_on_definition_changed, sender=model, dispatch_uid='river_workflow_graph_post_delete_%s' % model.__name__)
+
+for through in [TransitionApprovalMeta.permissions.through, TransitionApprovalMeta.groups.through, TransitionApprovalMeta.parents.through]:
+    m2m_changed.connect(_on_definition_changed, sender=through, dispatch_uid='river_workflow_graph_m2m_changed_%s' % through.__name__)
@@ -1,12 +1,18 @@
-from itertools import combinations, chain
+import logging
+import re
+from collections import namedtuple
 
 __author__ = 'ahmetdal'
 
+LOGGER = logging.getLogger(__name__)
 
-def powerset(iterable):
-    xs = list(iterable)
-    # note we return an iterator rather than a list
-    return chain.from_iterable(combinations(xs, n) for n in range(len(xs) + 1))
+HASH = re.compile(r'^object(?P<object_id>.*?)_field_name(?P<field_name>.*?)(?P<criteria>(?:(?:source_state|destination_state|transition_approval)\d+)*)$')
+CRITERIA = re.compile(r'(source_state|destination_state|transition_approval)(\d+)')
+
+
+_methods = {}
+
+WorkflowObjectKey = namedtuple('WorkflowObjectKey', ['pk'])
 
 
 class BaseHookingBackend(object):
@@ -19,6 +25,44 @@ class BaseHookingBackend(object):
     def get_callbacks(self, hooking_cls, workflow_object, field_name, *args, **kwargs):
         raise NotImplementedError()
 
+    def unregister_objects(self, hooking_classes, object_ids, field_names):
+        """
+        Unregisters the callbacks of the given hooking classes which are registered for any of the given workflow
+        object ids and field names. The backends override it to do it at once instead of one by one.
+        """
+        for hooking_cls in hooking_classes:
+            for object_id in object_ids:
+                for field_name in field_names:
+                    self.unregister(hooking_cls, WorkflowObjectKey(object_id), field_name)
+
+    def has_callbacks(self, hooking_cls):  # pylint: disable=unused-argument,no-self-use
+        return True
+
+    def defer(self, hooking_cls, callback, workflow_object, field_name, *args, **kwargs):  # pylint: disable=unused-argument,no-self-use
+        """
+        Takes over running the callback of a deferrable hooking. It returns ``False`` when the backend doesn't and the
+        callback is run with the hooking executor.
+        """
+        return False
+
+    @staticmethod
+    def get_method(path):
+        """
+        Imports the callback method with the given dotted path. Both the methods and the failures are memoized,
+        so that a missing module is not tried to be imported on every dispatch.
+        """
+        if path not in _methods:
+            module, method_name = path.rsplit('.', 1)
+            try:
+                method = getattr(__import__(module, fromlist=[method_name]), method_name, None)
+                if not method:
+                    LOGGER.warning("Callback method '%s' can not be registered. Because it is not in module '%s'. " % (method_name, module))
+            except ImportError:
+                method = None
+                LOGGER.warning("Callback method '%s' can not be registered. Because module '%s' does not exists. " % (method_name, module))
+            _methods[path] = method
+        return _methods[path]
+
     @staticmethod
     def get_hooking_class(hooking_cls):
         if isinstance(hooking_cls, str):
@@ -29,3 +73,27 @@ class BaseHookingBackend(object):
     @staticmethod
     def get_hooking_class_prefix(hooking_cls):
         return '%s.%s_' % (hooking_cls.__module__, hooking_cls.__name__)
+
+    @staticmethod
+    def get_dispatch_key(workflow_object, field_name):
+        return str(workflow_object.pk) if workflow_object else None, field_name
+
+    @staticmethod
+    def serialize_criteria(criteria):
+        return '&'.join('%s=%s' % item for item in sorted(criteria))
+
+    @staticmethod
+    def deserialize_criteria(criteria):
+        return frozenset(tuple(item.split('=', 1)) for item in criteria.split('&') if item)
+
+    @classmethod
+    def parse_hash(cls, hooking_cls, callback_hash):
+        """
+        Returns the dispatch key and the criteria which a callback hash is built from, or ``None`` when it can not be parsed.
+        It is for the callbacks which are persisted before their dispatch keys are stored separately.
+        """
+        prefix = cls.get_hooking_class_prefix(hooking_cls)
+        match = HASH.match(callback_hash[len(prefix):]) if callback_hash.startswith(prefix) else None
+        if not match:
+            return None
+        return (match.group('object_id') or None, match.group('field_name')), frozenset(CRITERIA.findall(match.group('criteria')))
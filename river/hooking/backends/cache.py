@@ -0,0 +1,150 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from timeit import default_timer
+from uuid import uuid4
+
+from django.core.cache import caches
+
+from river.config import app_config
+from river.hooking.backends.memory import MemoryHookingBackend
+
+__author__ = 'ahmetdal'
+
+LOGGER = logging.getLogger(__name__)
+
+ENTRIES_CACHE_KEY = 'river_hooks_%s_%s_%s'
+CLASS_CACHE_KEY = 'river_hooks_%s'
+LOCK_CACHE_KEY = '%s_lock'
+
+
+class CacheHookingBackend(MemoryHookingBackend):
+    """
+    Keeps the registered callbacks in the configured cache, so that they are shared by all the processes using the
+    same cache. There is one cache entry for each hooking class and (workflow object id, field name) pair which maps
+    the callback hashes to the dotted paths of the callbacks and their criteria. Every process keeps the entries it
+    reads for ``ttl`` seconds in memory before reading them again from the cache. At most ``cache_size`` of the entries
+    are kept in memory and the least recently used ones are read again from the cache when needed.
+
+    An entry is changed under a lock which is taken with an atomic ``add`` in the cache, so that the callbacks
+    registered for the same object and field by the processes at the same time are not lost. The lock expires in
+    ``lock_timeout`` seconds if its holder dies, and a change which takes longer than that may still be lost.
+
+    The cache should not evict the entries on its own, since the callbacks would be lost then. The callbacks of the
+    other processes must be importable by their module and name, since only their dotted paths are shared.
+    """
+
+    def __init__(self, ttl=5, timeout=None, cache_alias=None, cache_size=10000, lock_timeout=5):
+        super(CacheHookingBackend, self).__init__()
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.timeout = timeout
+        self.cache_alias = cache_alias
+        self.cache_size = cache_size
+        self._near_cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias or app_config.CACHE_ALIAS]
+
+    @staticmethod
+    def get_entries_key(hooking_cls, dispatch_key):
+        object_id, field_name = dispatch_key
+        return ENTRIES_CACHE_KEY % ('%s.%s' % (hooking_cls.__module__, hooking_cls.__name__), object_id or '', field_name)
+
+    @staticmethod
+    def get_class_key(hooking_cls):
+        return CLASS_CACHE_KEY % ('%s.%s' % (hooking_cls.__module__, hooking_cls.__name__))
+
+    def _get(self, key, default):
+        cached = self._near_cache.get(key)
+        if cached is None or cached[0] <= default_timer():
+            cached = (default_timer() + self.ttl, self.cache.get(key, default))
+        self._remember(key, cached)
+        return cached[1]
+
+    def _set(self, key, value):
+        self.cache.set(key, value, self.timeout)
+        self._remember(key, (default_timer() + self.ttl, value))
+
+    def _remember(self, key, cached):
+        with self._lock:
+            self._near_cache.pop(key, None)
+            self._near_cache[key] = cached
+            while len(self._near_cache) > self.cache_size:
+                self._near_cache.popitem(last=False)
+
+    @contextmanager
+    def _locked(self, key):
+        lock_key, token = LOCK_CACHE_KEY % key, uuid4().hex
+        deadline = default_timer() + 2 * self.lock_timeout
+        while not self.cache.add(lock_key, token, self.lock_timeout):
+            if default_timer() >= deadline:
+                LOGGER.warning("Cache entry '%s' is changed without its lock. Because the lock couldn't be taken in %s seconds. " % (key, 2 * self.lock_timeout))
+                break
+            time.sleep(0.01)
+        try:
+            yield
+        finally:
+            if self.cache.get(lock_key) == token:
+                self.cache.delete(lock_key)
+
+    def register(self, hooking_cls, callback, workflow_object, field_name, override=False, *args, **kwargs):
+        hooking_cls = self.get_hooking_class(hooking_cls)
+        callback_hash = super(CacheHookingBackend, self).register(hooking_cls, callback, workflow_object, field_name, override=override, *args, **kwargs)
+        key = self.get_entries_key(hooking_cls, self.get_dispatch_key(workflow_object, field_name))
+        with self._locked(key):
+            entries = dict(self.cache.get(key, {}))
+            if override or callback_hash not in entries:
+                entries[callback_hash] = ('%s.%s' % (callback.__module__, callback.__name__), self.serialize_criteria(hooking_cls.get_criteria(*args, **kwargs)))
+                self._set(key, entries)
+                self._set(self.get_class_key(hooking_cls), True)
+        return callback_hash
+
+    def unregister(self, hooking_cls, workflow_object, field_name, *args, **kwargs):
+        hooking_cls = self.get_hooking_class(hooking_cls)
+        callback_hash = self.get_hooking_class_prefix(hooking_cls) + hooking_cls.get_hash(workflow_object, field_name, *args, **kwargs)
+        key = self.get_entries_key(hooking_cls, self.get_dispatch_key(workflow_object, field_name))
+        with self._locked(key):
+            entries = dict(self.cache.get(key, {}))
+            if entries.pop(callback_hash, None):
+                if entries:
+                    self._set(key, entries)
+                else:
+                    self.cache.delete(key)
+                    with self._lock:
+                        self._near_cache.pop(key, None)
+        return super(CacheHookingBackend, self).unregister(hooking_cls, workflow_object, field_name, *args, **kwargs)
+
+    def unregister_objects(self, hooking_classes, object_ids, field_names):
+        hooking_classes = [self.get_hooking_class(hooking_cls) for hooking_cls in hooking_classes]
+        keys = [
+            self.get_entries_key(hooking_cls, (str(object_id), field_name))
+            for hooking_cls in hooking_classes for object_id in object_ids for field_name in field_names
+        ]
+        self.cache.delete_many(keys)
+        with self._lock:
+            for key in keys:
+                self._near_cache.pop(key, None)
+        super(CacheHookingBackend, self).unregister_objects(hooking_classes, object_ids, field_names)
+
+    def get_callbacks(self, hooking_cls, workflow_object, field_name, *args, **kwargs):
+        hooking_cls = self.get_hooking_class(hooking_cls)
+        entries = self._get(self.get_entries_key(hooking_cls, self.get_dispatch_key(workflow_object, field_name)), {})
+        if not entries:
+            return []
+
+        criteria = set(hooking_cls.get_criteria(*args, **kwargs))
+        callbacks = []
+        for callback_hash, (method, callback_criteria) in entries.items():
+            if criteria.issuperset(self.deserialize_criteria(callback_criteria)):
+                callback = self.callbacks.get(callback_hash) or self.get_method(method)
+                if callback:
+                    callbacks.append(callback)
+        return callbacks
+
+    def has_callbacks(self, hooking_cls):
+        return bool(self._get(self.get_class_key(self.get_hooking_class(hooking_cls)), False))
@@ -1,46 +1,230 @@
 import logging
+import threading
+import weakref
+from collections import OrderedDict
+from uuid import uuid4
 
-from river.hooking.backends.base import powerset
+from django.apps import apps
+from django.core.cache import caches
+from django.db import transaction, IntegrityError
+from django.db.models import Q
+from django.db.models.signals import post_save, post_delete
+
+from river.config import app_config
 from river.hooking.backends.memory import MemoryHookingBackend
 from river.models.callback import Callback
+from river.utils.bulk import raw_delete
 
 __author__ = 'ahmetdal'
 
 LOGGER = logging.getLogger(__name__)
 
+VERSION_CACHE_KEY = 'river_callback_version'
+
+# Legacy hashes of the callbacks which are not registered for a specific workflow object.
+CLASS_LEVEL_HASH = '_object_field_name'
+
 
 class DatabaseHookingBackend(MemoryHookingBackend):
+    """
+    Remembers the dispatch keys and the hooking classes which are already looked up in the database, so that
+    the objects without any callbacks don't cost a query on every transition. Any change on the callbacks bumps a
+    version stamp in the configured cache. The changes made in the process are applied to the callbacks in memory
+    right away, and the callbacks are loaded again from the database once the stamp is bumped by another process
+    sharing the cache.
+
+    Only the callbacks which are not registered for a specific workflow object are loaded initially. The ones of
+    the workflow objects are loaded when they are dispatched and at most ``cache_size`` of the workflow objects
+    keep their callbacks in memory. The least recently used ones are loaded again from the database when needed.
+
+    The callbacks registered while the applications are being loaded, which is usually at import time, are only
+    registered in memory until ``flush`` is called when ``river`` is ready. They are then written all together and
+    the ones which are already in the database as they are aren't written at all.
+    """
+
+    def __init__(self, cache_size=10000):
+        super(DatabaseHookingBackend, self).__init__()
+        self.cache_size = cache_size
+        self._lookups = OrderedDict()
+        self._object_keys = OrderedDict()
+        self._lock = threading.RLock()
+        self.local_version = 0
+        self._stamp = caches[app_config.CACHE_ALIAS].get(VERSION_CACHE_KEY)
+        self._pending = None if apps.ready else OrderedDict()
+        _backends.add(self)
+
+    @property
+    def version(self):
+        return self.local_version, caches[app_config.CACHE_ALIAS].get(VERSION_CACHE_KEY)
+
+    def invalidate(self):
+        with self._lock:
+            self.local_version += 1
+            self._lookups = OrderedDict()
+        bump_version([self])
+
+    def on_callback_changed(self, callback_obj, deleted):
+        """
+        Applies a change on a callback which is made in this process to the callbacks in memory.
+        """
+        with self._lock:
+            self.local_version += 1
+            self._lookups = OrderedDict()
+            try:
+                hooking_cls = self.get_hooking_class(callback_obj.hooking_cls)
+            except (ImportError, AttributeError):
+                return
+            if callback_obj.field_name is not None:
+                dispatch_key = (callback_obj.object_id, callback_obj.field_name)
+            else:
+                parsed = self.parse_hash(hooking_cls, callback_obj.hash)
+                if not parsed:
+                    return
+                dispatch_key = parsed[0]
+            if deleted or not callback_obj.enabled:
+                self.callbacks.pop(callback_obj.hash, None)
+                self.unindex(hooking_cls, dispatch_key, callback_obj.hash)
+            elif callback_obj.hash not in self.callbacks and (dispatch_key[0] is None or (hooking_cls,) + dispatch_key in self._object_keys):
+                self.__register([callback_obj])
+
+    def _sync(self):
+        """
+        Drops the callbacks in memory once another process has changed them, so that they are loaded again.
+        """
+        stamp = caches[app_config.CACHE_ALIAS].get(VERSION_CACHE_KEY)
+        if stamp != self._stamp:
+            with self._lock:
+                for key in list(self._object_keys):
+                    self._evict(key)
+                self._object_keys = OrderedDict()
+                self._lookups = OrderedDict()
+                self.dispatch_table = {}
+            self.initialize_callbacks()
+
+    def _is_looked_up(self, key):
+        return key in self._lookups
+
+    def _looked_up(self, key):
+        with self._lock:
+            self._lookups.pop(key, None)
+            self._lookups[key] = None
+            while len(self._lookups) > self.cache_size:
+                self._lookups.popitem(last=False)
+
+    def _used(self, key):
+        """
+        Marks the callbacks of a workflow object as the most recently used ones and evicts the least recently used
+        ones from memory when there are more than ``cache_size`` of them.
+        """
+        if key[1] is None:
+            return
+        with self._lock:
+            self._object_keys.pop(key, None)
+            self._object_keys[key] = None
+            while len(self._object_keys) > self.cache_size:
+                self._evict(self._object_keys.popitem(last=False)[0])
+
+    def _evict(self, key):
+        hooking_cls, dispatch_key = key[0], key[1:]
+        for callback_hash in list(self.dispatch_table.get(hooking_cls, {}).get(dispatch_key, {})):
+            self.callbacks.pop(callback_hash, None)
+            self.unindex(hooking_cls, dispatch_key, callback_hash)
+        self._lookups.pop(key, None)
 
     def initialize_callbacks(self):
-        self.__register(Callback.objects.filter(enabled=True))
+        self._stamp = caches[app_config.CACHE_ALIAS].get(VERSION_CACHE_KEY)
+        self.__register(Callback.objects.filter(
+            Q(field_name__isnull=False, object_id__isnull=True) | Q(field_name__isnull=True, hash__contains=CLASS_LEVEL_HASH),
+            enabled=True
+        ))
 
     def __register(self, callback_objs):
         callbacks = []
-        if callback_objs.exists():
-            for callback in callback_objs:
-                if callback.hash not in self.callbacks:
-                    module, method_name = callback.method.rsplit('.', 1)
-                    try:
-                        method = getattr(__import__(module, fromlist=[method_name]), method_name, None)
-                        if method:
-                            self.callbacks[callback.hash] = method
-                            callbacks.append(method)
-                            LOGGER.debug("Callback '%s' from database is registered initially from database as method '%s' and module '%s'. " % (callback.hash, method_name, module))
-                        else:
-                            LOGGER.warning("Callback '%s' from database can not be registered. Because method '%s' is not in module '%s'. " % (callback.hash, method_name, module))
-                    except ImportError:
-                        LOGGER.warning("Callback '%s' from database can not be registered. Because module '%s'  does not exists. " % (callback.hash, module))
+        for callback in callback_objs:
+            if callback.hash not in self.callbacks:
+                method = self.get_method(callback.method)
+                if not method:
+                    continue
+                self.callbacks[callback.hash] = method
+                callbacks.append(method)
+                LOGGER.debug("Callback '%s' from database is registered as method '%s'. " % (callback.hash, callback.method))
+            try:
+                hooking_cls = self.get_hooking_class(callback.hooking_cls)
+            except (ImportError, AttributeError):
+                LOGGER.warning("Callback '%s' from database can not be indexed. Because hooking class '%s' does not exists. " % (callback.hash, callback.hooking_cls))
+                continue
+            if callback.field_name is not None:
+                self.index(hooking_cls, (callback.object_id, callback.field_name), callback.hash, self.deserialize_criteria(callback.criteria))
+            else:
+                parsed = self.parse_hash(hooking_cls, callback.hash)
+                if parsed:
+                    dispatch_key, criteria = parsed
+                    self.index(hooking_cls, dispatch_key, callback.hash, criteria)
+                else:
+                    LOGGER.warning("Callback '%s' from database can not be indexed. Because its hash can not be parsed. " % callback.hash)
         return callbacks
 
+    def flush(self):
+        """
+        Writes the callbacks which are registered while the applications are being loaded. The ones which are not in
+        the database are inserted at once and only the ones which are changed are updated.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, None
+        if not pending:
+            return
+
+        try:
+            with transaction.atomic():
+                hashes = list(pending)
+                existing = {}
+                for start in range(0, len(hashes), 500):
+                    existing.update((callback.hash, callback) for callback in Callback.objects.filter(hash__in=hashes[start:start + 500]))
+
+                created = [Callback(hash=callback_hash, **values) for callback_hash, values in pending.items() if callback_hash not in existing]
+                changed = [
+                    (callback_hash, values) for callback_hash, values in pending.items()
+                    if callback_hash in existing and any(getattr(existing[callback_hash], key) != value for key, value in values.items())
+                ]
+                try:
+                    with transaction.atomic():
+                        Callback.objects.bulk_create(created)
+                except IntegrityError:
+                    # Another process has inserted some of them in the meantime.
+                    changed.extend((callback.hash, pending[callback.hash]) for callback in created)
+                for callback_hash, values in changed:
+                    Callback.objects.update_or_create(hash=callback_hash, defaults=values)
+        except Exception:
+            with self._lock:
+                pending.update(self._pending or {})
+                self._pending = pending
+            raise
+
+        LOGGER.debug("%s callbacks are registered in database at once, %s of them are new and %s of them are changed. " % (len(pending), len(created), len(changed)))
+        if created or changed:
+            self.invalidate()
+            transaction.on_commit(self.invalidate)
+
     def register(self, hooking_cls, callback, workflow_object, field_name, override=False, *args, **kwargs):
+        hooking_cls = self.get_hooking_class(hooking_cls)
         callback_hash = super(DatabaseHookingBackend, self).register(hooking_cls, callback, workflow_object, field_name, override=override, *args, **kwargs)
-        callback_obj, created = Callback.objects.update_or_create(
-            hash=callback_hash,
-            defaults={
-                'method': '%s.%s' % (callback.__module__, callback.__name__),
-                'hooking_cls': '%s.%s' % (hooking_cls.__module__, hooking_cls.__name__),
-            }
-        )
+        object_id, field_name = self.get_dispatch_key(workflow_object, field_name)
+        values = {
+            'method': '%s.%s' % (callback.__module__, callback.__name__),
+            'hooking_cls': '%s.%s' % (hooking_cls.__module__, hooking_cls.__name__),
+            'object_id': object_id,
+            'field_name': field_name,
+            'criteria': self.serialize_criteria(hooking_cls.get_criteria(*args, **kwargs)),
+        }
+        self._used((hooking_cls, object_id, field_name))
+        if self._pending is not None:
+            if not apps.ready:
+                with self._lock:
+                    self._pending[callback_hash] = values
+                return callback_hash
+            self.flush()
+
+        callback_obj, created = Callback.objects.update_or_create(hash=callback_hash, defaults=values)
         if created:
             LOGGER.debug("Callback '%s' is registered in database as method %s and module %s. " % (callback_obj.hash, callback.__name__, callback.__module__))
         else:
@@ -50,6 +234,10 @@ class DatabaseHookingBackend(MemoryHookingBackend):
 
     def unregister(self, hooking_cls, workflow_object, field_name, *args, **kwargs):
         callback_hash, callback_method = super(DatabaseHookingBackend, self).unregister(hooking_cls, workflow_object, field_name, *args, **kwargs)
+        if callback_hash and self._pending is not None:
+            with self._lock:
+                if self._pending is not None:
+                    self._pending.pop(callback_hash, None)
         if callback_hash:
             callback_obj = Callback.objects.filter(hash=callback_hash).first()
             if callback_obj:
@@ -57,15 +245,89 @@ class DatabaseHookingBackend(MemoryHookingBackend):
                 LOGGER.debug("Callback '%s'  as method %s and module %s. is registered in database" % (callback_obj.hash, callback_method.__name__, callback_method.__module__))
         return callback_hash, callback_method
 
+    def unregister_objects(self, hooking_classes, object_ids, field_names):
+        """
+        Deletes the callbacks of the given workflow objects with a single query on the dispatch index. The rows are
+        deleted without the delete signals of the callbacks, so the version is bumped only once for all of them and
+        not at all when the workflow objects have no callbacks.
+        """
+        hooking_classes = [self.get_hooking_class(hooking_cls) for hooking_cls in hooking_classes]
+        object_ids = [str(object_id) for object_id in object_ids]
+        super(DatabaseHookingBackend, self).unregister_objects(hooking_classes, object_ids, field_names)
+        with self._lock:
+            for hooking_cls in hooking_classes:
+                for object_id in object_ids:
+                    for field_name in field_names:
+                        self._object_keys.pop((hooking_cls, object_id, field_name), None)
+                        self._lookups.pop((hooking_cls, object_id, field_name), None)
+            if self._pending:
+                hooking_cls_names = set('%s.%s' % (hooking_cls.__module__, hooking_cls.__name__) for hooking_cls in hooking_classes)
+                for callback_hash, values in list(self._pending.items()):
+                    if values['hooking_cls'] in hooking_cls_names and values['object_id'] in object_ids and values['field_name'] in field_names:
+                        del self._pending[callback_hash]
+        deleted = raw_delete(Callback.objects.filter(
+            hooking_cls__in=['%s.%s' % (hooking_cls.__module__, hooking_cls.__name__) for hooking_cls in hooking_classes],
+            field_name__in=field_names,
+            object_id__in=object_ids
+        ))
+        if deleted:
+            self.invalidate()
+            transaction.on_commit(self.invalidate)
+
     def get_callbacks(self, hooking_cls, workflow_object, field_name, *args, **kwargs):
+        hooking_cls = self.get_hooking_class(hooking_cls)
+        self._sync()
         callbacks = super(DatabaseHookingBackend, self).get_callbacks(hooking_cls, workflow_object, field_name, *args, **kwargs)
-        if not callbacks:
-            hashes = []
-            for c in powerset(kwargs.keys()):
-                skwargs = {}
-                for f in c:
-                    skwargs[f] = kwargs.get(f)
-                hash = self.get_hooking_class(hooking_cls).get_hash(workflow_object, field_name, **skwargs)
-                hashes.append(self.get_hooking_class_prefix(self.get_hooking_class(hooking_cls)) + hash)
-            callbacks = self.__register(Callback.objects.filter(hash__in=hashes))
+        object_id, dispatch_field_name = self.get_dispatch_key(workflow_object, field_name)
+        key = (hooking_cls, object_id, dispatch_field_name)
+        if not callbacks and not self._is_looked_up(key):
+            legacy_hash = self.get_hooking_class_prefix(hooking_cls) + 'object%s_field_name%s' % (object_id or '', field_name)
+            self.__register(Callback.objects.filter(
+                Q(field_name=dispatch_field_name, object_id=object_id) | Q(field_name__isnull=True, hash__startswith=legacy_hash),
+                hooking_cls='%s.%s' % (hooking_cls.__module__, hooking_cls.__name__),
+                enabled=True
+            ))
+            self._looked_up(key)
+            callbacks = super(DatabaseHookingBackend, self).get_callbacks(hooking_cls, workflow_object, field_name, *args, **kwargs)
+        if self.dispatch_table.get(hooking_cls, {}).get(key[1:]):
+            self._used(key)
         return callbacks
+
+    def has_callbacks(self, hooking_cls):
+        hooking_cls = self.get_hooking_class(hooking_cls)
+        self._sync()
+        if super(DatabaseHookingBackend, self).has_callbacks(hooking_cls):
+            return True
+        if self._is_looked_up(hooking_cls):
+            return False
+        exists = Callback.objects.filter(hooking_cls='%s.%s' % (hooking_cls.__module__, hooking_cls.__name__), enabled=True).exists()
+        if not exists:
+            self._looked_up(hooking_cls)
+        return exists
+
+
+_backends = weakref.WeakSet()
+
+
+def bump_version(backends):
+    """
+    Bumps the callback version in the cache. The given backends which are in sync with the previous version are
+    kept in sync, since they have applied the change already, and the other ones load the callbacks again.
+    """
+    cache = caches[app_config.CACHE_ALIAS]
+    previous, stamp = cache.get(VERSION_CACHE_KEY), uuid4().hex
+    cache.set(VERSION_CACHE_KEY, stamp, None)
+    for backend in backends:
+        if backend._stamp == previous:  # pylint: disable=protected-access
+            backend._stamp = stamp  # pylint: disable=protected-access
+
+
+def _on_callback_changed(sender, instance, signal, *args, **kwargs):
+    for backend in list(_backends):
+        backend.on_callback_changed(instance, signal is post_delete)
+    bump_version(list(_backends))
+    transaction.on_commit(lambda: bump_version(list(_backends)))
+
+
+for _signal in [post_save, post_delete]:
+    _signal.connect(_on_callback_changed, sender=Callback, dispatch_uid='river_callback_changed_%s' % id(_signal))
@@ -4,3 +4,6 @@ __author__ = 'ahmetdal'
 
 handler_module, hooking_cls = app_config.HOOKING_BACKEND_CLASS.rsplit('.', 1)
 callback_backend = getattr(__import__(handler_module, fromlist=[hooking_cls]), hooking_cls)(**app_config.HOOKING_BACKEND_CONFIG)
+
+executor_module, executor_cls = app_config.HOOKING_EXECUTOR_CLASS.rsplit('.', 1)
+hooking_executor = getattr(__import__(executor_module, fromlist=[executor_cls]), executor_cls)(**app_config.HOOKING_EXECUTOR_CONFIG)
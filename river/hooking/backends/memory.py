@@ -1,5 +1,7 @@
 import logging
-from river.hooking.backends.base import BaseHookingBackend, powerset
+from collections import OrderedDict
+
+from river.hooking.backends.base import BaseHookingBackend
 
 __author__ = 'ahmetdal'
 
@@ -7,18 +9,29 @@ LOGGER = logging.getLogger(__name__)
 
 
 class MemoryHookingBackend(BaseHookingBackend):
+    """
+    Keeps the callbacks by their hashes and indexes them in a dispatch table by hooking class and then by
+    (workflow object id, field name). A dispatch is two dictionary probes plus a check of the criteria, like the
+    source and the destination states, of the few callbacks registered for the same object and field.
+    """
+
     def __init__(self):
         self.callbacks = {}
+        self.dispatch_table = {}
 
     def register(self, hooking_cls, callback, workflow_object, field_name, override=False, *args, **kwargs):
+        hooking_cls = self.get_hooking_class(hooking_cls)
         callback_hash = self.get_hooking_class_prefix(hooking_cls) + hooking_cls.get_hash(workflow_object, field_name, *args, **kwargs)
         if override or callback_hash not in self.callbacks:
             self.callbacks[callback_hash] = callback
             LOGGER.debug("Callback '%s'with method '%s' and module '%s'  is registered from memory" % (callback_hash, callback.__name__, callback.__module__))
+        self.index(hooking_cls, self.get_dispatch_key(workflow_object, field_name), callback_hash, hooking_cls.get_criteria(*args, **kwargs))
         return callback_hash
 
     def unregister(self, hooking_cls, workflow_object, field_name, *args, **kwargs):
+        hooking_cls = self.get_hooking_class(hooking_cls)
         callback_hash = self.get_hooking_class_prefix(hooking_cls) + hooking_cls.get_hash(workflow_object, field_name, *args, **kwargs)
+        self.unindex(hooking_cls, self.get_dispatch_key(workflow_object, field_name), callback_hash)
 
         if callback_hash in self.callbacks:
             callback_method = self.callbacks.pop(callback_hash)
@@ -27,14 +40,45 @@ class MemoryHookingBackend(BaseHookingBackend):
         else:
             return None, None
 
+    def unregister_objects(self, hooking_classes, object_ids, field_names):
+        object_ids = set(str(object_id) for object_id in object_ids)
+        for hooking_cls in hooking_classes:
+            hooking_cls = self.get_hooking_class(hooking_cls)
+            table = self.dispatch_table.get(hooking_cls)
+            if not table:
+                continue
+            for object_id in object_ids:
+                for field_name in field_names:
+                    for callback_hash in table.pop((object_id, field_name), {}):
+                        self.callbacks.pop(callback_hash, None)
+            if not table:
+                del self.dispatch_table[hooking_cls]
+
     def get_callbacks(self, hooking_cls, workflow_object, field_name, *args, **kwargs):
+        hooking_cls = self.get_hooking_class(hooking_cls)
+        entries = self.dispatch_table.get(hooking_cls, {}).get(self.get_dispatch_key(workflow_object, field_name))
+        if not entries:
+            return []
+
+        criteria = set(hooking_cls.get_criteria(*args, **kwargs))
         callbacks = []
-        for c in powerset(kwargs.keys()):
-            skwargs = {}
-            for f in c:
-                skwargs[f] = kwargs.get(f)
-            callback_hash = self.get_hooking_class(hooking_cls).get_hash(workflow_object, field_name, **skwargs)
-            callback = self.callbacks.get(self.get_hooking_class_prefix(self.get_hooking_class(hooking_cls)) + callback_hash)
-            if callback:
+        for callback_hash, callback_criteria in entries.items():
+            callback = self.callbacks.get(callback_hash)
+            if callback and criteria.issuperset(callback_criteria):
                 callbacks.append(callback)
         return callbacks
+
+    def has_callbacks(self, hooking_cls):
+        return bool(self.dispatch_table.get(self.get_hooking_class(hooking_cls)))
+
+    def index(self, hooking_cls, dispatch_key, callback_hash, criteria):
+        self.dispatch_table.setdefault(hooking_cls, {}).setdefault(dispatch_key, OrderedDict())[callback_hash] = frozenset(criteria)
+
+    def unindex(self, hooking_cls, dispatch_key, callback_hash):
+        entries = self.dispatch_table.get(hooking_cls, {}).get(dispatch_key)
+        if entries is not None:
+            entries.pop(callback_hash, None)
+            if not entries:
+                del self.dispatch_table[hooking_cls][dispatch_key]
+                if not self.dispatch_table[hooking_cls]:
+                    del self.dispatch_table[hooking_cls]
@@ -0,0 +1,100 @@
+import json
+import logging
+import traceback
+from datetime import timedelta
+
+from django.apps import apps
+from django.db import models
+from django.utils import timezone
+
+from river.config import app_config
+from river.hooking.backends.database import DatabaseHookingBackend
+from river.hooking.metrics import hook_metrics
+from river.models.outbox import OutboxEntry
+
+__author__ = 'ahmetdal'
+
+LOGGER = logging.getLogger(__name__)
+
+MODEL_KEY = '__model__'
+
+
+def serialize_arguments(args, kwargs):
+    def serialize(value):
+        if isinstance(value, models.Model):
+            return {MODEL_KEY: value._meta.label_lower, 'pk': value.pk}  # pylint: disable=protected-access
+        return value
+
+    return json.dumps({'args': [serialize(value) for value in args], 'kwargs': {key: serialize(value) for key, value in kwargs.items()}}, sort_keys=True)
+
+
+def deserialize_arguments(arguments):
+    def deserialize(value):
+        if isinstance(value, dict) and MODEL_KEY in value:
+            return apps.get_model(value[MODEL_KEY])._default_manager.get(pk=value['pk'])  # pylint: disable=protected-access
+        return value
+
+    arguments = json.loads(arguments)
+    return [deserialize(value) for value in arguments.get('args', [])], {key: deserialize(value) for key, value in arguments.get('kwargs', {}).items()}
+
+
+class OutboxHookingBackend(DatabaseHookingBackend):
+    """
+    Writes an outbox entry for every callback of the deferrable hookings, like the post transition ones, in the
+    transaction of the approval instead of running it. The entries are delivered by ``river_drain_outbox`` at least
+    once; an entry which fails is retried with an exponential backoff until it runs out of attempts. The callbacks
+    must be importable by their module and name, since they are run by another process.
+    """
+
+    def __init__(self, max_attempts=10, backoff=30, max_backoff=3600, lease=300, **kwargs):
+        super(OutboxHookingBackend, self).__init__(**kwargs)
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.lease = lease
+
+    def defer(self, hooking_cls, callback, workflow_object, field_name, *args, **kwargs):
+        hooking_cls = self.get_hooking_class(hooking_cls)
+        OutboxEntry.objects.create(
+            hooking_cls='%s.%s' % (hooking_cls.__module__, hooking_cls.__name__),
+            method='%s.%s' % (callback.__module__, callback.__name__),
+            content_type=app_config.CONTENT_TYPE_CLASS.objects.get_for_model(workflow_object),
+            object_id=workflow_object.pk,
+            field_name=field_name,
+            arguments=serialize_arguments(args, kwargs),
+        )
+        return True
+
+    def drain(self, batch_size=100):
+        """
+        Claims a batch of due outbox entries and delivers them. Returns the numbers of the delivered and the failed ones.
+        """
+        delivered, failed = [], []
+        for entry in OutboxEntry.objects.claim(batch_size, self.lease):
+            try:
+                self.deliver(entry)
+                delivered.append(entry.pk)
+            except Exception:  # pylint: disable=broad-except
+                LOGGER.warning("Outbox entry %s of callback '%s' has failed on attempt %s. " % (entry.pk, entry.method, entry.attempts + 1), exc_info=True)
+                self.retry(entry, traceback.format_exc())
+                failed.append(entry.pk)
+        OutboxEntry.objects.filter(pk__in=delivered).delete()
+        return len(delivered), len(failed)
+
+    def deliver(self, entry):
+        callback = self.get_method(entry.method)
+        if not callback:
+            raise ImportError("Callback method '%s' can not be imported." % entry.method)
+        workflow_object = entry.content_type.get_object_for_this_type(pk=entry.object_id)
+        args, kwargs = deserialize_arguments(entry.arguments)
+        hook_metrics.measure(entry.hooking_cls, callback)(workflow_object, entry.field_name, *args, **kwargs)
+
+    def retry(self, entry, error):
+        entry.attempts += 1
+        entry.last_error = error
+        if entry.attempts >= self.max_attempts:
+            entry.available_at = None
+            LOGGER.error("Outbox entry %s of callback '%s' has run out of attempts. " % (entry.pk, entry.method))
+        else:
+            entry.available_at = timezone.now() + timedelta(seconds=min(self.backoff * 2 ** (entry.attempts - 1), self.max_backoff))
+        entry.save(update_fields=['attempts', 'last_error', 'available_at'])
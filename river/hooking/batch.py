@@ -0,0 +1,73 @@
+import logging
+import threading
+from collections import OrderedDict
+from functools import partial
+
+from django.db import transaction
+
+from river.hooking.backends.loader import callback_backend
+from river.hooking.hooking import Hooking
+from river.hooking.metrics import hook_metrics
+from river.utils.transactions import is_pending_on_commit
+
+__author__ = 'ahmetdal'
+
+LOGGER = logging.getLogger(__name__)
+
+
+class TransactionBatches(threading.local):
+    """
+    Collects the events of the batch hookings until the transaction they happen in is committed and then delivers
+    them with one call for each hooking class, field and callback. The events are dropped if the transaction is
+    rolled back. The events which happen in a savepoint that is rolled back are still delivered if the transaction
+    is committed, since the savepoint rollbacks can't be observed.
+    """
+
+    def __init__(self):
+        super(TransactionBatches, self).__init__()
+        self._batches = None
+        self._flush = None
+
+    def add(self, hooking_cls, field_name, callback, event):
+        pending = self._batches is not None and is_pending_on_commit(self._flush)
+        if not pending:
+            self._batches = OrderedDict()
+            self._flush = partial(self.flush, self._batches)
+        self._batches.setdefault((hooking_cls, field_name, callback), []).append(event)
+        if not pending:
+            transaction.on_commit(self._flush)
+
+    @staticmethod
+    def flush(batches):
+        for (hooking_cls, field_name, callback), events in batches.items():
+            try:
+                hook_metrics.measure(hooking_cls, callback)(events)
+            except Exception:  # pylint: disable=broad-except
+                LOGGER.exception("Batch callback '%s.%s' of hooking %s for field %s has failed with %s events. " % (
+                    callback.__module__, callback.__name__, hooking_cls.__name__, field_name, len(events)))
+
+
+transaction_batches = TransactionBatches()
+
+
+class BatchHooking(Hooking):
+    """
+    Hooking whose callbacks receive the events of a transaction all together once it is committed, instead of
+    being called for every workflow object. They can only be registered for all the objects of a workflow.
+    """
+
+    @classmethod
+    def get_event(cls, workflow_object, field_name, *args, **kwargs):
+        raise NotImplementedError()
+
+    @classmethod
+    def dispatch(cls, workflow_object, field_name, *args, **kwargs):
+        LOGGER.debug("Batch hooking %s is dispatched for workflow object %s and field name %s" % (cls.__name__, workflow_object, field_name))
+        kwargs.pop('signal', None)
+        kwargs.pop('sender', None)
+
+        callbacks = callback_backend.get_callbacks(cls, None, field_name, *args, **kwargs)
+        if callbacks:
+            event = cls.get_event(workflow_object, field_name, *args, **kwargs)
+            for callback in callbacks:
+                transaction_batches.add(cls, field_name, callback, event)
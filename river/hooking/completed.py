@@ -1,16 +1,29 @@
+from collections import namedtuple
+
+from river.hooking.batch import BatchHooking
 from river.hooking.hooking import Hooking
-from river.signals import pre_on_complete, post_on_complete
+from river.signals import pre_on_complete, post_on_complete, connect_hooking
 
 __author__ = 'ahmetdal'
 
+CompletedEvent = namedtuple('CompletedEvent', ['workflow_object', 'field_name'])
+
 
 class PreCompletedHooking(Hooking):
     pass
 
 
 class PostCompletedHooking(Hooking):
-    pass
+    deferrable = True
+
+
+class PostCompletedBatchHooking(BatchHooking):
+
+    @classmethod
+    def get_event(cls, workflow_object, field_name, *args, **kwargs):
+        return CompletedEvent(workflow_object, field_name)
 
 
-pre_on_complete.connect(PreCompletedHooking.dispatch)
-post_on_complete.connect(PostCompletedHooking.dispatch)
+connect_hooking(pre_on_complete, PreCompletedHooking)
+connect_hooking(post_on_complete, PostCompletedHooking)
+connect_hooking(post_on_complete, PostCompletedBatchHooking)
@@ -0,0 +1,121 @@
+import logging
+import os
+import sys
+import threading
+from functools import partial
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction, connections, close_old_connections
+
+try:
+    from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+except ImportError:  # pragma: no cover
+    ThreadPoolExecutor = ProcessPoolExecutor = None
+
+__author__ = 'ahmetdal'
+
+LOGGER = logging.getLogger(__name__)
+
+_worker_pid = None
+
+
+def close_inherited_connections():
+    """
+    Closes the database connections which a worker process inherits from its parent when it is forked, so that
+    it opens its own ones instead of sharing their sockets. It is run only once in a process.
+    """
+    global _worker_pid  # pylint: disable=global-statement
+    if _worker_pid != os.getpid():
+        _worker_pid = os.getpid()
+        connections.close_all()
+
+
+def run_callback(callback, *args, **kwargs):
+    close_old_connections()
+    try:
+        return callback(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+def run_callback_in_process(callback, *args, **kwargs):
+    close_inherited_connections()
+    return run_callback(callback, *args, **kwargs)
+
+
+class HookingExecutor(object):
+    """
+    Runs the callbacks right away, in the transaction that they are dispatched in.
+    """
+
+    def execute(self, callback, *args, **kwargs):  # pylint: disable=no-self-use
+        callback(*args, **kwargs)
+
+
+class OnCommitHookingExecutor(HookingExecutor):
+    """
+    Runs the callbacks of the deferrable hookings on a thread or a process pool once the transaction they are
+    dispatched in is committed. They are never run if it is rolled back. The callbacks which are not finished in
+    ``timeout`` seconds are logged and the ones which haven't even started are cancelled. A callback which is
+    already running can't be stopped. The callbacks and their arguments must be picklable with the process pool.
+
+    The database connections which the callbacks open on the workers are closed when they are finished, like the
+    ones of a request, and a worker process closes the connections inherited from its parent before its first one.
+    """
+
+    POOLS = {'thread': ThreadPoolExecutor, 'process': ProcessPoolExecutor}
+
+    def __init__(self, pool='thread', max_workers=None, timeout=None):
+        if pool in self.POOLS:
+            if self.POOLS[pool] is None:
+                raise ImproperlyConfigured("The %s pool of the hooking executor requires the 'futures' package on Python 2." % pool)
+            self.pool_cls = self.POOLS[pool]
+        else:
+            module, pool_cls = pool.rsplit('.', 1)
+            self.pool_cls = getattr(__import__(module, fromlist=[pool_cls]), pool_cls)
+        self.max_workers = max_workers
+        self.in_process = issubclass(self.pool_cls, ProcessPoolExecutor) if ProcessPoolExecutor else False
+        self.timeout = timeout
+        self._pool = None
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    kwargs = {}
+                    if self.in_process and sys.version_info >= (3, 7):
+                        kwargs['initializer'] = close_inherited_connections
+                    self._pool = self.pool_cls(max_workers=self.max_workers, **kwargs)
+        return self._pool
+
+    def execute(self, callback, *args, **kwargs):
+        transaction.on_commit(partial(self.submit, callback, *args, **kwargs))
+
+    def submit(self, callback, *args, **kwargs):
+        future = self.pool.submit(run_callback_in_process if self.in_process else run_callback, callback, *args, **kwargs)
+        future.add_done_callback(partial(self._on_done, callback))
+        if self.timeout is not None:
+            timer = threading.Timer(self.timeout, self._on_timeout, (callback, future))
+            timer.daemon = True
+            timer.start()
+            future.add_done_callback(lambda f: timer.cancel())
+        return future
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait)
+
+    @staticmethod
+    def _on_done(callback, future):
+        if not future.cancelled() and future.exception() is not None:
+            LOGGER.error("Callback '%s.%s' has failed. " % (callback.__module__, callback.__name__), exc_info=future.exception())
+
+    def _on_timeout(self, callback, future):
+        if future.cancel():
+            LOGGER.warning("Callback '%s.%s' is cancelled. Because it couldn't be started in %s seconds. " % (callback.__module__, callback.__name__, self.timeout))
+        elif not future.done():
+            LOGGER.warning("Callback '%s.%s' couldn't be finished in %s seconds. " % (callback.__module__, callback.__name__, self.timeout))
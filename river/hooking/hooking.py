@@ -1,7 +1,8 @@
 import logging
 from abc import abstractmethod
 
-from river.hooking.backends.loader import callback_backend
+from river.hooking.backends.loader import callback_backend, hooking_executor
+from river.hooking.metrics import hook_metrics
 
 __author__ = 'ahmetdal'
 
@@ -9,6 +10,8 @@ LOGGER = logging.getLogger(__name__)
 
 
 class Hooking(object):
+    # Whether the callbacks can be handed over to the configured hooking executor instead of being run right away.
+    deferrable = False
 
     @staticmethod
     def get_result_exclusions():
@@ -23,11 +26,20 @@ class Hooking(object):
         object_callbacks = callback_backend.get_callbacks(cls, workflow_object, field_name, *args, **kwargs)
         class_callbacks = callback_backend.get_callbacks(cls, None, field_name, *args, **kwargs)
         for callback in object_callbacks + class_callbacks:
+            callback = hook_metrics.measure(cls, callback)
             exclusions = cls.get_result_exclusions()
-            callback(workflow_object, field_name, *args, **{k: v for k, v in kwargs.items() if k not in exclusions})
+            callback_kwargs = {k: v for k, v in kwargs.items() if k not in exclusions}
+            if not cls.deferrable:
+                callback(workflow_object, field_name, *args, **callback_kwargs)
+            elif not callback_backend.defer(cls, callback, workflow_object, field_name, *args, **callback_kwargs):
+                hooking_executor.execute(callback, workflow_object, field_name, *args, **callback_kwargs)
             LOGGER.debug(
                 "Hooking %s for workflow object %s and for field %s is found as method %s with args %s and kwargs %s" % (cls.__name__, workflow_object, field_name, callback.__name__, args, kwargs))
 
+    @classmethod
+    def has_callbacks(cls):
+        return callback_backend.has_callbacks(cls)
+
     @classmethod
     def register(cls, callback, workflow_object, field_name, override=False, *args, **kwargs):
         callback_backend.register(cls, callback, workflow_object, field_name, override, *args, **kwargs)
@@ -36,6 +48,10 @@ class Hooking(object):
     def unregister(cls, workflow_object, field_name, *args, **kwargs):
         callback_backend.unregister(cls, workflow_object, field_name, *args, **kwargs)
 
+    @classmethod
+    def get_criteria(cls, *args, **kwargs):  # pylint: disable=unused-argument
+        return ()
+
     @classmethod
     def get_hash(cls, workflow_object, field_name, *args, **kwargs):
         return 'object' + (str(workflow_object.pk) if workflow_object else '') + '_field_name' + field_name
@@ -0,0 +1,185 @@
+import atexit
+import logging
+import os
+import threading
+from timeit import default_timer
+from uuid import uuid4
+
+from django.core.cache import caches
+
+from river.config import app_config
+
+__author__ = 'ahmetdal'
+
+LOGGER = logging.getLogger(__name__)
+
+PROCESS_CACHE_KEY = 'river_hook_metrics_process_%s'
+METRICS_CACHE_KEY = 'river_hook_metrics_%s'
+METRICS_TIMEOUT = 24 * 60 * 60
+PUBLISH_INTERVAL = 10
+MAX_PROCESSES = 1024
+
+
+def get_path(obj):
+    return obj if isinstance(obj, str) else '%s.%s' % (obj.__module__, obj.__name__)
+
+
+class MeasuredCallback(object):
+    """
+    Runs a callback on behalf of a hooking and records how long it takes. It looks like the callback it wraps
+    and it can be pickled as long as the callback can be.
+    """
+
+    def __init__(self, metrics, hooking_cls, callback):
+        self.metrics = metrics
+        self.hooking_cls = get_path(hooking_cls)
+        self.callback = callback
+        self.__module__ = callback.__module__
+        self.__name__ = callback.__name__
+
+    def __call__(self, *args, **kwargs):
+        started_at = default_timer()
+        failed = True
+        try:
+            result = self.callback(*args, **kwargs)
+            failed = False
+            return result
+        finally:
+            self.metrics.record(self.hooking_cls, get_path(self.callback), default_timer() - started_at, failed, args, kwargs)
+
+    def __reduce__(self):
+        return _measured_callback, (self.hooking_cls, self.callback)
+
+
+class HookMetrics(object):
+    """
+    Counts the invocations, the total and the maximum time and the failures of every callback by the hooking class
+    and the dotted path of the callback. It is enabled with ``RIVER_HOOK_METRICS_ENABLED``. The callbacks which take
+    at least ``RIVER_SLOW_HOOK_THRESHOLD`` seconds are logged with their arguments.
+
+    Every process keeps its own metrics and publishes them to the configured cache every ``PUBLISH_INTERVAL``
+    seconds, so that the metrics of all the processes sharing the cache can be reported together. A process claims
+    one of the ``MAX_PROCESSES`` slots in the cache with an atomic ``add`` to be found by the others, so that the
+    processes publishing at the same time don't overwrite each other.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._token = uuid4().hex
+        self._slot = None
+        self._published_at = None
+
+    def _forked(self):
+        """
+        Starts over with the metrics of a forked process, like a worker of a process pool, so that they are neither
+        counted twice nor overwrite the metrics of the parent process.
+        """
+        if self._pid != os.getpid():
+            with self._lock:
+                self._metrics = {}
+                self._pid = os.getpid()
+                self._token = uuid4().hex
+                self._slot = None
+                self._published_at = None
+
+    @property
+    def enabled(self):
+        return app_config.HOOK_METRICS_ENABLED or app_config.SLOW_HOOK_THRESHOLD is not None
+
+    def measure(self, hooking_cls, callback):
+        return MeasuredCallback(self, hooking_cls, callback) if self.enabled else callback
+
+    def record(self, hooking_cls, callback, elapsed, failed, args=(), kwargs=None):
+        if app_config.SLOW_HOOK_THRESHOLD is not None and elapsed >= app_config.SLOW_HOOK_THRESHOLD:
+            LOGGER.warning("Callback '%s' of hooking '%s' has taken %.3f seconds with args %s and kwargs %s. " % (callback, hooking_cls, elapsed, args, kwargs or {}))
+        if not app_config.HOOK_METRICS_ENABLED:
+            return
+
+        self._forked()
+        with self._lock:
+            metric = self._metrics.setdefault((hooking_cls, callback), [0, 0.0, 0.0, 0])
+            metric[0] += 1
+            metric[1] += elapsed
+            metric[2] = max(metric[2], elapsed)
+            metric[3] += 1 if failed else 0
+        if self._published_at is None or default_timer() - self._published_at >= PUBLISH_INTERVAL:
+            self.publish()
+
+    def publish(self):
+        self._forked()
+        with self._lock:
+            metrics = dict((key, list(metric)) for key, metric in self._metrics.items())
+            self._published_at = default_timer()
+        if not metrics:
+            return
+        cache = caches[app_config.CACHE_ALIAS]
+        cache.set(METRICS_CACHE_KEY % self._token, metrics, METRICS_TIMEOUT)
+        self._claim_slot(cache)
+
+    def _claim_slot(self, cache):
+        if self._slot is not None and cache.get(PROCESS_CACHE_KEY % self._slot) == self._token:
+            cache.set(PROCESS_CACHE_KEY % self._slot, self._token, METRICS_TIMEOUT)
+            return
+        start = int(self._token, 16) % MAX_PROCESSES
+        for offset in range(MAX_PROCESSES):
+            slot = (start + offset) % MAX_PROCESSES
+            if cache.add(PROCESS_CACHE_KEY % slot, self._token, METRICS_TIMEOUT):
+                self._slot = slot
+                return
+        self._slot = None
+        LOGGER.warning("Hook metrics of the process can not be reported. Because all the %s process slots are taken. " % MAX_PROCESSES)
+
+    @staticmethod
+    def _processes(cache):
+        return list(cache.get_many([PROCESS_CACHE_KEY % slot for slot in range(MAX_PROCESSES)]).values())
+
+    def stats(self):
+        """
+        Returns the metrics of the callbacks of all the processes, the slowest ones in total first.
+        """
+        self.publish()
+        cache = caches[app_config.CACHE_ALIAS]
+        processes = self._processes(cache)
+        merged = {}
+        for metrics in cache.get_many([METRICS_CACHE_KEY % token for token in processes]).values():
+            for key, (count, total, maximum, errors) in metrics.items():
+                metric = merged.setdefault(key, [0, 0.0, 0.0, 0])
+                metric[0] += count
+                metric[1] += total
+                metric[2] = max(metric[2], maximum)
+                metric[3] += errors
+        return sorted([
+            {
+                'hooking_cls': hooking_cls,
+                'callback': callback,
+                'count': count,
+                'total': total,
+                'max': maximum,
+                'average': total / count if count else 0.0,
+                'errors': errors,
+            } for (hooking_cls, callback), (count, total, maximum, errors) in merged.items()
+        ], key=lambda stat: stat['total'], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._metrics = {}
+        cache = caches[app_config.CACHE_ALIAS]
+        cache.delete_many([METRICS_CACHE_KEY % token for token in self._processes(cache)])
+        cache.delete_many([PROCESS_CACHE_KEY % slot for slot in range(MAX_PROCESSES)])
+
+
+hook_metrics = HookMetrics()
+
+
+def _measured_callback(hooking_cls, callback):
+    return MeasuredCallback(hook_metrics, hooking_cls, callback)
+
+
+@atexit.register
+def _publish_at_exit():
+    try:
+        hook_metrics.publish()
+    except Exception:  # pylint: disable=broad-except
+        LOGGER.debug("Hook metrics couldn't be published at exit. ", exc_info=True)
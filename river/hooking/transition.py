@@ -1,8 +1,13 @@
+from collections import namedtuple
+
+from river.hooking.batch import BatchHooking
 from river.hooking.hooking import Hooking
-from river.signals import pre_transition, post_transition
+from river.signals import pre_transition, post_transition, connect_hooking
 
 __author__ = 'ahmetdal'
 
+TransitionEvent = namedtuple('TransitionEvent', ['workflow_object', 'field_name', 'source_state', 'destination_state', 'transition_approval'])
+
 
 class TransitionHooking(Hooking):
 
@@ -15,14 +20,28 @@ class TransitionHooking(Hooking):
         return super(TransitionHooking, cls).get_hash(workflow_object, field_name) + ('source_state' + str(source_state.pk) if source_state else '') + (
             'destination_state' + str(destination_state.pk) if destination_state else '') + ('transition_approval' + str(transition_approval.pk) if transition_approval else '')
 
+    @classmethod
+    def get_criteria(cls, source_state=None, destination_state=None, transition_approval=None, *args, **kwargs):
+        return tuple(
+            (name, str(value.pk)) for name, value in [('source_state', source_state), ('destination_state', destination_state), ('transition_approval', transition_approval)] if value
+        )
+
 
 class PreTransitionHooking(TransitionHooking):
     pass
 
 
 class PostTransitionHooking(TransitionHooking):
-    pass
+    deferrable = True
+
+
+class PostTransitionBatchHooking(BatchHooking, TransitionHooking):
+
+    @classmethod
+    def get_event(cls, workflow_object, field_name, source_state=None, destination_state=None, transition_approval=None, *args, **kwargs):
+        return TransitionEvent(workflow_object, field_name, source_state, destination_state, transition_approval)
 
 
-pre_transition.connect(PreTransitionHooking.dispatch)
-post_transition.connect(PostTransitionHooking.dispatch)
+connect_hooking(pre_transition, PreTransitionHooking)
+connect_hooking(post_transition, PostTransitionHooking)
+connect_hooking(post_transition, PostTransitionBatchHooking)
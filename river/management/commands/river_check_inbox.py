@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from river.models import Workflow, InboxEntry
+
+__author__ = 'ahmetdal'
+
+
+class Command(BaseCommand):
+    help = 'Checks whether the materialized approval inbox is consistent with the transition approvals.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('workflow_ids', nargs='*', type=int, help='Ids of the workflows to check the inbox of.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of workflow objects to process at once.')
+
+    def handle(self, *args, **options):
+        workflows = Workflow.objects.select_related('content_type')
+        if options['workflow_ids']:
+            workflows = workflows.filter(pk__in=options['workflow_ids'])
+
+        inconsistent_workflows = []
+        for workflow in workflows:
+            missing, stale = InboxEntry.objects.check_consistency(workflow, batch_size=options['batch_size'])
+            if missing or stale:
+                inconsistent_workflows.append(workflow.pk)
+                self.stderr.write("Inbox of workflow %s has %s missing and %s stale entries." % (workflow.pk, len(missing), len(stale)))
+            else:
+                self.stdout.write("Inbox of workflow %s is consistent." % workflow.pk)
+
+        if inconsistent_workflows:
+            raise CommandError("Inbox is inconsistent for the workflows %s. Run river_rebuild_inbox to fix it." % ', '.join(str(pk) for pk in inconsistent_workflows))
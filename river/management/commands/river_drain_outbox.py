@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from river.hooking.backends.loader import callback_backend
+from river.hooking.backends.outbox import OutboxHookingBackend
+
+__author__ = 'ahmetdal'
+
+
+class Command(BaseCommand):
+    help = 'Delivers the callbacks in the hooking outbox. It drains the outbox and exits unless it is asked to keep polling.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Number of outbox entries to claim at once.')
+        parser.add_argument('--loop', action='store_true', default=False, help='Keep polling the outbox after it is drained.')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds to wait before polling a drained outbox again.')
+
+    def handle(self, *args, **options):
+        if not isinstance(callback_backend, OutboxHookingBackend):
+            raise CommandError("RIVER_HOOKING_BACKEND must be river.hooking.backends.outbox.OutboxHookingBackend to drain the outbox.")
+
+        while True:
+            delivered, failed = callback_backend.drain(batch_size=options['batch_size'])
+            if delivered or failed:
+                self.stdout.write("%s outbox entries are delivered and %s are failed." % (delivered, failed))
+            elif options['loop']:
+                time.sleep(options['interval'])
+            else:
+                break
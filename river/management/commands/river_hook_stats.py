@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from river.hooking.metrics import hook_metrics
+
+__author__ = 'ahmetdal'
+
+
+class Command(BaseCommand):
+    help = 'Reports how many times the hooking callbacks are run, how long they take and how many times they fail.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=None, help='Number of the slowest callbacks in total to report.')
+        parser.add_argument('--reset', action='store_true', default=False, help='Reset the metrics after they are reported.')
+
+    def handle(self, *args, **options):
+        stats = hook_metrics.stats()[:options['limit']]
+        if not stats:
+            self.stdout.write("There are no hook metrics. Make sure RIVER_HOOK_METRICS_ENABLED is set.")
+        for stat in stats:
+            self.stdout.write("%(callback)s (%(hooking_cls)s): count=%(count)s total=%(total).3fs average=%(average).3fs max=%(max).3fs errors=%(errors)s" % stat)
+
+        if options['reset']:
+            hook_metrics.reset()
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from river.models import Workflow, InboxEntry
+
+__author__ = 'ahmetdal'
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the materialized approval inbox of the given workflows or of all the workflows.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('workflow_ids', nargs='*', type=int, help='Ids of the workflows to rebuild the inbox of.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of workflow objects to process at once.')
+
+    def handle(self, *args, **options):
+        workflows = Workflow.objects.select_related('content_type')
+        if options['workflow_ids']:
+            workflows = workflows.filter(pk__in=options['workflow_ids'])
+
+        for workflow in workflows:
+            with transaction.atomic():
+                number_of_entries = InboxEntry.objects.rebuild(workflow, batch_size=options['batch_size'])
+            self.stdout.write("Inbox of workflow %s is rebuilt with %s entries." % (workflow.pk, number_of_entries))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from river.config import app_config
+from river.models import Workflow, TransitionApprovalMeta
+
+__author__ = 'ahmetdal'
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the parents of the transition approval metas of the given workflows.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('workflows', nargs='*', help='Workflows to rebuild as app_label.model.field_name or their ids. All the workflows are rebuilt when none is given.')
+
+    def handle(self, *args, **options):
+        workflows = [self.get_workflow(workflow) for workflow in options['workflows']] or Workflow.objects.all()
+        for workflow in workflows:
+            number_of_parents = TransitionApprovalMeta.objects.rebuild_parents(workflow)
+            self.stdout.write("%s parent relations are rebuilt for workflow %s." % (number_of_parents, workflow))
+
+    @staticmethod
+    def get_workflow(workflow):
+        try:
+            if workflow.isdigit():
+                return Workflow.objects.get(pk=workflow)
+            app_label, model, field_name = workflow.split('.')
+            content_type = app_config.CONTENT_TYPE_CLASS.objects.get_by_natural_key(app_label, model.lower())
+            return Workflow.objects.get(content_type=content_type, field_name=field_name)
+        except (ValueError, Workflow.DoesNotExist, app_config.CONTENT_TYPE_CLASS.DoesNotExist):
+            raise CommandError("Workflow '%s' doesn't exist. It should be given as app_label.model.field_name or its id. " % workflow)
@@ -0,0 +1,49 @@
+import uuid
+
+from django.db import migrations
+
+import river.models.fields.objectid
+from river.config import app_config
+
+
+def normalize_object_ids(apps, schema_editor):
+    """
+    Fails before the type of the column is changed when any of the existing object ids doesn't fit in it, instead of
+    losing them. UUIDs are kept as 32 digit hex strings on the databases without a native UUID type. The ones which
+    are stored as char before are re-formatted so that they are still readable after the type of the column is changed.
+    """
+    if app_config.OBJECT_ID_TYPE == 'char':
+        return
+
+    convert = int if app_config.OBJECT_ID_TYPE == 'integer' else uuid.UUID
+    reformat = app_config.OBJECT_ID_TYPE == 'uuid' and not schema_editor.connection.features.has_native_uuid_field
+    for model_name in ['TransitionApproval', 'InboxEntry']:
+        model = apps.get_model('river', model_name)
+        for pk, object_id in model.objects.using(schema_editor.connection.alias).values_list('pk', 'object_id'):
+            try:
+                converted = convert(object_id)
+            except ValueError:
+                raise ValueError("Object id '%s' of %s %s is not a valid %s. Either set RIVER_OBJECT_ID_TYPE to 'char' or fix the object id before migrating. " % (object_id, model_name, pk, app_config.OBJECT_ID_TYPE))
+            if reformat:
+                model.objects.using(schema_editor.connection.alias).filter(pk=pk).update(object_id=converted.hex)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('river', '0002_inboxentry'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_object_ids, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='transitionapproval',
+            name='object_id',
+            field=river.models.fields.objectid.object_id_field(verbose_name='Related Object'),
+        ),
+        migrations.AlterField(
+            model_name='inboxentry',
+            name='object_id',
+            field=river.models.fields.objectid.object_id_field(verbose_name='Related Object'),
+        ),
+    ]
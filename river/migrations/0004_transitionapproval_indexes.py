@@ -0,0 +1,25 @@
+# Generated by Django 2.2.28 on 2026-10-16 20:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('river', '0003_typed_object_id'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transitionapproval',
+            index=models.Index(fields=['content_type', 'object_id', 'workflow', 'source_state', 'destination_state'], name='river_approval_object_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transitionapproval',
+            index=models.Index(fields=['content_type', 'object_id', 'transaction_date'], name='river_approval_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transitionapproval',
+            index=models.Index(fields=['workflow', 'status', 'object_id', 'source_state', 'destination_state'], name='river_approval_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 2.2.28 on 2026-10-16 20:54
+
+import re
+
+from django.db import migrations, models
+
+CRITERIA = re.compile(r'(source_state|destination_state|transition_approval)(\d+)')
+HASH = re.compile(r'^object(?P<object_id>.*?)_field_name(?P<field_name>.*?)(?P<criteria>(?:(?:source_state|destination_state|transition_approval)\d+)*)$')
+
+
+def fill_dispatch_keys(apps, schema_editor):
+    """
+    Derives the dispatch keys of the existing callbacks from their hashes. The callbacks whose hashes can not be
+    parsed keep an empty field name and get their keys once they are registered again.
+    """
+    callback_model = apps.get_model('river', 'Callback')
+    for callback in callback_model.objects.using(schema_editor.connection.alias).all():
+        prefix = callback.hooking_cls + '_'
+        match = HASH.match(callback.hash[len(prefix):]) if callback.hash.startswith(prefix) else None
+        if match:
+            callback.object_id = match.group('object_id') or None
+            callback.field_name = match.group('field_name')
+            callback.criteria = '&'.join('%s=%s' % item for item in sorted(CRITERIA.findall(match.group('criteria'))))
+            callback.save(update_fields=['object_id', 'field_name', 'criteria'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('river', '0004_transitionapproval_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='callback',
+            name='criteria',
+            field=models.CharField(blank=True, default='', max_length=200, verbose_name='Criteria'),
+        ),
+        migrations.AddField(
+            model_name='callback',
+            name='field_name',
+            field=models.CharField(blank=True, max_length=200, null=True, verbose_name='Field Name'),
+        ),
+        migrations.AddField(
+            model_name='callback',
+            name='object_id',
+            field=models.CharField(blank=True, max_length=50, null=True, verbose_name='Related Object'),
+        ),
+        migrations.AddIndex(
+            model_name='callback',
+            index=models.Index(fields=['hooking_cls', 'field_name', 'object_id'], name='river_callback_dispatch_idx'),
+        ),
+        migrations.RunPython(fill_dispatch_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 2.2.28 on 2026-10-16 20:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+import river.models.fields.objectid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('river', '0005_callback_dispatch_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hooking_cls', models.CharField(max_length=200, verbose_name='HookingClass')),
+                ('method', models.CharField(max_length=200, verbose_name='Callback Method')),
+                ('object_id', river.models.fields.objectid.object_id_field(verbose_name='Related Object')),
+                ('field_name', models.CharField(max_length=200, verbose_name='Field Name')),
+                ('arguments', models.TextField(default='{}', verbose_name='Arguments')),
+                ('date_created', models.DateTimeField(auto_now_add=True, verbose_name='Date Created')),
+                ('available_at', models.DateTimeField(blank=True, default=django.utils.timezone.now, null=True, verbose_name='Available At')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Attempts')),
+                ('last_error', models.TextField(blank=True, null=True, verbose_name='Last Error')),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.ContentType', verbose_name='Content Type')),
+            ],
+            options={
+                'verbose_name': 'Outbox Entry',
+                'verbose_name_plural': 'Outbox Entries',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='outboxentry',
+            index=models.Index(fields=['available_at'], name='river_outbox_available_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 2.2.28 on 2026-10-16 21:16
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('river', '0006_outboxentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransitionApprovalHistory',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('transaction_date', models.DateTimeField(blank=True, null=True, verbose_name='Transaction Date')),
+                ('status', models.IntegerField(choices=[(0, 'Pending'), (1, 'Approved')], default=0, verbose_name='Status')),
+                ('skipped', models.BooleanField(default=False, verbose_name='Skip')),
+                ('date_created', models.DateTimeField(auto_now_add=True, verbose_name='Date Created')),
+                ('previous', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='river.TransitionApproval', verbose_name='Previous Transition')),
+                ('transactioner', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Transactioner')),
+                ('transition_approval', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='history', to='river.TransitionApproval', verbose_name='Transition Approval')),
+            ],
+            options={
+                'verbose_name': 'Transition Approval History',
+                'verbose_name_plural': 'Transition Approval Histories',
+            },
+        ),
+    ]
@@ -6,3 +6,6 @@ from .state import *
 from .workflow import *
 from .transitionapprovalmeta import *
 from .transitionapproval import *
+from .transitionapprovalhistory import *
+from .inbox import *
+from .outbox import *
@@ -11,8 +11,14 @@ class Callback(BaseModel):
         app_label = 'river'
         verbose_name = _("Callback")
         verbose_name_plural = _("Callbacks")
+        indexes = [
+            models.Index(fields=['hooking_cls', 'field_name', 'object_id'], name='river_callback_dispatch_idx'),
+        ]
 
     hash = models.CharField(_('Hash'), max_length=200, unique=True)
     method = models.CharField(_('Callback Method'), max_length=200)
     hooking_cls = models.CharField(_('HookingClass'), max_length=200)
     enabled = models.BooleanField(_('Enabled'), default=True)
+    object_id = models.CharField(_('Related Object'), max_length=50, null=True, blank=True)
+    field_name = models.CharField(_('Field Name'), max_length=200, null=True, blank=True)
+    criteria = models.CharField(_('Criteria'), max_length=200, blank=True, default='')
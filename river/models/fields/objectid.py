@@ -0,0 +1,45 @@
+from django.db import models
+from django.db.models import F
+from django.db.models.functions import Cast
+
+from river.config import app_config
+
+__author__ = 'ahmetdal'
+
+OBJECT_ID_FIELDS = {
+    'integer': lambda **kwargs: models.BigIntegerField(**kwargs),
+    'uuid': lambda **kwargs: models.UUIDField(**kwargs),
+    'char': lambda **kwargs: models.CharField(max_length=50, **kwargs),
+}
+
+_prototypes = {}
+
+
+def object_id_field(**kwargs):
+    """
+    Builds the column that keeps the primary keys of the workflow objects. Its type is chosen with
+    ``RIVER_OBJECT_ID_TYPE`` which is one of ``integer``, ``uuid`` or ``char``.
+    """
+    try:
+        return OBJECT_ID_FIELDS[app_config.OBJECT_ID_TYPE](**kwargs)
+    except KeyError:
+        raise ValueError("RIVER_OBJECT_ID_TYPE must be one of %s, not %s" % (', '.join(sorted(OBJECT_ID_FIELDS)), app_config.OBJECT_ID_TYPE))
+
+
+def to_object_id(workflow_object):
+    """
+    Converts a workflow object or its primary key into the python type of the object id column so that it can be
+    compared with the object ids fetched from the database.
+    """
+    if app_config.OBJECT_ID_TYPE not in _prototypes:
+        _prototypes[app_config.OBJECT_ID_TYPE] = object_id_field()
+    return _prototypes[app_config.OBJECT_ID_TYPE].to_python(getattr(workflow_object, 'pk', workflow_object))
+
+
+def object_id_expression(name='pk'):
+    """
+    Expression of the given primary key column in the type of the object id column. Only the char object ids need
+    a cast; the other ones are compared natively so that the indexes stay usable.
+    """
+    field = object_id_field()
+    return Cast(name, field) if isinstance(field, models.CharField) else F(name)
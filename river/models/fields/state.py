@@ -1,12 +1,14 @@
 import logging
+import threading
 
 from django.db.models import CASCADE
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_save, pre_delete, post_delete
 
+from river.core.classworkflowobject import OBJECT_HOOKINGS
 from river.core.riverobject import RiverObject
 from river.core.workflowregistry import workflow_registry
-from river.hooking.completed import PreCompletedHooking, PostCompletedHooking
-from river.hooking.transition import PostTransitionHooking, PreTransitionHooking
+from river.hooking.backends.loader import callback_backend
+from river.utils.bulk import batches
 
 try:
     from django.contrib.contenttypes.fields import GenericRelation
@@ -44,7 +46,7 @@ class StateField(models.ForeignKey):
     def contribute_to_class(self, cls, name):
         @classproperty
         def river(_self):
-            return RiverObject(_self, name)
+            return RiverObject.of(_self, name)
 
         self.field_name = name
 
@@ -57,6 +59,7 @@ class StateField(models.ForeignKey):
 
         if id(cls) not in workflow_registry.workflows:
             post_save.connect(_on_workflow_object_saved, self.model, False, dispatch_uid='%s_%s_riverstatefield_post' % (self.model, name))
+            pre_delete.connect(_on_workflow_object_deleting, self.model, False, dispatch_uid='%s_%s_riverstatefield_pre' % (self.model, name))
             post_delete.connect(_on_workflow_object_deleted, self.model, False, dispatch_uid='%s_%s_riverstatefield_post' % (self.model, name))
 
         workflow_registry.add(self.field_name, cls)
@@ -67,19 +70,46 @@ class StateField(models.ForeignKey):
             cls.add_to_class(key, value)
 
 
-def _on_workflow_object_saved(sender, instance, created, *args, **kwargs):
+def _on_workflow_object_saved(sender, instance, created, raw=False, *args, **kwargs):
+    if raw:
+        return
     for instance_workflow in instance.river.all(instance.__class__):
+        if getattr(instance, instance_workflow.field_name + '_id') is None:
+            init_state = getattr(instance.__class__.river, instance_workflow.name).initial_state
+            if init_state:
+                instance_workflow.set_state(init_state)
+                instance.save()
         if created:
             instance_workflow.initialize_approvals()
-        if not instance_workflow.get_state():
-            init_state = getattr(instance.__class__.river, instance_workflow.name).initial_state
-            instance_workflow.set_state(init_state)
-            instance.save()
 
 
-def _on_workflow_object_deleted(sender, instance, *args, **kwargs):
-    for field_name in instance.river.all_field_names(instance.__class__):
-        PreCompletedHooking.unregister(instance, field_name, *args, **kwargs)
-        PostCompletedHooking.unregister(instance, field_name, *args, **kwargs)
-        PreTransitionHooking.unregister(instance, field_name, *args, **kwargs)
-        PostTransitionHooking.unregister(instance, field_name, *args, **kwargs)
+class DeletedWorkflowObjects(threading.local):
+    """
+    Collects the primary keys of the workflow objects that are about to be deleted. Django sends ``pre_delete`` for
+    all the objects of a deletion before it sends any ``post_delete``, so the callbacks of all of them, even of a
+    whole queryset, are unregistered at once when the first one is deleted.
+    """
+
+    def __init__(self):
+        super(DeletedWorkflowObjects, self).__init__()
+        self.pks = {}
+
+
+deleted_workflow_objects = DeletedWorkflowObjects()
+
+
+def _on_workflow_object_deleting(sender, instance, *args, **kwargs):
+    deleted_workflow_objects.pks.setdefault(sender, set()).add(instance.pk)
+
+
+def _on_workflow_object_deleted(sender, instance, using=None, *args, **kwargs):
+    pks = deleted_workflow_objects.pks.pop(sender, None)
+    if not pks:
+        return
+    field_names = instance.river.all_field_names(sender)
+    for workflow_object_ids in batches(list(pks), 500):
+        # A deletion which has failed after its pre_delete signals leaves its objects behind, they are skipped.
+        remaining = set(sender._default_manager.using(using).filter(pk__in=workflow_object_ids).values_list('pk', flat=True))  # pylint: disable=protected-access
+        workflow_object_ids = [pk for pk in workflow_object_ids if pk not in remaining]
+        if workflow_object_ids:
+            callback_backend.unregister_objects(OBJECT_HOOKINGS, workflow_object_ids, field_names)
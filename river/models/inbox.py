@@ -0,0 +1,40 @@
+from django.db import models
+from django.db.models import CASCADE
+from django.utils.translation import ugettext_lazy as _
+
+from river.config import app_config
+from river.models import TransitionApproval, Workflow
+from river.models.fields.objectid import object_id_field
+from river.models.managers.inbox import InboxEntryManager
+
+__author__ = 'ahmetdal'
+
+
+class InboxEntry(models.Model):
+    """
+    Materialized authorization of an available transition approval. There is one entry for each combination of the
+    permissions and the groups of the approval so that a user is entitled to an approval when any of its entries
+    matches the user.
+    """
+
+    class Meta:
+        app_label = 'river'
+        verbose_name = _("Inbox Entry")
+        verbose_name_plural = _("Inbox Entries")
+        indexes = [
+            models.Index(fields=['workflow', 'object_id'], name='river_inbox_object_idx'),
+            models.Index(fields=['workflow', 'permission', 'object_id'], name='river_inbox_permission_idx'),
+            models.Index(fields=['workflow', 'group', 'object_id'], name='river_inbox_group_idx'),
+            models.Index(fields=['workflow', 'user', 'object_id'], name='river_inbox_user_idx'),
+        ]
+
+    objects = InboxEntryManager()
+
+    workflow = models.ForeignKey(Workflow, verbose_name=_("Workflow"), related_name='inbox_entries', on_delete=CASCADE)
+    content_type = models.ForeignKey(app_config.CONTENT_TYPE_CLASS, verbose_name=_('Content Type'), on_delete=CASCADE)
+    object_id = object_id_field(verbose_name=_('Related Object'))
+    transition_approval = models.ForeignKey(TransitionApproval, verbose_name=_("Transition Approval"), related_name='inbox_entries', on_delete=CASCADE)
+
+    user = models.ForeignKey(app_config.USER_CLASS, verbose_name=_('User'), null=True, blank=True, on_delete=CASCADE)
+    permission = models.ForeignKey(app_config.PERMISSION_CLASS, verbose_name=_('Permission'), null=True, blank=True, on_delete=CASCADE)
+    group = models.ForeignKey(app_config.GROUP_CLASS, verbose_name=_('Group'), null=True, blank=True, on_delete=CASCADE)
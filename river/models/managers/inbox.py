@@ -0,0 +1,107 @@
+from django.db import models
+
+from river.config import app_config
+from river.models.fields.objectid import to_object_id
+from river.models.transitionapproval import TransitionApproval, PENDING
+from river.utils.bulk import batches
+
+__author__ = 'ahmetdal'
+
+
+class InboxEntryManager(models.Manager):
+    def refresh(self, workflow, object_ids):
+        """
+        Re-materializes the inbox entries of the given workflow objects. It does nothing unless the inbox is enabled
+        with ``RIVER_INBOX_ENABLED``.
+        """
+        if app_config.INBOX_ENABLED and workflow and object_ids:
+            object_ids = [to_object_id(object_id) for object_id in object_ids]
+            self.filter(workflow=workflow, object_id__in=object_ids).delete()
+            self.bulk_create(self._entries(workflow, object_ids))
+
+    def rebuild(self, workflow, batch_size=1000):
+        self.filter(workflow=workflow).delete()
+        number_of_entries = 0
+        for object_ids in batches(workflow.content_type.model_class().objects.all(), batch_size):
+            entries = self._entries(workflow, object_ids)
+            self.bulk_create(entries)
+            number_of_entries += len(entries)
+        return number_of_entries
+
+    def check_consistency(self, workflow, batch_size=1000):
+        """
+        Compares the inbox of the workflow with what it should be. Returns the missing and the stale entries as
+        sets of (transition approval id, user id, permission id, group id).
+        """
+        missing, stale = set(), set()
+        model_class = workflow.content_type.model_class()
+        for object_ids in batches(model_class.objects.all(), batch_size):
+            expected = set(self._key(entry) for entry in self._entries(workflow, object_ids))
+            actual = set(self._actual(workflow, object_ids))
+            missing |= expected - actual
+            stale |= actual - expected
+
+        object_ids = list(self.filter(workflow=workflow).values_list('object_id', flat=True).distinct().order_by('object_id'))
+        for orphan_ids in batches(object_ids, batch_size):
+            existing_ids = set(to_object_id(pk) for pk in model_class.objects.filter(pk__in=orphan_ids).values_list('pk', flat=True))
+            stale |= set(self._actual(workflow, [object_id for object_id in orphan_ids if object_id not in existing_ids]))
+        return missing, stale
+
+    def _actual(self, workflow, object_ids):
+        return self.filter(
+            workflow=workflow, object_id__in=object_ids
+        ).values_list('transition_approval_id', 'user_id', 'permission_id', 'group_id')
+
+    @staticmethod
+    def _key(entry):
+        return entry.transition_approval_id, entry.user_id, entry.permission_id, entry.group_id
+
+    def _entries(self, workflow, object_ids):
+        object_ids = [to_object_id(object_id) for object_id in object_ids]
+        states = dict(
+            (to_object_id(pk), state_id) for pk, state_id in workflow.content_type.model_class().objects.filter(pk__in=object_ids).values_list('pk', workflow.field_name)
+        )
+
+        approvals = list(TransitionApproval.objects.filter(
+            workflow=workflow, object_id__in=object_ids, status=PENDING, skipped=False, enabled=True
+        ).values_list('pk', 'object_id', 'source_state_id', 'destination_state_id', 'priority', 'transactioner_id'))
+
+        min_priorities = {}
+        for _, object_id, source_state_id, destination_state_id, priority, _ in approvals:
+            transition = (object_id, source_state_id, destination_state_id)
+            min_priorities[transition] = min(priority, min_priorities.get(transition, priority))
+
+        approvals = [
+            approval for approval in approvals
+            if states.get(approval[1]) == approval[2] and min_priorities[approval[1:4]] == approval[4]
+        ]
+        if not approvals:
+            return []
+
+        approval_ids = [approval[0] for approval in approvals]
+        permissions = self._authorizations(TransitionApproval.permissions, approval_ids)
+        groups = self._authorizations(TransitionApproval.groups, approval_ids)
+
+        return [
+            self.model(
+                workflow=workflow,
+                content_type_id=workflow.content_type_id,
+                object_id=object_id,
+                transition_approval_id=pk,
+                user_id=transactioner_id,
+                permission_id=permission_id,
+                group_id=group_id
+            )
+            for pk, object_id, _, _, _, transactioner_id in approvals
+            for permission_id in permissions.get(pk, [None])
+            for group_id in groups.get(pk, [None])
+        ]
+
+    @staticmethod
+    def _authorizations(many_to_many, approval_ids):
+        field = many_to_many.field
+        source, target = field.m2m_field_name(), field.m2m_reverse_field_name()
+        authorizations = {}
+        for approval_id, target_id in many_to_many.through.objects.filter(**{source + '__in': approval_ids}).values_list(source + '_id', target + '_id'):
+            authorizations.setdefault(approval_id, []).append(target_id)
+        return authorizations
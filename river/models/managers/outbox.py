@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.db import models, transaction, connection
+from django.utils import timezone
+
+__author__ = 'ahmetdal'
+
+
+class OutboxEntryManager(models.Manager):
+    def claim(self, batch_size, lease):
+        """
+        Claims the due entries for ``lease`` seconds by moving their due dates forward. An entry is only claimed by one
+        worker even without row locks since it is moved only if it is still due. The claims of a worker which crashes
+        run out after the lease and the entries are claimed again.
+        """
+        now = timezone.now()
+        claimed_until = now + timedelta(seconds=lease)
+        skip_locked = {'skip_locked': True} if connection.features.has_select_for_update_skip_locked else {}
+        with transaction.atomic():
+            pks = list(self.select_for_update(**skip_locked).filter(available_at__lte=now).order_by('available_at', 'pk').values_list('pk', flat=True)[:batch_size])
+            self.filter(pk__in=pks, available_at__lte=now).update(available_at=claimed_until)
+        return list(self.filter(pk__in=pks, available_at=claimed_until).select_related('content_type').order_by('pk'))
@@ -1,6 +1,13 @@
+import operator
+from functools import reduce
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
 from django_cte import CTEManager
 
 from river.config import app_config
+from river.utils.bulk import bulk_add
 
 __author__ = 'ahmetdal'
 
@@ -25,6 +32,121 @@ class TransitionApprovalManager(CTEManager):
 
         return super(TransitionApprovalManager, self).update_or_create(*args, **kwarg)
 
+    @transaction.atomic
     def skip(self, *args, **kwargs):
-        for approval in self.filter(*args, **kwargs):
-            approval.skip()
+        """
+        Skips the matching approvals all together with a fixed number of queries. It does what calling ``skip`` on
+        every one of them in the order of their primary keys does; the skips are played on the approvals of the
+        affected workflow objects in memory, including the approvals which are linked to the downstream ones, and
+        the outcome is written with bulk inserts and updates.
+        """
+        from river.models.inbox import InboxEntry
+        from river.models.transitionapproval import PENDING
+
+        selected = list(self.filter(*args, **kwargs).order_by('pk'))
+        if not selected:
+            return
+
+        object_ids = {}
+        for approval in selected:
+            object_ids.setdefault((approval.content_type_id, approval.workflow_id), set()).add(approval.object_id)
+        approvals = list(self.get_queryset().filter(reduce(operator.or_, [
+            Q(content_type_id=content_type_id, workflow_id=workflow_id, object_id__in=ids) for (content_type_id, workflow_id), ids in object_ids.items()
+        ])).select_related('workflow'))
+        approvals_by_pk = dict((approval.pk, approval) for approval in approvals)
+        approvals_of = {}
+        for approval in approvals:
+            approvals_of.setdefault((approval.content_type_id, approval.object_id, approval.workflow_id), []).append(approval)
+
+        # The related ids of every approval by many to many field, keyed by the identity of the approvals since the
+        # linked approvals have no primary keys until they are inserted.
+        related, existing_pairs = {}, {}
+        for name in ['permissions', 'groups', 'skipped_from']:
+            field = getattr(self.model, name).field
+            source, target = field.m2m_field_name(), field.m2m_reverse_field_name()
+            existing_pairs[name] = set(getattr(self.model, name).through.objects.filter(**{source + '__in': list(approvals_by_pk)}).values_list(source + '_id', target + '_id'))
+            related[name] = dict((id(approval), []) for approval in approvals)
+            for source_id, target_id in existing_pairs[name]:
+                related[name][id(approvals_by_pk[source_id])].append(target_id)
+
+        initially_skipped = set(approval.pk for approval in approvals if approval.skipped)
+        skipped, downstream_skipped, created = [], [], []
+
+        def downstream_of(approval):
+            return [
+                downstream_approval for downstream_approval in approvals_of[(approval.content_type_id, approval.object_id, approval.workflow_id)]
+                if downstream_approval.source_state_id == approval.destination_state_id and not downstream_approval.skipped
+            ]
+
+        def link_to_downstream(approval):
+            siblings = approvals_of[(approval.content_type_id, approval.object_id, approval.workflow_id)]
+            for downstream_approval in downstream_of(approval):
+                key = (approval.source_state_id, downstream_approval.destination_state_id, approval.priority, approval.meta_id, downstream_approval.transactioner_id, PENDING)
+                linked = next((
+                    sibling for sibling in siblings
+                    if (sibling.source_state_id, sibling.destination_state_id, sibling.priority, sibling.meta_id, sibling.transactioner_id, sibling.status) == key
+                ), None)
+                if linked is None:
+                    linked = self.model(
+                        content_type_id=approval.content_type_id, object_id=approval.object_id, workflow_id=approval.workflow_id,
+                        source_state_id=approval.source_state_id, destination_state_id=downstream_approval.destination_state_id,
+                        priority=approval.priority, meta_id=approval.meta_id, transactioner_id=downstream_approval.transactioner_id, status=PENDING
+                    )
+                    siblings.append(linked)
+                    created.append(linked)
+                    for name in related:
+                        related[name][id(linked)] = []
+                related['skipped_from'][id(linked)].append(approval)
+                related['skipped_from'][id(approval)].append(linked)
+                related['permissions'][id(linked)].extend(related['permissions'][id(downstream_approval)])
+                related['groups'][id(linked)].extend(related['groups'][id(downstream_approval)])
+
+        for approval in [approvals_by_pk[approval.pk] for approval in selected]:
+            if approval.pk in initially_skipped:
+                continue
+            approval.skipped = True
+            skipped.append(approval)
+
+            peers = [
+                peer for peer in approvals_of[(approval.content_type_id, approval.object_id, approval.workflow_id)]
+                if peer is not approval and (peer.source_state_id, peer.destination_state_id) == (approval.source_state_id, approval.destination_state_id)
+            ]
+            if all(peer.skipped for peer in peers):
+                # Linking the skipped peers too is a no-op, since they share their source state with the approval.
+                link_to_downstream(approval)
+
+            for downstream_approval in downstream_of(approval):
+                downstream_approval.skipped = True
+                downstream_skipped.append(downstream_approval)
+
+        self._bulk_create_links(created, approvals_by_pk)
+        self.get_queryset().filter(pk__in=[approval.pk for approval in skipped]).update(skipped=True, date_updated=timezone.now())
+        self.get_queryset().filter(pk__in=[approval.pk for approval in downstream_skipped if approval.pk in approvals_by_pk]).update(skipped=True)
+
+        everything = approvals + created
+        for name in related:
+            bulk_add(getattr(self.model, name), set(
+                (approval.pk, getattr(target, 'pk', target)) for approval in everything for target in related[name][id(approval)]
+            ) - existing_pairs[name])
+
+        object_ids_of = {}
+        for approval in skipped:
+            object_ids_of.setdefault(approval.workflow_id, (approval.workflow, set()))[1].add(approval.object_id)
+        for workflow, ids in object_ids_of.values():
+            InboxEntry.objects.refresh(workflow, list(ids))
+
+    def _bulk_create_links(self, created, approvals_by_pk):
+        if not created:
+            return
+        self.bulk_create(created)
+        if any(approval.pk is None for approval in created):
+            # The database backends which don't return the primary keys of the inserted rows, like SQLite.
+            def key_of(approval):
+                return (approval.content_type_id, approval.object_id, approval.workflow_id, approval.source_state_id, approval.destination_state_id,
+                        approval.priority, approval.meta_id, approval.transactioner_id, approval.status)
+
+            inserted = dict((key_of(approval), approval.pk) for approval in self.get_queryset().filter(reduce(operator.or_, [
+                Q(content_type_id=approval.content_type_id, workflow_id=approval.workflow_id, object_id=approval.object_id) for approval in created
+            ])).exclude(pk__in=list(approvals_by_pk)))
+            for approval in created:
+                approval.pk = inserted[key_of(approval)]
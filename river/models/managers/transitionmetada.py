@@ -1,8 +1,42 @@
-from django.db import models
+from django.db import models, transaction
+
+from river.utils.bulk import bulk_add
 
 __author__ = 'ahmetdal'
 
 
+def get_parents(metas):
+    """
+    Returns the (meta id, parent meta id) pairs of the given (meta id, source state id, destination state id) triples
+    of a workflow. The parents of a meta are the other metas whose destination state is its source state.
+    """
+    metas = list(metas)
+    metas_by_destination = {}
+    for meta_id, _, destination_state_id in metas:
+        metas_by_destination.setdefault(destination_state_id, []).append(meta_id)
+    return [
+        (meta_id, parent_id)
+        for meta_id, source_state_id, _ in metas for parent_id in metas_by_destination.get(source_state_id, []) if parent_id != meta_id
+    ]
+
+
 class TransitionApprovalMetadataManager(models.Manager):
     def get_by_natural_key(self, workflow, source_state, destination_state, priority):
         return self.get(workflow=workflow, source_state=source_state, destination_state=destination_state, priority=priority)
+
+    def rebuild_parents(self, workflow, invalidate=True):
+        """
+        Recomputes the parents of all the metas of the given workflow in a single pass and replaces them with a
+        fixed number of queries. It returns the number of the parent relations. The compiled workflow graphs are
+        invalidated too unless ``invalidate`` is ``False``.
+        """
+        from river.core.workflowgraph import workflow_graph_registry
+
+        parents = self.model.parents
+        with transaction.atomic(using=self.db):
+            parents.through.objects.using(self.db).filter(**{parents.field.m2m_field_name() + '__workflow': workflow}).delete()
+            pairs = get_parents(self.filter(workflow=workflow).values_list('pk', 'source_state_id', 'destination_state_id'))
+            bulk_add(parents, pairs, using=self.db)
+            if invalidate:
+                workflow_graph_registry.on_definition_changed()
+        return len(pairs)
@@ -1,4 +1,9 @@
-from django.db import models
+from django.db import models, transaction
+from django.template.defaultfilters import slugify
+
+from river.config import app_config
+from river.models.managers.transitionmetada import get_parents
+from river.utils.bulk import bulk_add
 
 __author__ = 'ahmetdal'
 
@@ -6,3 +11,64 @@ __author__ = 'ahmetdal'
 class WorkflowManager(models.Manager):
     def get_by_natural_key(self, content_type, field_name):
         return self.get(content_type=content_type, field_name=field_name)
+
+    @transaction.atomic
+    def import_definition(self, content_type, field_name, initial_state, transitions, states=()):
+        """
+        Creates a workflow with its states and transitions with a fixed number of queries. The states are given either
+        as labels or as dictionaries with ``label`` and optionally ``slug`` and ``description``; the ones whose slugs
+        already exist are reused. The transitions are dictionaries with ``source_state`` and ``destination_state``
+        slugs and optionally ``priority``, ``permissions`` and ``groups``. The parent and the child transitions are
+        computed in memory in a single pass instead of by a signal on every transition like saving them one by one.
+        """
+        from river.models import State, TransitionApprovalMeta
+
+        if not isinstance(content_type, app_config.CONTENT_TYPE_CLASS):
+            content_type = app_config.CONTENT_TYPE_CLASS.objects.get_for_model(content_type)
+
+        definitions = {}
+        for state in states:
+            state = {'label': state} if not isinstance(state, dict) else dict(state)
+            state['slug'] = slugify(state.get('slug') or state['label'])
+            definitions[state['slug']] = state
+
+        states = {state.slug: state for state in State.objects.filter(slug__in=list(definitions))}
+        missing = [State(**definition) for slug, definition in definitions.items() if slug not in states]
+        if missing:
+            State.objects.bulk_create(missing)
+            states.update((state.slug, state) for state in State.objects.filter(slug__in=[state.slug for state in missing]))
+
+        def get_state(slug):
+            slug = slugify(getattr(slug, 'slug', slug))
+            if slug not in states:
+                states.update((state.slug, state) for state in State.objects.filter(slug=slug))
+            if slug not in states:
+                raise State.DoesNotExist("State with slug '%s' doesn't exist. " % slug)
+            return states[slug]
+
+        # Saving the workflow invalidates the compiled workflow graphs once the transaction is committed.
+        workflow = self.create(content_type=content_type, field_name=field_name, initial_state=get_state(initial_state))
+
+        transitions = [
+            (get_state(transition['source_state']), get_state(transition['destination_state']), transition.get('priority', 0), transition)
+            for transition in transitions
+        ]
+        TransitionApprovalMeta.objects.bulk_create([
+            TransitionApprovalMeta(workflow=workflow, source_state=source_state, destination_state=destination_state, priority=priority)
+            for source_state, destination_state, priority, _ in transitions
+        ])
+        metas = {
+            (meta.source_state_id, meta.destination_state_id, meta.priority): meta
+            for meta in TransitionApprovalMeta.objects.filter(workflow=workflow)
+        }
+
+        permissions, groups = [], []
+        for source_state, destination_state, priority, transition in transitions:
+            meta = metas[(source_state.pk, destination_state.pk, priority)]
+            permissions.extend((meta.pk, getattr(permission, 'pk', permission)) for permission in transition.get('permissions', []))
+            groups.extend((meta.pk, getattr(group, 'pk', group)) for group in transition.get('groups', []))
+
+        bulk_add(TransitionApprovalMeta.permissions, permissions)
+        bulk_add(TransitionApprovalMeta.groups, groups)
+        bulk_add(TransitionApprovalMeta.parents, get_parents((meta.pk, meta.source_state_id, meta.destination_state_id) for meta in metas.values()))
+        return workflow
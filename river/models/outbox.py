@@ -0,0 +1,40 @@
+from django.db import models
+from django.db.models import CASCADE
+from django.utils import timezone
+from django.utils.translation import ugettext_lazy as _
+
+from river.config import app_config
+from river.models.fields.objectid import object_id_field
+from river.models.managers.outbox import OutboxEntryManager
+
+__author__ = 'ahmetdal'
+
+
+class OutboxEntry(models.Model):
+    """
+    Callback invocation which is written in the same transaction with the approval that fires it and delivered later on
+    by ``river_drain_outbox``. It is deleted once it is delivered. The entries which have run out of attempts are kept
+    with no due date.
+    """
+
+    class Meta:
+        app_label = 'river'
+        verbose_name = _("Outbox Entry")
+        verbose_name_plural = _("Outbox Entries")
+        indexes = [
+            models.Index(fields=['available_at'], name='river_outbox_available_idx'),
+        ]
+
+    objects = OutboxEntryManager()
+
+    hooking_cls = models.CharField(_('HookingClass'), max_length=200)
+    method = models.CharField(_('Callback Method'), max_length=200)
+    content_type = models.ForeignKey(app_config.CONTENT_TYPE_CLASS, verbose_name=_('Content Type'), on_delete=CASCADE)
+    object_id = object_id_field(verbose_name=_('Related Object'))
+    field_name = models.CharField(_('Field Name'), max_length=200)
+    arguments = models.TextField(_('Arguments'), default='{}')
+
+    date_created = models.DateTimeField(_('Date Created'), auto_now_add=True)
+    available_at = models.DateTimeField(_('Available At'), null=True, blank=True, default=timezone.now)
+    attempts = models.PositiveIntegerField(_('Attempts'), default=0)
+    last_error = models.TextField(_('Last Error'), null=True, blank=True)
@@ -42,7 +42,9 @@ class State(BaseModel):
         return detail
 
 
-def on_pre_save(sender, instance, *args, **kwargs):
+def on_pre_save(sender, instance, raw=False, *args, **kwargs):
+    if raw:
+        return
     if not instance.slug:
         instance.slug = slugify(instance.label)
     else:
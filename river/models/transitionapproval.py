@@ -14,6 +14,7 @@ from django.db import models, transaction
 from django.utils.translation import ugettext_lazy as _
 
 from river.models.base_model import BaseModel
+from river.models.fields.objectid import object_id_field
 from river.models.managers.transitionapproval import TransitionApprovalManager
 from river.config import app_config
 
@@ -35,12 +36,17 @@ class TransitionApproval(BaseModel):
         app_label = 'river'
         verbose_name = _("Transition Approval")
         verbose_name_plural = _("Transition Approvals")
+        indexes = [
+            models.Index(fields=['content_type', 'object_id', 'workflow', 'source_state', 'destination_state'], name='river_approval_object_idx'),
+            models.Index(fields=['content_type', 'object_id', 'transaction_date'], name='river_approval_recent_idx'),
+            models.Index(fields=['workflow', 'status', 'object_id', 'source_state', 'destination_state'], name='river_approval_pending_idx'),
+        ]
 
     objects = TransitionApprovalManager()
 
     content_type = models.ForeignKey(app_config.CONTENT_TYPE_CLASS, verbose_name=_('Content Type'), on_delete=CASCADE)
 
-    object_id = models.CharField(max_length=50, verbose_name=_('Related Object'))
+    object_id = object_id_field(verbose_name=_('Related Object'))
     workflow_object = GenericForeignKey('content_type', 'object_id')
 
     meta = models.ForeignKey(TransitionApprovalMeta, verbose_name=_('Meta'), related_name="transition_approvals", on_delete=CASCADE)
@@ -81,6 +87,9 @@ class TransitionApproval(BaseModel):
 
         self.downstream.filter(skipped=False).update(skipped=True)
 
+        from river.models.inbox import InboxEntry
+        InboxEntry.objects.refresh(self.workflow, [self.object_id])
+
     @property
     def peers(self):
         return TransitionApproval.objects.filter(
@@ -0,0 +1,30 @@
+from django.db import models
+from django.db.models import CASCADE
+from django.utils.translation import ugettext_lazy as _
+
+from river.config import app_config
+from river.models.transitionapproval import TransitionApproval, STATUSES, PENDING
+
+__author__ = 'ahmetdal'
+
+
+class TransitionApprovalHistory(models.Model):
+    """
+    Decision which is made on a transition approval before the approval is reset to be approved again in a cycle.
+    It is only appended to, so that an approval keeps a single row no matter how many times it is cycled through
+    while its past decisions are still kept. The approval which was approved right before it is kept as well, so that
+    the path an object has taken through the cycles can be followed back.
+    """
+
+    class Meta:
+        app_label = 'river'
+        verbose_name = _("Transition Approval History")
+        verbose_name_plural = _("Transition Approval Histories")
+
+    transition_approval = models.ForeignKey(TransitionApproval, verbose_name=_('Transition Approval'), related_name='history', on_delete=CASCADE)
+    transactioner = models.ForeignKey(app_config.USER_CLASS, verbose_name=_('Transactioner'), null=True, blank=True, on_delete=CASCADE)
+    transaction_date = models.DateTimeField(_('Transaction Date'), null=True, blank=True)
+    status = models.IntegerField(_('Status'), choices=STATUSES, default=PENDING)
+    skipped = models.BooleanField(_('Skip'), default=False)
+    previous = models.ForeignKey(TransitionApproval, verbose_name=_('Previous Transition'), related_name='+', null=True, blank=True, on_delete=models.SET_NULL)
+    date_created = models.DateTimeField(_('Date Created'), auto_now_add=True)
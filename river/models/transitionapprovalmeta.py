@@ -1,6 +1,9 @@
 from __future__ import unicode_literals
 
-from django.db import models
+import threading
+from functools import partial
+
+from django.db import models, transaction
 from django.db.models import CASCADE
 from django.db.models.signals import post_save
 from django.utils.translation import ugettext_lazy as _
@@ -9,6 +12,7 @@ from river.config import app_config
 from river.models import State, Workflow
 from river.models.base_model import BaseModel
 from river.models.managers.transitionmetada import TransitionApprovalMetadataManager
+from river.utils.transactions import is_pending_on_commit
 
 __author__ = 'ahmetdal'
 
@@ -44,7 +48,48 @@ class TransitionApprovalMeta(BaseModel):
             ','.join(self.groups.values_list('name', flat=True)), self.priority)
 
 
-def post_save_model(sender, instance, *args, **kwargs):
+class DeferredParentsRebuild(threading.local):
+    """
+    Collects the workflows whose definitions are saved raw, like by ``loaddata``, and rebuilds their parents and
+    invalidates the compiled workflow graphs only once when the transaction they are saved in is committed, instead
+    of on every save.
+    """
+
+    def __init__(self):
+        super(DeferredParentsRebuild, self).__init__()
+        self._workflow_ids = None
+        self._rebuild = None
+
+    def add(self, workflow_id=None, using=None):
+        pending = self.is_pending(using)
+        if not pending:
+            self._workflow_ids = set()
+            self._rebuild = partial(self.rebuild, self._workflow_ids, using)
+        if workflow_id is not None:
+            self._workflow_ids.add(workflow_id)
+        if not pending:
+            transaction.on_commit(self._rebuild, using=using)
+
+    def is_pending(self, using=None):
+        return self._workflow_ids is not None and is_pending_on_commit(self._rebuild, using)
+
+    @staticmethod
+    def rebuild(workflow_ids, using=None):
+        from river.core.workflowgraph import workflow_graph_registry
+
+        for workflow in Workflow.objects.using(using).filter(pk__in=workflow_ids):
+            TransitionApprovalMeta.objects.db_manager(using).rebuild_parents(workflow, invalidate=False)
+        workflow_graph_registry.on_definition_changed()
+
+
+deferred_parents_rebuild = DeferredParentsRebuild()
+
+
+def post_save_model(sender, instance, raw=False, using=None, *args, **kwargs):
+    if raw:
+        deferred_parents_rebuild.add(instance.workflow_id, using)
+        return
+
     parents = TransitionApprovalMeta.objects \
         .filter(workflow=instance.workflow, destination_state=instance.source_state) \
         .exclude(pk__in=instance.parents.values_list('pk', flat=True)) \
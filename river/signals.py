@@ -16,6 +16,35 @@ post_approve = Signal(providing_args=["workflow_object", "field_name", "transiti
 LOGGER = logging.getLogger(__name__)
 
 
+_hookings = {}
+
+
+def connect_hooking(signal, hooking_cls):
+    """
+    Connects the dispatcher of a hooking class to the signal. The hookings are kept apart from the receivers of the
+    signal, since they are there all the time and only count as receivers when they have a callback registered.
+    """
+    hookings = _hookings.setdefault(signal, [])
+    if hooking_cls not in hookings:
+        hookings.append(hooking_cls)
+
+
+def has_receivers(signal, sender):
+    """
+    Tells whether sending the signal would reach anybody, so that its payload is only built when it is needed.
+    """
+    return signal.has_listeners(sender) or any(hooking_cls.has_callbacks() for hooking_cls in _hookings.get(signal, ()))
+
+
+def send(signal, sender, **kwargs):
+    """
+    Dispatches the hookings connected to the signal first and then sends it to its receivers.
+    """
+    for hooking_cls in _hookings.get(signal, ()):
+        hooking_cls.dispatch(signal=signal, sender=sender, **kwargs)
+    return signal.send(sender=sender, **kwargs)
+
+
 class TransitionSignal(object):
     def __init__(self, status, workflow_object, field_name, transition_approval):
         self.status = status
@@ -24,8 +53,9 @@ class TransitionSignal(object):
         self.transition_approval = transition_approval
 
     def __enter__(self):
-        if self.status:
-            pre_transition.send(
+        if self.status and has_receivers(pre_transition, TransitionSignal.__class__):
+            send(
+                pre_transition,
                 sender=TransitionSignal.__class__,
                 workflow_object=self.workflow_object,
                 field_name=self.field_name,
@@ -36,8 +66,9 @@ class TransitionSignal(object):
                 self.transition_approval.source_state.label, self.transition_approval.destination_state.label, self.workflow_object))
 
     def __exit__(self, type, value, traceback):
-        if self.status:
-            post_transition.send(
+        if self.status and has_receivers(post_transition, TransitionSignal.__class__):
+            send(
+                post_transition,
                 sender=TransitionSignal.__class__,
                 workflow_object=self.workflow_object,
                 field_name=self.field_name,
@@ -56,37 +87,47 @@ class ApproveSignal(object):
         self.transition_approval = transition_approval
 
     def __enter__(self):
-        pre_approve.send(
-            sender=ApproveSignal.__class__,
-            workflow_object=self.workflow_object,
-            field_name=self.field_name,
-            transition_approval=self.transition_approval,
-        )
-        LOGGER.debug("The signal that is fired right before a transition approval is approved for %s due to transition %s -> %s" % (
-            self.workflow_object, self.transition_approval.source_state.label, self.transition_approval.destination_state.label))
+        if has_receivers(pre_approve, ApproveSignal.__class__):
+            send(
+                pre_approve,
+                sender=ApproveSignal.__class__,
+                workflow_object=self.workflow_object,
+                field_name=self.field_name,
+                transition_approval=self.transition_approval,
+            )
+            LOGGER.debug("The signal that is fired right before a transition approval is approved for %s due to transition %s -> %s" % (
+                self.workflow_object, self.transition_approval.source_state.label, self.transition_approval.destination_state.label))
 
     def __exit__(self, type, value, traceback):
-        post_approve.send(
-            sender=ApproveSignal.__class__,
-            workflow_object=self.workflow_object,
-            field_name=self.field_name,
-            source_state=self.transition_approval.source_state,
-            destination_state=self.transition_approval.destination_state
-        )
-        LOGGER.debug("The signal that is fired right after a transition approval is approved for %s due to transition %s -> %s" % (
-            self.workflow_object, self.transition_approval.source_state.label, self.transition_approval.destination_state.label))
+        if has_receivers(post_approve, ApproveSignal.__class__):
+            send(
+                post_approve,
+                sender=ApproveSignal.__class__,
+                workflow_object=self.workflow_object,
+                field_name=self.field_name,
+                source_state=self.transition_approval.source_state,
+                destination_state=self.transition_approval.destination_state
+            )
+            LOGGER.debug("The signal that is fired right after a transition approval is approved for %s due to transition %s -> %s" % (
+                self.workflow_object, self.transition_approval.source_state.label, self.transition_approval.destination_state.label))
 
 
 class OnCompleteSignal(object):
     def __init__(self, workflow_object, field_name):
         self.workflow_object = workflow_object
         self.field_name = field_name
-        self.workflow = getattr(self.workflow_object.river, self.field_name)
-        self.status = self.workflow.on_final_state
+        self._status = None
+
+    @property
+    def status(self):
+        if self._status is None:
+            self._status = getattr(self.workflow_object.river, self.field_name).on_final_state
+        return self._status
 
     def __enter__(self):
-        if self.status:
-            pre_on_complete.send(
+        if has_receivers(pre_on_complete, OnCompleteSignal.__class__) and self.status:
+            send(
+                pre_on_complete,
                 sender=OnCompleteSignal.__class__,
                 workflow_object=self.workflow_object,
                 field_name=self.field_name,
@@ -94,8 +135,9 @@ class OnCompleteSignal(object):
             LOGGER.debug("The signal that is fired right before the workflow of %s is complete" % self.workflow_object)
 
     def __exit__(self, type, value, traceback):
-        if self.status:
-            post_on_complete.send(
+        if has_receivers(post_on_complete, OnCompleteSignal.__class__) and self.status:
+            send(
+                post_on_complete,
                 sender=OnCompleteSignal.__class__,
                 workflow_object=self.workflow_object,
                 field_name=self.field_name,
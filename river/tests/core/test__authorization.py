@@ -0,0 +1,116 @@
+from datetime import datetime
+
+from django.contrib import auth
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Q
+from django.test import TestCase
+from hamcrest import assert_that, has_length, less_than, equal_to
+
+from river.models import TransitionApproval, PENDING
+from river.models.factories import PermissionObjectFactory, UserObjectFactory, StateObjectFactory, TransitionApprovalMetaFactory, GroupObjectFactory, WorkflowFactory, \
+    ContentTypeObjectFactory
+from river.tests.models import BasicTestModel
+from river.tests.models.factories import BasicTestModelObjectFactory
+
+__author__ = 'ahmetdal'
+
+
+def legacy_authorized_approvals(workflow, as_user):
+    group_q = Q()
+    for g in as_user.groups.all():
+        group_q = group_q | Q(groups__in=[g])
+
+    permissions = []
+    for backend in auth.get_backends():
+        permissions.extend(backend.get_all_permissions(as_user))
+
+    permission_q = Q()
+    for p in permissions:
+        label, codename = p.split('.')
+        permission_q = permission_q | Q(permissions__content_type__app_label=label, permissions__codename=codename)
+
+    return TransitionApproval.objects.filter(
+        Q(workflow=workflow, status=PENDING) &
+        (
+                (Q(transactioner__isnull=True) | Q(transactioner=as_user)) &
+                (Q(permissions__isnull=True) | permission_q) &
+                (Q(groups__isnull=True) | group_q)
+        )
+    )
+
+
+# noinspection PyMethodMayBeStatic,DuplicatedCode
+class AuthorizationTest(TestCase):
+
+    def __init__(self, *args, **kwargs):
+        super(AuthorizationTest, self).__init__(*args, **kwargs)
+        self.content_type = ContentType.objects.get_for_model(BasicTestModel)
+
+    def test_shouldAuthorizeSuperUserWithoutPermissions(self):
+        super_user = UserObjectFactory(is_superuser=True)
+        authorized_user_group = GroupObjectFactory()
+
+        state1 = StateObjectFactory(label="state1")
+        state2 = StateObjectFactory(label="state2")
+        state3 = StateObjectFactory(label="state3")
+
+        workflow = WorkflowFactory(initial_state=state1, content_type=self.content_type, field_name="my_field")
+        TransitionApprovalMetaFactory.create(
+            workflow=workflow,
+            source_state=state1,
+            destination_state=state2,
+            priority=0,
+            permissions=[PermissionObjectFactory()]
+        )
+        meta = TransitionApprovalMetaFactory.create(
+            workflow=workflow,
+            source_state=state1,
+            destination_state=state3,
+            priority=0
+        )
+        meta.groups.add(authorized_user_group)
+
+        BasicTestModelObjectFactory()
+
+        available_approvals = BasicTestModel.river.my_field.get_available_approvals(as_user=super_user)
+        assert_that(available_approvals, has_length(1))
+        assert_that(available_approvals[0].destination_state, equal_to(state2))
+
+    def test_shouldKeepTheAuthorizationQueryCompactWhenTheUserHasManyPermissions(self):
+        state1 = StateObjectFactory(label="state1")
+        state2 = StateObjectFactory(label="state2")
+
+        workflow = WorkflowFactory(initial_state=state1, content_type=self.content_type, field_name="my_field")
+        authorized_permission = PermissionObjectFactory()
+        TransitionApprovalMetaFactory.create(
+            workflow=workflow,
+            source_state=state1,
+            destination_state=state2,
+            priority=0,
+            permissions=[authorized_permission]
+        )
+        BasicTestModelObjectFactory.create_batch(50)
+
+        permission_content_type = ContentTypeObjectFactory()
+        sql_sizes, legacy_sql_sizes = {}, {}
+        for number_of_permissions in [10, 100, 400]:
+            permissions = [authorized_permission] + [PermissionObjectFactory(content_type=permission_content_type) for _ in range(number_of_permissions - 1)]
+            user = UserObjectFactory(user_permissions=permissions, groups=[GroupObjectFactory() for _ in range(5)])
+
+            before = datetime.now()
+            legacy_approvals = legacy_authorized_approvals(workflow, user)
+            legacy_sql_sizes[number_of_permissions] = len(str(legacy_approvals.query))
+            assert_that(list(legacy_approvals), has_length(50))
+            legacy_time_taken = datetime.now() - before
+
+            before = datetime.now()
+            approvals = BasicTestModel.river.my_field._authorized_approvals(user)  # pylint: disable=protected-access
+            sql_sizes[number_of_permissions] = len(str(approvals.query))
+            assert_that(list(approvals), has_length(50))
+            time_taken = datetime.now() - before
+
+            print("Permissions: %s, SQL size: %s (legacy %s), Time taken: %s (legacy %s)" % (
+                number_of_permissions, sql_sizes[number_of_permissions], legacy_sql_sizes[number_of_permissions], time_taken, legacy_time_taken))
+
+        assert_that(sql_sizes[400], less_than(legacy_sql_sizes[400]))
+        assert_that(sql_sizes[400] - sql_sizes[10], less_than((legacy_sql_sizes[400] - legacy_sql_sizes[10]) / 5))
@@ -1,13 +1,22 @@
 from datetime import datetime, timedelta
 
 from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.db.models.signals import post_save
 from django.test import TestCase
-from hamcrest import assert_that, equal_to, has_item, all_of, has_property, less_than, has_items, has_length
+from django.test.utils import CaptureQueriesContext
+from hamcrest import assert_that, equal_to, has_item, all_of, has_property, less_than, has_items, has_length, is_not, contains_string
+from mock import patch
 
-from river.models import TransitionApproval
+from river.config import app_config
+from river.models import TransitionApproval, TransitionApprovalHistory, PENDING
 from river.models.factories import PermissionObjectFactory, UserObjectFactory, StateObjectFactory, TransitionApprovalMetaFactory, GroupObjectFactory, WorkflowFactory
+from river.models.fields.objectid import to_object_id
+from river.signals import post_transition
+from river.tests.matchers import has_permission
 from river.tests.models import BasicTestModel
 from river.tests.models.factories import BasicTestModelObjectFactory
+from river.utils.error_code import ErrorCode
 
 
 # noinspection PyMethodMayBeStatic,DuplicatedCode
@@ -220,3 +229,218 @@ class ClassApiTest(TestCase):
 
         assert_that(BasicTestModel.river.my_field.final_states, has_length(4))
         assert_that(list(BasicTestModel.river.my_field.final_states), has_items(state21, state22, state31, state32))
+
+    def test_shouldInitializeApprovalsOfExistingObjectsInBatches(self):
+        authorized_permission = PermissionObjectFactory()
+        authorized_user_group = GroupObjectFactory()
+
+        workflow_objects = BasicTestModelObjectFactory.create_batch(5)
+
+        state1 = StateObjectFactory(label="state1")
+        state2 = StateObjectFactory(label="state2")
+        state3 = StateObjectFactory(label="state3")
+
+        workflow = WorkflowFactory(initial_state=state1, content_type=self.content_type, field_name="my_field")
+        TransitionApprovalMetaFactory.create(
+            workflow=workflow,
+            source_state=state1,
+            destination_state=state2,
+            priority=0,
+            permissions=[authorized_permission]
+        )
+        meta = TransitionApprovalMetaFactory.create(
+            workflow=workflow,
+            source_state=state2,
+            destination_state=state3,
+            priority=0
+        )
+        meta.groups.add(authorized_user_group)
+
+        assert_that(TransitionApproval.objects.filter(workflow=workflow), has_length(0))
+
+        number_of_initialized = BasicTestModel.river.my_field.initialize_approvals(workflow_objects, batch_size=2)
+
+        assert_that(number_of_initialized, equal_to(5))
+        for workflow_object in BasicTestModel.objects.all():
+            assert_that(workflow_object.my_field, equal_to(state1))
+            approvals = TransitionApproval.objects.filter(workflow=workflow, workflow_object=workflow_object)
+            assert_that(approvals, has_length(2))
+            assert_that(approvals, has_items(
+                all_of(
+                    has_property("source_state", state1),
+                    has_property("destination_state", state2),
+                    has_permission("permissions", has_item(authorized_permission)),
+                ),
+                all_of(
+                    has_property("source_state", state2),
+                    has_property("destination_state", state3),
+                    has_permission("groups", has_item(authorized_user_group)),
+                )
+            ))
+
+        assert_that(BasicTestModel.river.my_field.initialize_approvals(workflow_objects, batch_size=2), equal_to(0))
+        assert_that(TransitionApproval.objects.filter(workflow=workflow), has_length(10))
+
+    def test_shouldApproveManyObjectsAtOnce(self):
+        authorized_permission = PermissionObjectFactory()
+        authorized_user = UserObjectFactory(user_permissions=[authorized_permission])
+
+        state1 = StateObjectFactory(label="state1")
+        state2 = StateObjectFactory(label="state2")
+        state3 = StateObjectFactory(label="state3")
+
+        workflow = WorkflowFactory(initial_state=state1, content_type=self.content_type, field_name="my_field")
+        TransitionApprovalMetaFactory.create(
+            workflow=workflow,
+            source_state=state1,
+            destination_state=state2,
+            priority=0,
+            permissions=[authorized_permission]
+        )
+        TransitionApprovalMetaFactory.create(
+            workflow=workflow,
+            source_state=state2,
+            destination_state=state3,
+            priority=0,
+            permissions=[PermissionObjectFactory()]
+        )
+
+        workflow_objects = list(BasicTestModelObjectFactory.create_batch(3))
+
+        approvals, errors = BasicTestModel.river.my_field.approve_many(workflow_objects, as_user=authorized_user)
+
+        assert_that(approvals, has_length(3))
+        assert_that(errors, has_length(0))
+        for workflow_object in BasicTestModel.objects.all():
+            assert_that(workflow_object.my_field, equal_to(state2))
+            assert_that(workflow_object.river.my_field.recent_approval, all_of(
+                has_property("transactioner", authorized_user),
+                has_property("source_state", state1),
+                has_property("destination_state", state2),
+            ))
+        for workflow_object in workflow_objects:
+            assert_that(workflow_object.my_field, equal_to(state2))
+
+        approvals, errors = BasicTestModel.river.my_field.approve_many(workflow_objects, as_user=authorized_user)
+
+        assert_that(approvals, has_length(0))
+        assert_that(errors, has_length(3))
+        assert_that(list(errors.values()), has_item(has_property("code", ErrorCode.NO_AVAILABLE_NEXT_STATE_FOR_USER)))
+
+    def test_shouldApproveManyObjectsWithoutSavingThemUnlessItIsAsked(self):
+        authorized_permission = PermissionObjectFactory()
+        authorized_user = UserObjectFactory(user_permissions=[authorized_permission])
+
+        state1 = StateObjectFactory(label="state1")
+        state2 = StateObjectFactory(label="state2")
+        state3 = StateObjectFactory(label="state3")
+        workflow = WorkflowFactory(initial_state=state1, content_type=self.content_type, field_name="my_field")
+        for source_state, destination_state in [(state1, state2), (state2, state3)]:
+            TransitionApprovalMetaFactory.create(workflow=workflow, source_state=source_state, destination_state=destination_state, priority=0,
+                                                 permissions=[authorized_permission])
+
+        workflow_objects = list(BasicTestModelObjectFactory.create_batch(3))
+        saved, transitioned = [], []
+
+        def on_save(sender, instance, **kwargs):
+            saved.append((instance.pk, instance.my_field))
+
+        def on_transition(sender, workflow_object, destination_state, **kwargs):
+            transitioned.append((workflow_object.pk, destination_state))
+
+        post_save.connect(on_save, sender=BasicTestModel)
+        post_transition.connect(on_transition)
+        try:
+            BasicTestModel.river.my_field.approve_many(workflow_objects, as_user=authorized_user)
+            assert_that(saved, has_length(0))
+            assert_that(transitioned, has_length(3))
+
+            BasicTestModel.river.my_field.approve_many(workflow_objects, as_user=authorized_user, save=True)
+            assert_that(saved, equal_to([(workflow_object.pk, state3) for workflow_object in workflow_objects]))
+            assert_that(transitioned, has_length(6))
+        finally:
+            post_save.disconnect(on_save, sender=BasicTestModel)
+            post_transition.disconnect(on_transition)
+
+        for workflow_object in BasicTestModel.objects.all():
+            assert_that(workflow_object.my_field, equal_to(state3))
+
+    def test_shouldResetTheCyclesOfManyObjectsAtOnce(self):
+        authorized_permission = PermissionObjectFactory()
+        authorized_user = UserObjectFactory(user_permissions=[authorized_permission])
+
+        state1 = StateObjectFactory(label="state1")
+        state2 = StateObjectFactory(label="state2")
+        workflow = WorkflowFactory(initial_state=state1, content_type=self.content_type, field_name="my_field")
+        for source_state, destination_state in [(state1, state2), (state2, state1)]:
+            TransitionApprovalMetaFactory.create(workflow=workflow, source_state=source_state, destination_state=destination_state, priority=0,
+                                                 permissions=[authorized_permission])
+
+        workflow_objects = list(BasicTestModelObjectFactory.create_batch(3))
+        for _ in range(3):
+            approvals, errors = BasicTestModel.river.my_field.approve_many(workflow_objects, as_user=authorized_user)
+            assert_that(approvals, has_length(3))
+            assert_that(errors, has_length(0))
+
+        for workflow_object in BasicTestModel.objects.all():
+            assert_that(workflow_object.my_field, equal_to(state2))
+        assert_that(TransitionApproval.objects.filter(workflow=workflow), has_length(6))
+        assert_that(TransitionApproval.objects.filter(workflow=workflow, status=PENDING, source_state=state2), has_length(3))
+        assert_that(TransitionApprovalHistory.objects.filter(transition_approval__workflow=workflow), has_length(6))
+
+    def test_shouldApproveManyObjectsWithConstantNumberOfQueries(self):
+        authorized_permission = PermissionObjectFactory()
+        authorized_user = UserObjectFactory(user_permissions=[authorized_permission])
+
+        state1 = StateObjectFactory(label="state1")
+        state2 = StateObjectFactory(label="state2")
+
+        workflow = WorkflowFactory(initial_state=state1, content_type=self.content_type, field_name="my_field")
+        TransitionApprovalMetaFactory.create(
+            workflow=workflow,
+            source_state=state1,
+            destination_state=state2,
+            priority=0,
+            permissions=[authorized_permission]
+        )
+
+        workflow_objects = list(BasicTestModelObjectFactory.create_batch(10))
+        BasicTestModel.river.my_field.approve_many(workflow_objects[:1], as_user=authorized_user)
+
+        with CaptureQueriesContext(connection) as few_objects:
+            BasicTestModel.river.my_field.approve_many(workflow_objects[1:3], as_user=authorized_user)
+
+        with CaptureQueriesContext(connection) as many_objects:
+            BasicTestModel.river.my_field.approve_many(workflow_objects[3:], as_user=authorized_user)
+
+        def approval_queries(context):
+            return [query for query in context.captured_queries if 'river_callback' not in query['sql']]
+
+        assert_that(approval_queries(many_objects), has_length(len(approval_queries(few_objects))))
+        assert_that(BasicTestModel.objects.filter(my_field=state2), has_length(10))
+
+    def test_shouldJoinTheWorkflowObjectsWithoutCastingTheObjectIds(self):
+        authorized_permission = PermissionObjectFactory()
+        authorized_user = UserObjectFactory(user_permissions=[authorized_permission])
+
+        state1 = StateObjectFactory(label="state1")
+        state2 = StateObjectFactory(label="state2")
+
+        workflow = WorkflowFactory(initial_state=state1, content_type=self.content_type, field_name="my_field")
+        TransitionApprovalMetaFactory.create(
+            workflow=workflow,
+            source_state=state1,
+            destination_state=state2,
+            priority=0,
+            permissions=[authorized_permission]
+        )
+
+        workflow_object = BasicTestModelObjectFactory().model
+
+        with patch.object(app_config, 'OBJECT_ID_TYPE', 'integer'):
+            query = str(BasicTestModel.river.my_field.get_available_approvals(as_user=authorized_user).query)
+        assert_that(query.upper(), is_not(contains_string("CAST(")))
+
+        available_approvals = BasicTestModel.river.my_field.get_available_approvals(as_user=authorized_user)
+        assert_that(available_approvals, has_length(1))
+        assert_that(available_approvals[0].object_id, equal_to(to_object_id(workflow_object)))
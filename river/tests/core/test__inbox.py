@@ -0,0 +1,107 @@
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command, CommandError
+from django.test import TestCase
+from django.utils.six import StringIO
+from hamcrest import assert_that, equal_to, has_length, has_items, empty, calling, raises
+
+from river.config import app_config
+from river.models import InboxEntry
+from river.models.factories import PermissionObjectFactory, UserObjectFactory, StateObjectFactory, TransitionApprovalMetaFactory, GroupObjectFactory, WorkflowFactory
+from river.tests.models import BasicTestModel
+from river.tests.models.factories import BasicTestModelObjectFactory
+
+__author__ = 'ahmetdal'
+
+
+# noinspection PyMethodMayBeStatic,DuplicatedCode
+class InboxTest(TestCase):
+
+    def __init__(self, *args, **kwargs):
+        super(InboxTest, self).__init__(*args, **kwargs)
+        self.content_type = ContentType.objects.get_for_model(BasicTestModel)
+
+    def setUp(self):
+        app_config.INBOX_ENABLED = True
+
+        self.authorized_permission = PermissionObjectFactory()
+        self.authorized_group = GroupObjectFactory()
+        self.permitted_user = UserObjectFactory(user_permissions=[self.authorized_permission])
+        self.grouped_user = UserObjectFactory(groups=[self.authorized_group])
+        self.unauthorized_user = UserObjectFactory()
+
+        self.state1 = StateObjectFactory(label="state1")
+        self.state2 = StateObjectFactory(label="state2")
+        self.state3 = StateObjectFactory(label="state3")
+
+        self.workflow = WorkflowFactory(initial_state=self.state1, content_type=self.content_type, field_name="my_field")
+        TransitionApprovalMetaFactory.create(
+            workflow=self.workflow,
+            source_state=self.state1,
+            destination_state=self.state2,
+            priority=0,
+            permissions=[self.authorized_permission]
+        )
+        meta = TransitionApprovalMetaFactory.create(
+            workflow=self.workflow,
+            source_state=self.state2,
+            destination_state=self.state3,
+            priority=0
+        )
+        meta.groups.add(self.authorized_group)
+
+    def tearDown(self):
+        app_config.INBOX_ENABLED = False
+
+    def test_shouldMaterializeTheInboxOfTheAuthorizedUsers(self):
+        workflow_objects = BasicTestModelObjectFactory.create_batch(3)
+
+        assert_that(BasicTestModel.river.my_field.get_inbox(self.permitted_user), equal_to(list(workflow_objects)))
+        assert_that(BasicTestModel.river.my_field.get_inbox(self.grouped_user), empty())
+        assert_that(BasicTestModel.river.my_field.get_inbox(self.unauthorized_user), empty())
+
+        app_config.INBOX_ENABLED = False
+        on_approval_objects = list(BasicTestModel.river.my_field.get_on_approval_objects(self.permitted_user))
+        app_config.INBOX_ENABLED = True
+        assert_that(list(BasicTestModel.river.my_field.get_on_approval_objects(self.permitted_user)), equal_to(on_approval_objects))
+
+    def test_shouldPaginateTheInboxByKeyset(self):
+        workflow_objects = BasicTestModelObjectFactory.create_batch(3)
+
+        first_page = BasicTestModel.river.my_field.get_inbox(self.permitted_user, limit=2)
+        assert_that(first_page, has_length(2))
+
+        second_page = BasicTestModel.river.my_field.get_inbox(self.permitted_user, after=first_page[-1], limit=2)
+        assert_that(second_page, has_length(1))
+        assert_that(first_page + second_page, has_items(*workflow_objects))
+
+    def test_shouldMoveTheInboxAlongWithTheApprovals(self):
+        workflow_object1, workflow_object2, workflow_object3 = BasicTestModelObjectFactory.create_batch(3)
+
+        workflow_object1.river.my_field.approve(as_user=self.permitted_user)
+
+        assert_that(BasicTestModel.river.my_field.get_inbox(self.permitted_user), equal_to([workflow_object2, workflow_object3]))
+        assert_that(BasicTestModel.river.my_field.get_inbox(self.grouped_user), equal_to([workflow_object1]))
+
+        BasicTestModel.river.my_field.approve_many([workflow_object2, workflow_object3], as_user=self.permitted_user)
+
+        assert_that(BasicTestModel.river.my_field.get_inbox(self.permitted_user), empty())
+        assert_that(BasicTestModel.river.my_field.get_inbox(self.grouped_user), equal_to([workflow_object1, workflow_object2, workflow_object3]))
+
+        workflow_object1.river.my_field.approve(as_user=self.grouped_user)
+
+        assert_that(BasicTestModel.river.my_field.get_inbox(self.grouped_user), equal_to([workflow_object2, workflow_object3]))
+        assert_that(InboxEntry.objects.check_consistency(self.workflow), equal_to((set(), set())))
+
+    def test_shouldDetectAndRebuildAnInconsistentInbox(self):
+        BasicTestModelObjectFactory.create_batch(3)
+        InboxEntry.objects.filter(workflow=self.workflow).delete()
+
+        missing, stale = InboxEntry.objects.check_consistency(self.workflow)
+        assert_that(missing, has_length(3))
+        assert_that(stale, empty())
+        assert_that(calling(call_command).with_args('river_check_inbox', stdout=StringIO(), stderr=StringIO()), raises(CommandError))
+
+        call_command('river_rebuild_inbox', stdout=StringIO())
+
+        assert_that(InboxEntry.objects.check_consistency(self.workflow), equal_to((set(), set())))
+        assert_that(BasicTestModel.river.my_field.get_inbox(self.permitted_user), has_length(3))
@@ -1,8 +1,10 @@
+import pickle
+
 from django.contrib.contenttypes.models import ContentType
 from django.test import TestCase
-from hamcrest import assert_that, equal_to, has_item, has_property, raises, calling, has_length, is_not, all_of
+from hamcrest import assert_that, equal_to, has_item, has_property, raises, calling, has_length, is_not, all_of, same_instance, only_contains
 
-from river.models import TransitionApproval, PENDING
+from river.models import TransitionApproval, TransitionApprovalHistory, PENDING, APPROVED
 from river.models.factories import UserObjectFactory, StateObjectFactory, TransitionApprovalMetaFactory, PermissionObjectFactory, WorkflowFactory
 from river.tests.matchers import has_permission
 from river.tests.models import BasicTestModel
@@ -394,7 +396,9 @@ class InstanceApiTest(TestCase):
         assert_that(workflow_object.model.my_field, equal_to(cycle_state_1))
 
         approvals = TransitionApproval.objects.filter(workflow=workflow, workflow_object=workflow_object.model)
-        assert_that(approvals, has_length(7))
+        assert_that(approvals, has_length(4))
+        assert_that(TransitionApprovalHistory.objects.filter(transition_approval__in=approvals), has_length(2))
+        assert_that(TransitionApprovalHistory.objects.filter(transition_approval__in=approvals), only_contains(has_property("transactioner", authorized_user)))
 
         assert_that(approvals, has_item(
             all_of(
@@ -422,6 +426,118 @@ class InstanceApiTest(TestCase):
                 has_property("destination_state", meta_3.destination_state),
                 has_permission("permissions", has_length(1)),
                 has_permission("permissions", has_item(authorized_permission)),
-                has_property("status", PENDING),
+                has_property("status", APPROVED),
             )
         ))
+
+    def test_shouldResetTheApprovalsOfTheCycleInPlaceEveryTimeItCycles(self):
+        authorized_permission = PermissionObjectFactory()
+        authorized_user = UserObjectFactory(user_permissions=[authorized_permission])
+
+        state1 = StateObjectFactory(label="state1")
+        state2 = StateObjectFactory(label="state2")
+        state3 = StateObjectFactory(label="state3")
+        state4 = StateObjectFactory(label="state4")
+        workflow = WorkflowFactory(initial_state=state1, content_type=self.content_type, field_name="my_field")
+        for source_state, destination_state in [(state1, state2), (state2, state3), (state3, state2), (state3, state4)]:
+            TransitionApprovalMetaFactory.create(workflow=workflow, source_state=source_state, destination_state=destination_state, priority=0,
+                                                 permissions=[authorized_permission])
+
+        workflow_object = BasicTestModelObjectFactory().model
+        workflow_object.river.my_field.approve(as_user=authorized_user)
+        for _ in range(5):
+            workflow_object.river.my_field.approve(as_user=authorized_user)
+            workflow_object.river.my_field.approve(as_user=authorized_user, next_state=state2)
+        assert_that(workflow_object.my_field, equal_to(state2))
+
+        approvals = TransitionApproval.objects.filter(workflow=workflow, workflow_object=workflow_object)
+        assert_that(approvals, has_length(4))
+        assert_that(approvals.filter(status=APPROVED), has_length(2))
+        assert_that(approvals.filter(status=APPROVED, source_state=state3, destination_state=state2), has_length(1))
+        assert_that(TransitionApprovalHistory.objects.filter(transition_approval__in=approvals), has_length(9))
+        assert_that(TransitionApprovalHistory.objects.filter(transition_approval__in=approvals), only_contains(all_of(
+            has_property("transactioner", authorized_user),
+            has_property("status", APPROVED),
+            has_property("skipped", False),
+        )))
+
+        approval_1_2 = approvals.get(source_state=state1, destination_state=state2)
+        approval_2_3 = approvals.get(source_state=state2, destination_state=state3)
+        approval_3_2 = approvals.get(source_state=state3, destination_state=state2)
+        assert_that(list(approval_2_3.history.order_by('pk').values_list('previous', flat=True)), equal_to([approval_1_2.pk] + [approval_3_2.pk] * 4))
+        assert_that(list(approval_3_2.history.order_by('pk').values_list('previous', flat=True)), equal_to([approval_2_3.pk] * 4))
+
+        approvals.filter(source_state=state3, destination_state=state4).update(skipped=True)
+        workflow_object.river.my_field.approve(as_user=authorized_user)
+        assert_that(approvals.get(source_state=state3, destination_state=state4).history.all(), only_contains(all_of(
+            has_property("status", PENDING),
+            has_property("skipped", True),
+        )))
+
+        workflow_object.river.my_field.approve(as_user=authorized_user, next_state=state4)
+        assert_that(workflow_object.my_field, equal_to(state4))
+        assert_that(workflow_object.river.my_field.on_final_state, equal_to(True))
+
+    def test_shouldKeepTheRecentApprovalWhenItCycles(self):
+        authorized_permission = PermissionObjectFactory()
+        authorized_user = UserObjectFactory(user_permissions=[authorized_permission])
+
+        state1 = StateObjectFactory(label="state1")
+        state2 = StateObjectFactory(label="state2")
+        state3 = StateObjectFactory(label="state3")
+        workflow = WorkflowFactory(initial_state=state1, content_type=self.content_type, field_name="my_field")
+        for source_state, destination_state in [(state1, state2), (state2, state3), (state3, state2)]:
+            TransitionApprovalMetaFactory.create(workflow=workflow, source_state=source_state, destination_state=destination_state, priority=0,
+                                                 permissions=[authorized_permission])
+
+        workflow_object = BasicTestModelObjectFactory().model
+        for _ in range(3):
+            workflow_object.river.my_field.approve(as_user=authorized_user)
+        assert_that(workflow_object.my_field, equal_to(state2))
+
+        loop_back = workflow_object.river.my_field.recent_approval
+        assert_that(loop_back, has_property("source_state", state3))
+        assert_that(loop_back, has_property("destination_state", state2))
+        assert_that(loop_back, has_property("transactioner", authorized_user))
+
+        workflow_object.river.my_field.approve(as_user=authorized_user)
+        recent_approval = workflow_object.river.my_field.recent_approval
+        assert_that(recent_approval, has_property("source_state", state2))
+        assert_that(recent_approval, has_property("previous", loop_back))
+
+        workflow_object.river.my_field.approve(as_user=authorized_user)
+        assert_that(workflow_object.river.my_field.recent_approval, has_property("previous", recent_approval))
+
+    def test_shouldMemoizeTheWorkflowAccessors(self):
+        authorized_permission = PermissionObjectFactory()
+        authorized_user = UserObjectFactory(user_permissions=[authorized_permission])
+
+        state1 = StateObjectFactory(label="state1")
+        state2 = StateObjectFactory(label="state2")
+        workflow = WorkflowFactory(initial_state=state1, content_type=self.content_type, field_name="my_field")
+        TransitionApprovalMetaFactory.create(
+            workflow=workflow,
+            source_state=state1,
+            destination_state=state2,
+            priority=0,
+            permissions=[authorized_permission]
+        )
+
+        workflow_object = BasicTestModelObjectFactory().model
+        workflow_object = BasicTestModel.objects.get(pk=workflow_object.pk)
+
+        instance_workflow = workflow_object.river.my_field
+        with self.assertNumQueries(0):
+            assert_that(workflow_object.river.my_field, same_instance(instance_workflow))
+            assert_that(BasicTestModel.river.my_field, same_instance(BasicTestModel.river.my_field))
+            assert_that(instance_workflow.class_workflow, same_instance(BasicTestModel.river.my_field))
+
+        workflow_object.river.my_field.approve(as_user=authorized_user)
+        assert_that(instance_workflow.get_state(), equal_to(state2))
+
+        workflow_object.my_field = state1
+        assert_that(workflow_object.river.my_field.get_state(), equal_to(state1))
+
+        unpickled_workflow_object = pickle.loads(pickle.dumps(workflow_object))
+        assert_that(unpickled_workflow_object.river.my_field, is_not(same_instance(instance_workflow)))
+        assert_that(unpickled_workflow_object.river.my_field.workflow_object, same_instance(unpickled_workflow_object))
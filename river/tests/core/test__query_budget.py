@@ -0,0 +1,104 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from hamcrest import assert_that, equal_to, has_length
+
+from river.core.authorization import get_authorization
+from river.models import TransitionApproval, PENDING
+from river.models.factories import PermissionObjectFactory, UserObjectFactory, StateObjectFactory, TransitionApprovalMetaFactory, WorkflowFactory
+from river.tests.models import BasicTestModel
+from river.tests.models.factories import BasicTestModelObjectFactory
+
+__author__ = 'ahmetdal'
+
+# Selecting the available approvals, selecting the approval history of the object, updating the approval and saving the object.
+APPROVE_QUERY_BUDGET = 4
+# Selecting the decisions in the cycle, appending them to the history, unlinking their next approvals and resetting them.
+RESET_CYCLE_QUERY_BUDGET = 4
+
+
+# noinspection PyMethodMayBeStatic,DuplicatedCode
+class ApproveQueryBudgetTest(TestCase):
+    """
+    Hooking lookups are left out of the budget since they depend on the hooking backend, not on ``approve``.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(ApproveQueryBudgetTest, self).__init__(*args, **kwargs)
+        self.content_type = ContentType.objects.get_for_model(BasicTestModel)
+
+    def setUp(self):
+        self.authorized_permission = PermissionObjectFactory()
+        self.authorized_user = UserObjectFactory(user_permissions=[self.authorized_permission])
+        get_authorization(self.authorized_user)
+
+    def approve(self, workflow_object, next_state=None):
+        workflow_object = BasicTestModel.objects.get(pk=workflow_object.pk)
+        BasicTestModel.river.my_field.graph  # pylint: disable=pointless-statement
+        with CaptureQueriesContext(connection) as queries:
+            workflow_object.river.my_field.approve(as_user=self.authorized_user, next_state=next_state)
+        return len([
+            query for query in queries.captured_queries
+            if 'river_callback' not in query['sql'] and not query['sql'].startswith(('SAVEPOINT', 'RELEASE SAVEPOINT'))
+        ])
+
+    def test_shouldApproveWithinTheBudgetWhenThereIsASingleApprover(self):
+        state1 = StateObjectFactory(label="state1")
+        state2 = StateObjectFactory(label="state2")
+        state3 = StateObjectFactory(label="state3")
+        workflow = WorkflowFactory(initial_state=state1, content_type=self.content_type, field_name="my_field")
+        for source_state, destination_state in [(state1, state2), (state2, state3)]:
+            TransitionApprovalMetaFactory.create(workflow=workflow, source_state=source_state, destination_state=destination_state, priority=0,
+                                                 permissions=[self.authorized_permission])
+
+        workflow_object = BasicTestModelObjectFactory().model
+
+        assert_that(self.approve(workflow_object), equal_to(APPROVE_QUERY_BUDGET))
+        assert_that(BasicTestModel.objects.get(pk=workflow_object.pk).my_field, equal_to(state2))
+
+    def test_shouldApproveWithinTheBudgetWhenThereAreMultiplePeers(self):
+        state1 = StateObjectFactory(label="state1")
+        state2 = StateObjectFactory(label="state2")
+        state3 = StateObjectFactory(label="state3")
+        workflow = WorkflowFactory(initial_state=state1, content_type=self.content_type, field_name="my_field")
+        for priority in range(3):
+            TransitionApprovalMetaFactory.create(workflow=workflow, source_state=state1, destination_state=state2, priority=priority,
+                                                 permissions=[self.authorized_permission])
+        TransitionApprovalMetaFactory.create(workflow=workflow, source_state=state2, destination_state=state3, priority=0, permissions=[self.authorized_permission])
+
+        workflow_object = BasicTestModelObjectFactory().model
+
+        for _ in range(3):
+            assert_that(self.approve(workflow_object), equal_to(APPROVE_QUERY_BUDGET))
+        assert_that(BasicTestModel.objects.get(pk=workflow_object.pk).my_field, equal_to(state2))
+
+    def test_shouldApproveWithinTheBudgetWhenItTransitsToTheFinalState(self):
+        state1 = StateObjectFactory(label="state1")
+        state2 = StateObjectFactory(label="state2")
+        workflow = WorkflowFactory(initial_state=state1, content_type=self.content_type, field_name="my_field")
+        TransitionApprovalMetaFactory.create(workflow=workflow, source_state=state1, destination_state=state2, priority=0, permissions=[self.authorized_permission])
+
+        workflow_object = BasicTestModelObjectFactory().model
+
+        assert_that(self.approve(workflow_object), equal_to(APPROVE_QUERY_BUDGET))
+        assert_that(BasicTestModel.objects.get(pk=workflow_object.pk).river.my_field.on_final_state, equal_to(True))
+
+    def test_shouldApproveWithinTheBudgetWhenItCycles(self):
+        state1 = StateObjectFactory(label="state1")
+        state2 = StateObjectFactory(label="state2")
+        state3 = StateObjectFactory(label="state3")
+        state4 = StateObjectFactory(label="state4")
+        workflow = WorkflowFactory(initial_state=state1, content_type=self.content_type, field_name="my_field")
+        for source_state, destination_state in [(state1, state2), (state2, state3), (state3, state2), (state3, state4)]:
+            TransitionApprovalMetaFactory.create(workflow=workflow, source_state=source_state, destination_state=destination_state, priority=0,
+                                                 permissions=[self.authorized_permission])
+
+        workflow_object = BasicTestModelObjectFactory().model
+
+        assert_that(self.approve(workflow_object), equal_to(APPROVE_QUERY_BUDGET))
+        assert_that(self.approve(workflow_object), equal_to(APPROVE_QUERY_BUDGET))
+
+        assert_that(self.approve(workflow_object, next_state=state2), equal_to(APPROVE_QUERY_BUDGET + RESET_CYCLE_QUERY_BUDGET))
+        assert_that(BasicTestModel.objects.get(pk=workflow_object.pk).my_field, equal_to(state2))
+        assert_that(TransitionApproval.objects.filter(workflow_object=workflow_object, status=PENDING, source_state=state2), has_length(1))
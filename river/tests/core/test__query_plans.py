@@ -0,0 +1,120 @@
+import re
+from unittest import skipUnless
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from hamcrest import assert_that, has_item, is_not, matches_regexp, empty
+
+from river.models import TransitionApproval, APPROVED
+from river.models.factories import PermissionObjectFactory, UserObjectFactory, StateObjectFactory, TransitionApprovalMetaFactory, WorkflowFactory
+from river.tests.models import BasicTestModel
+from river.tests.models.factories import BasicTestModelObjectFactory
+
+__author__ = 'ahmetdal'
+
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?river_transitionapproval\b')
+
+
+def query_plan(sql, params=()):
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def query_plans_of(func):
+    with CaptureQueriesContext(connection) as queries:
+        func()
+    return [
+        query_plan(query['sql']) for query in queries.captured_queries
+        if query['sql'].startswith(('SELECT', 'WITH')) and 'river_transitionapproval' in query['sql']
+    ]
+
+
+# noinspection PyMethodMayBeStatic,DuplicatedCode
+@skipUnless(connection.vendor == 'sqlite', "Query plans are only captured on SQLite")
+class QueryPlanTest(TestCase):
+
+    def __init__(self, *args, **kwargs):
+        super(QueryPlanTest, self).__init__(*args, **kwargs)
+        self.content_type = ContentType.objects.get_for_model(BasicTestModel)
+
+    def setUp(self):
+        authorized_permission = PermissionObjectFactory()
+        self.authorized_user = UserObjectFactory(user_permissions=[authorized_permission])
+
+        self.state1 = StateObjectFactory(label="state1")
+        self.state2 = StateObjectFactory(label="state2")
+        self.state3 = StateObjectFactory(label="state3")
+
+        self.workflow = WorkflowFactory(initial_state=self.state1, content_type=self.content_type, field_name="my_field")
+        TransitionApprovalMetaFactory.create(
+            workflow=self.workflow,
+            source_state=self.state1,
+            destination_state=self.state2,
+            priority=0,
+            permissions=[authorized_permission]
+        )
+        TransitionApprovalMetaFactory.create(
+            workflow=self.workflow,
+            source_state=self.state2,
+            destination_state=self.state3,
+            priority=0,
+            permissions=[authorized_permission]
+        )
+        TransitionApprovalMetaFactory.create(
+            workflow=self.workflow,
+            source_state=self.state3,
+            destination_state=self.state2,
+            priority=0,
+            permissions=[authorized_permission]
+        )
+        self.workflow_object = BasicTestModelObjectFactory.create_batch(20)[0]
+        self.approval = TransitionApproval.objects.filter(workflow_object=self.workflow_object, source_state=self.state1).first()
+
+    def assert_uses_index(self, plans, index_name):
+        assert_that(plans, is_not(empty()))
+        for plan in plans:
+            for detail in plan:
+                assert_that(detail, is_not(matches_regexp(FULL_SCAN)))
+        assert_that([detail for plan in plans for detail in plan], has_item(matches_regexp(r'river_transitionapproval.* USING (COVERING )?INDEX %s\b' % index_name)))
+
+    def test_shouldUseTheIndexesForTheAvailableApprovals(self):
+        self.assert_uses_index(
+            query_plans_of(lambda: list(BasicTestModel.river.my_field.get_available_approvals(as_user=self.authorized_user))),
+            'river_approval_pending_idx'
+        )
+
+    def test_shouldUseTheIndexesForThePeers(self):
+        self.assert_uses_index(query_plans_of(lambda: list(self.approval.peers)), 'river_approval_object_idx')
+
+    def test_shouldUseTheIndexesForTheDownstream(self):
+        self.assert_uses_index(query_plans_of(lambda: list(self.approval.downstream)), 'river_approval_object_idx')
+
+    def test_shouldUseTheIndexesToApprove(self):
+        self.assert_uses_index(
+            query_plans_of(lambda: self.workflow_object.river.my_field.approve(as_user=self.authorized_user)),
+            'river_approval_recent_idx'
+        )
+
+    def test_shouldUseTheIndexesToApproveMany(self):
+        self.assert_uses_index(
+            query_plans_of(lambda: BasicTestModel.river.my_field.approve_many(BasicTestModel.objects.all(), as_user=self.authorized_user)),
+            'river_approval_pending_idx'
+        )
+
+    def test_shouldUseTheIndexesToResetTheCycles(self):
+        self.workflow_object.river.my_field.approve(as_user=self.authorized_user)
+        self.workflow_object.river.my_field.approve(as_user=self.authorized_user)
+        approval = TransitionApproval.objects.get(object_id=self.workflow_object.pk, workflow=self.workflow, source_state=self.state3)
+        approval.status = APPROVED
+        approval.save()
+
+        self.assert_uses_index(
+            query_plans_of(lambda: BasicTestModel.river.my_field._reset_cycles([approval])),  # pylint: disable=protected-access
+            'river_approval_object_idx'
+        )
+
+    def test_shouldUseTheIndexesForTheRecentApproval(self):
+        self.assert_uses_index(query_plans_of(lambda: self.workflow_object.river.my_field.recent_approval), 'river_approval_recent_idx')
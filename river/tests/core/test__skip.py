@@ -0,0 +1,91 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from hamcrest import assert_that, equal_to, has_length
+
+from river.models import TransitionApproval
+from river.models.factories import StateObjectFactory, TransitionApprovalMetaFactory, PermissionObjectFactory, WorkflowFactory
+from river.tests.models import BasicTestModel
+from river.tests.models.factories import BasicTestModelObjectFactory
+
+__author__ = 'ahmetdal'
+
+
+# noinspection DuplicatedCode
+class SkipTest(TestCase):
+
+    def setUp(self):
+        self.state1 = StateObjectFactory(label="state1")
+        self.state2 = StateObjectFactory(label="state2")
+        self.state3 = StateObjectFactory(label="state3")
+        self.state4 = StateObjectFactory(label="state4")
+
+        content_type = ContentType.objects.get_for_model(BasicTestModel)
+        workflow = WorkflowFactory(initial_state=self.state1, content_type=content_type, field_name="my_field")
+        for source_state, destination_state, priority in [
+            (self.state1, self.state2, 0),
+            (self.state1, self.state2, 1),
+            (self.state2, self.state3, 0),
+            (self.state3, self.state4, 0),
+        ]:
+            TransitionApprovalMetaFactory.create(
+                workflow=workflow,
+                source_state=source_state,
+                destination_state=destination_state,
+                priority=priority,
+                permissions=[PermissionObjectFactory()]
+            )
+
+    def approvals_of(self, workflow_object):
+        return sorted(
+            (
+                approval.source_state.label,
+                approval.destination_state.label,
+                approval.priority,
+                approval.meta_id,
+                approval.status,
+                approval.skipped,
+                sorted(approval.permissions.values_list('pk', flat=True)),
+                sorted(approval.skipped_from.values_list('source_state__label', 'destination_state__label', 'priority'))
+            )
+            for approval in TransitionApproval.objects.filter(workflow_object=workflow_object)
+        )
+
+    def assert_skips_like_one_by_one(self, **criteria):
+        skipped_one_by_one = BasicTestModelObjectFactory().model
+        skipped_in_bulk = BasicTestModelObjectFactory().model
+
+        for approval in TransitionApproval.objects.filter(workflow_object=skipped_one_by_one, **criteria).order_by('pk'):
+            approval.skip()
+        TransitionApproval.objects.skip(workflow_object=skipped_in_bulk, **criteria)
+
+        assert_that(self.approvals_of(skipped_in_bulk), equal_to(self.approvals_of(skipped_one_by_one)))
+        return self.approvals_of(skipped_in_bulk)
+
+    def test_shouldSkipAStepLikeSkippingItsApprovalsOneByOne(self):
+        approvals = self.assert_skips_like_one_by_one(source_state=self.state2)
+
+        assert_that([approval for approval in approvals if approval[:2] == ("state2", "state4")], has_length(1))
+
+    def test_shouldSkipOneOfThePeersLikeSkippingItOneByOne(self):
+        self.assert_skips_like_one_by_one(source_state=self.state1, priority=0)
+
+    def test_shouldSkipAllThePeersLikeSkippingThemOneByOne(self):
+        self.assert_skips_like_one_by_one(source_state=self.state1)
+
+    def test_shouldSkipConsecutiveStepsLikeSkippingThemOneByOne(self):
+        self.assert_skips_like_one_by_one(source_state__in=[self.state2, self.state3])
+
+    def test_shouldSkipApprovalsWhichAreAlreadySkippedLikeSkippingThemOneByOne(self):
+        self.assert_skips_like_one_by_one(source_state__in=[self.state1, self.state2, self.state3])
+
+    def test_shouldSkipTheApprovalsOfManyObjectsWithAFixedNumberOfQueries(self):
+        def count_queries(number_of_objects):
+            workflow_objects = [BasicTestModelObjectFactory().model for _ in range(number_of_objects)]
+            with CaptureQueriesContext(connection) as queries:
+                TransitionApproval.objects.skip(object_id__in=[workflow_object.pk for workflow_object in workflow_objects], source_state=self.state2)
+            return len(queries.captured_queries)
+
+        assert_that(count_queries(10), equal_to(count_queries(2)))
+        assert_that(TransitionApproval.objects.filter(source_state=self.state2, destination_state=self.state4, skipped=False), has_length(12))
@@ -0,0 +1,168 @@
+from timeit import default_timer
+from uuid import uuid4
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import caches
+from django.db import transaction
+from django.test import TestCase
+from hamcrest import assert_that, equal_to, has_length, has_item, has_items, is_not, none, same_instance
+from mock import patch
+
+from river.config import app_config
+from river.core.workflowgraph import workflow_graph_registry, VERSION_CACHE_KEY
+from river.models.factories import StateObjectFactory, TransitionApprovalMetaFactory, WorkflowFactory, PermissionObjectFactory, GroupObjectFactory
+from river.tests.models import BasicTestModel
+from river.tests.models.factories import BasicTestModelObjectFactory
+
+__author__ = 'ahmetdal'
+
+
+# noinspection PyMethodMayBeStatic,DuplicatedCode
+class WorkflowGraphTest(TestCase):
+
+    def __init__(self, *args, **kwargs):
+        super(WorkflowGraphTest, self).__init__(*args, **kwargs)
+        self.content_type = ContentType.objects.get_for_model(BasicTestModel)
+
+    def test_shouldCompileTheWorkflowDefinition(self):
+        permission = PermissionObjectFactory()
+        group = GroupObjectFactory()
+
+        state1 = StateObjectFactory(label="state1")
+        state2 = StateObjectFactory(label="state2")
+        state3 = StateObjectFactory(label="state3")
+
+        workflow = WorkflowFactory(initial_state=state1, content_type=self.content_type, field_name="my_field")
+        meta_1 = TransitionApprovalMetaFactory.create(workflow=workflow, source_state=state1, destination_state=state2, priority=0, permissions=[permission])
+        meta_2 = TransitionApprovalMetaFactory.create(workflow=workflow, source_state=state1, destination_state=state2, priority=1)
+        meta_3 = TransitionApprovalMetaFactory.create(workflow=workflow, source_state=state2, destination_state=state3, priority=0)
+        meta_3.groups.add(group)
+
+        graph = workflow_graph_registry.get(self.content_type, "my_field")
+
+        assert_that(graph.workflow, equal_to(workflow))
+        assert_that(graph.initial_state, equal_to(state1))
+        assert_that(graph.next_metas(state1), has_items(meta_1, meta_2))
+        assert_that(graph.next_metas(state3), has_length(0))
+        assert_that(graph.children[meta_1.pk], equal_to({meta_3.pk}))
+        assert_that(graph.parents[meta_3.pk], equal_to({meta_1.pk, meta_2.pk}))
+        assert_that(graph.permissions[meta_1.pk], equal_to([permission.pk]))
+        assert_that(graph.groups[meta_3.pk], equal_to([group.pk]))
+        assert_that(graph.priority_tiers[(state1.pk, state2.pk)], equal_to([0, 1]))
+        assert_that(graph.final_states, has_length(1))
+        assert_that(graph.final_states, has_item(state3))
+
+    def test_shouldNotQueryTheDefinitionAgainWhenItIsNotChanged(self):
+        state1 = StateObjectFactory(label="state1")
+        state2 = StateObjectFactory(label="state2")
+
+        workflow = WorkflowFactory(initial_state=state1, content_type=self.content_type, field_name="my_field")
+        TransitionApprovalMetaFactory.create(workflow=workflow, source_state=state1, destination_state=state2, priority=0)
+
+        graph = workflow_graph_registry.get(self.content_type, "my_field")
+        with self.assertNumQueries(0):
+            assert_that(workflow_graph_registry.get(self.content_type, "my_field"), same_instance(graph))
+            assert_that(BasicTestModel.river.my_field.workflow, equal_to(workflow))
+            assert_that(BasicTestModel.river.my_field.initial_state, equal_to(state1))
+
+    def test_shouldTellWhetherAnObjectIsOnTheInitialOrTheFinalStateWithoutAnyQuery(self):
+        state1 = StateObjectFactory(label="state1")
+        state2 = StateObjectFactory(label="state2")
+
+        workflow = WorkflowFactory(initial_state=state1, content_type=self.content_type, field_name="my_field")
+        TransitionApprovalMetaFactory.create(workflow=workflow, source_state=state1, destination_state=state2, priority=0)
+        workflow_object = BasicTestModelObjectFactory().model
+        completed_workflow_object = BasicTestModelObjectFactory().model
+        BasicTestModel.objects.filter(pk=completed_workflow_object.pk).update(my_field=state2)
+        completed_workflow_object = BasicTestModel.objects.get(pk=completed_workflow_object.pk)
+
+        workflow_graph_registry.get(self.content_type, "my_field")
+        with self.assertNumQueries(0):
+            assert_that(workflow_object.river.my_field.on_initial_state, equal_to(True))
+            assert_that(workflow_object.river.my_field.on_final_state, equal_to(False))
+            assert_that(completed_workflow_object.river.my_field.on_initial_state, equal_to(False))
+            assert_that(completed_workflow_object.river.my_field.on_final_state, equal_to(True))
+
+    def test_shouldFindTheCyclesOfTheWorkflow(self):
+        states = [StateObjectFactory(label="state%s" % index) for index in range(6)]
+
+        workflow = WorkflowFactory(initial_state=states[0], content_type=self.content_type, field_name="my_field")
+        for source, destination in [(0, 1), (1, 2), (2, 1), (2, 3), (3, 4), (4, 4), (4, 5)]:
+            TransitionApprovalMetaFactory.create(workflow=workflow, source_state=states[source], destination_state=states[destination], priority=0)
+
+        graph = workflow_graph_registry.get(self.content_type, "my_field")
+
+        assert_that(graph.cycles, equal_to({
+            states[1].pk: frozenset([states[1].pk, states[2].pk]),
+            states[2].pk: frozenset([states[1].pk, states[2].pk]),
+            states[4].pk: frozenset([states[4].pk]),
+        }))
+
+    def test_shouldRecompileWhenTheDefinitionIsChanged(self):
+        state1 = StateObjectFactory(label="state1")
+        state2 = StateObjectFactory(label="state2")
+        state3 = StateObjectFactory(label="state3")
+
+        workflow = WorkflowFactory(initial_state=state1, content_type=self.content_type, field_name="my_field")
+        TransitionApprovalMetaFactory.create(workflow=workflow, source_state=state1, destination_state=state2, priority=0)
+
+        graph = workflow_graph_registry.get(self.content_type, "my_field")
+        assert_that(graph.final_states, has_item(state2))
+
+        TransitionApprovalMetaFactory.create(workflow=workflow, source_state=state2, destination_state=state3, priority=0)
+
+        recompiled_graph = workflow_graph_registry.get(self.content_type, "my_field")
+        assert_that(recompiled_graph, is_not(same_instance(graph)))
+        assert_that(recompiled_graph.final_states, has_length(1))
+        assert_that(recompiled_graph.final_states, has_item(state3))
+
+        workflow.delete()
+
+        assert_that(workflow_graph_registry.get(self.content_type, "my_field"), none())
+
+    def test_shouldReadTheVersionOfTheOtherProcessesAtMostOnceInTheTTL(self):
+        state1 = StateObjectFactory(label="state1")
+        state2 = StateObjectFactory(label="state2")
+
+        workflow = WorkflowFactory(initial_state=state1, content_type=self.content_type, field_name="my_field")
+        TransitionApprovalMetaFactory.create(workflow=workflow, source_state=state1, destination_state=state2, priority=0)
+
+        cache = caches[app_config.CACHE_ALIAS]
+        now = [default_timer() + 60 * 60]
+        with patch('river.core.workflowgraph.default_timer', lambda: now[0]):
+            graph = workflow_graph_registry.get(self.content_type, "my_field")
+            cache.set(VERSION_CACHE_KEY, uuid4().hex, None)
+
+            with patch.object(cache, 'get', wraps=cache.get) as cache_get:
+                now[0] += app_config.WORKFLOW_GRAPH_TTL - 1
+                assert_that(workflow_graph_registry.get(self.content_type, "my_field"), same_instance(graph))
+                assert_that(workflow_graph_registry.get(self.content_type, "my_field"), same_instance(graph))
+                assert_that(cache_get.call_count, equal_to(0))
+
+                now[0] += 1
+                assert_that(workflow_graph_registry.get(self.content_type, "my_field"), is_not(same_instance(graph)))
+                assert_that(workflow_graph_registry.get(self.content_type, "my_field"), is_not(same_instance(graph)))
+                assert_that(cache_get.call_count, equal_to(1))
+
+    def test_shouldRecompileWhenTheDefinitionChangeIsRolledBack(self):
+        state1 = StateObjectFactory(label="state1")
+        state2 = StateObjectFactory(label="state2")
+        state3 = StateObjectFactory(label="state3")
+
+        workflow = WorkflowFactory(initial_state=state1, content_type=self.content_type, field_name="my_field")
+        TransitionApprovalMetaFactory.create(workflow=workflow, source_state=state1, destination_state=state2, priority=0)
+
+        try:
+            with transaction.atomic():
+                TransitionApprovalMetaFactory.create(workflow=workflow, source_state=state2, destination_state=state3, priority=0)
+                assert_that(workflow_graph_registry.get(self.content_type, "my_field").final_states, equal_to([state3]))
+                raise ValueError("rollback")
+        except ValueError:
+            pass
+
+        assert_that(workflow_graph_registry.get(self.content_type, "my_field").final_states, equal_to([state2]))
+
+    def test_shouldSaveTheObjectsWithoutAWorkflowWithoutAState(self):
+        workflow_object = BasicTestModelObjectFactory().model
+
+        assert_that(workflow_object.my_field, none())
@@ -0,0 +1,107 @@
+import threading
+import time
+
+from django.core.cache import caches
+from django.test import TestCase
+from hamcrest import assert_that, has_length, has_item, has_property, empty, equal_to
+
+from river.config import app_config
+from river.hooking.backends.cache import CacheHookingBackend, LOCK_CACHE_KEY
+from river.hooking.transition import PostTransitionHooking
+from river.models.factories import StateObjectFactory
+from river.tests.models.factories import BasicTestModelObjectFactory
+
+__author__ = 'ahmetdal'
+
+
+def test_callback(*args, **kwargs):
+    pass
+
+
+# noinspection DuplicatedCode
+class CacheHookingBackendTest(TestCase):
+    def setUp(self):
+        self.field_name = "my_field"
+        caches[app_config.CACHE_ALIAS].clear()
+        self.handler_backend = CacheHookingBackend(ttl=60)
+        self.other_handler_backend = CacheHookingBackend(ttl=0)
+
+    def test_shouldReturnTheRegisteredHooking(self):
+        workflow_object = BasicTestModelObjectFactory().model
+
+        assert_that(self.handler_backend.has_callbacks(PostTransitionHooking), equal_to(False))
+
+        self.handler_backend.register(PostTransitionHooking, test_callback, workflow_object, self.field_name)
+
+        assert_that(self.handler_backend.has_callbacks(PostTransitionHooking), equal_to(True))
+        callbacks = self.handler_backend.get_callbacks(PostTransitionHooking, workflow_object, self.field_name)
+        assert_that(callbacks, has_length(1))
+        assert_that(callbacks, has_item(has_property("__name__", test_callback.__name__)))
+
+    def test_shouldReturnTheHookingRegisteredInAnotherProcess(self):
+        workflow_object = BasicTestModelObjectFactory().model
+
+        self.handler_backend.register(PostTransitionHooking, test_callback, workflow_object, self.field_name)
+
+        assert_that(self.other_handler_backend.has_callbacks(PostTransitionHooking), equal_to(True))
+        assert_that(self.other_handler_backend.get_callbacks(PostTransitionHooking, workflow_object, self.field_name), has_item(test_callback))
+
+    def test_shouldOnlyReturnTheHookingsMatchingTheCriteria(self):
+        workflow_object = BasicTestModelObjectFactory().model
+        state1 = StateObjectFactory(label="state1")
+        state2 = StateObjectFactory(label="state2")
+
+        self.handler_backend.register(PostTransitionHooking, test_callback, workflow_object, self.field_name, source_state=state1)
+
+        assert_that(self.other_handler_backend.get_callbacks(PostTransitionHooking, workflow_object, self.field_name, source_state=state1, destination_state=state2), has_length(1))
+        assert_that(self.other_handler_backend.get_callbacks(PostTransitionHooking, workflow_object, self.field_name, source_state=state2, destination_state=state1), empty())
+
+    def test_shouldRefreshTheNearCacheAfterItsTimeToLive(self):
+        workflow_object = BasicTestModelObjectFactory().model
+        handler_backend = CacheHookingBackend(ttl=0.1)
+
+        assert_that(handler_backend.get_callbacks(PostTransitionHooking, workflow_object, self.field_name), empty())
+        self.other_handler_backend.register(PostTransitionHooking, test_callback, workflow_object, self.field_name)
+        assert_that(handler_backend.get_callbacks(PostTransitionHooking, workflow_object, self.field_name), empty())
+
+        time.sleep(0.2)
+        assert_that(handler_backend.get_callbacks(PostTransitionHooking, workflow_object, self.field_name), has_length(1))
+
+    def test_shouldKeepOnlyTheMostRecentlyUsedEntriesInMemory(self):
+        workflow_objects = BasicTestModelObjectFactory.create_batch(3)
+        handler_backend = CacheHookingBackend(ttl=60, cache_size=2)
+        keys = [handler_backend.get_entries_key(PostTransitionHooking, (str(workflow_object.pk), self.field_name)) for workflow_object in workflow_objects]
+
+        for workflow_object in workflow_objects[:2]:
+            handler_backend.get_callbacks(PostTransitionHooking, workflow_object, self.field_name)
+        handler_backend.get_callbacks(PostTransitionHooking, workflow_objects[0], self.field_name)
+        handler_backend.get_callbacks(PostTransitionHooking, workflow_objects[2], self.field_name)
+
+        assert_that(list(handler_backend._near_cache), equal_to([keys[0], keys[2]]))  # pylint: disable=protected-access
+
+    def test_shouldUnregisterAHookingForAllTheProcesses(self):
+        workflow_object = BasicTestModelObjectFactory().model
+
+        self.handler_backend.register(PostTransitionHooking, test_callback, workflow_object, self.field_name)
+        assert_that(self.other_handler_backend.get_callbacks(PostTransitionHooking, workflow_object, self.field_name), has_length(1))
+
+        self.handler_backend.unregister(PostTransitionHooking, workflow_object, self.field_name)
+
+        assert_that(self.handler_backend.get_callbacks(PostTransitionHooking, workflow_object, self.field_name), empty())
+        assert_that(self.other_handler_backend.get_callbacks(PostTransitionHooking, workflow_object, self.field_name), empty())
+
+    def test_shouldWaitForTheLockOfTheEntryToRegisterAHooking(self):
+        workflow_object = BasicTestModelObjectFactory().model
+        key = self.handler_backend.get_entries_key(PostTransitionHooking, (str(workflow_object.pk), self.field_name))
+        cache = caches[app_config.CACHE_ALIAS]
+        cache.add(LOCK_CACHE_KEY % key, 'another process', 60)
+
+        registering = threading.Thread(target=self.handler_backend.register, args=(PostTransitionHooking, test_callback, workflow_object, self.field_name))
+        registering.start()
+        time.sleep(0.1)
+        assert_that(cache.get(key), equal_to(None))
+
+        cache.delete(LOCK_CACHE_KEY % key)
+        registering.join()
+        assert_that(self.other_handler_backend.get_callbacks(PostTransitionHooking, workflow_object, self.field_name), has_length(1))
+        assert_that(cache.get(LOCK_CACHE_KEY % key), equal_to(None))
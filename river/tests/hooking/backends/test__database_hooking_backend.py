@@ -1,14 +1,24 @@
+from uuid import uuid4
+
+from django.apps import apps
 from django.contrib.contenttypes.models import ContentType
+from django.core.cache import caches
+from django.db import connection
 from django.test import TestCase
-from hamcrest import is_not, assert_that, has_key, has_property, has_value, has_length, has_item
+from django.test.utils import CaptureQueriesContext
+from mock import patch
+from hamcrest import is_not, assert_that, has_key, has_property, has_value, has_length, has_item, empty, equal_to
 
 from river.config import app_config
+from river.hooking.backends.base import LOGGER
+from river.hooking.backends.database import VERSION_CACHE_KEY, DatabaseHookingBackend
 from river.hooking.backends.loader import callback_backend
 from river.hooking.transition import PostTransitionHooking
 from river.models.callback import Callback
 from river.models.factories import WorkflowFactory, TransitionApprovalMetaFactory, StateObjectFactory, PermissionObjectFactory
 from river.tests.models import BasicTestModel
 from river.tests.models.factories import BasicTestModelObjectFactory
+from river.utils.bulk import raw_delete
 
 __author__ = 'ahmetdal'
 
@@ -39,6 +49,7 @@ class DatabaseHookingBackendTest(TestCase):
         app_config.HOOKING_BACKEND_CLASS = 'river.hooking.backends.database.DatabaseHookingBackend'
         self.handler_backend = callback_backend
         self.handler_backend.callbacks = {}
+        self.handler_backend.dispatch_table = {}
 
     def test_shouldRegisterAHooking(self):
         workflow_objects = BasicTestModelObjectFactory.create_batch(2)
@@ -149,3 +160,202 @@ class DatabaseHookingBackendTest(TestCase):
         assert_that(self.handler_backend.callbacks, is_not(has_value(has_property("__name__", test_callback.__name__))))
 
         assert_that(Callback.objects.filter(hash=hooking_hash), has_length(0))
+
+    def test_shouldRemoveTheCallbacksOfAllTheDeletedWorkflowObjectsAtOnce(self):
+        workflow_objects = BasicTestModelObjectFactory.create_batch(20)
+        state = StateObjectFactory(label="state3")
+        for workflow_object in workflow_objects:
+            self.handler_backend.register(PostTransitionHooking, test_callback, workflow_object, self.field_name)
+            self.handler_backend.register(PostTransitionHooking, test_callback, workflow_object, self.field_name, source_state=state)
+        self.handler_backend.register(PostTransitionHooking, test_callback, None, self.field_name)
+        assert_that(Callback.objects.all(), has_length(41))
+
+        with CaptureQueriesContext(connection) as queries:
+            BasicTestModel.objects.all().delete()
+        assert_that([query['sql'] for query in queries.captured_queries if 'river_callback' in query['sql']], has_length(1))
+
+        assert_that(Callback.objects.filter(object_id__isnull=False), empty())
+        assert_that(Callback.objects.filter(object_id__isnull=True), has_length(1))
+        assert_that(self.handler_backend.get_callbacks(PostTransitionHooking, None, self.field_name, source_state=state), has_length(1))
+
+    def test_shouldNotBumpTheVersionWhenTheDeletedWorkflowObjectsHaveNoCallbacks(self):
+        workflow_object = BasicTestModelObjectFactory().model
+        self.handler_backend.register(PostTransitionHooking, test_callback, None, self.field_name)
+        version = self.handler_backend.version
+
+        workflow_object.delete()
+
+        assert_that(self.handler_backend.version, equal_to(version))
+
+    def test_shouldUnhookTheGivenWorkflowObjects(self):
+        workflow_objects = BasicTestModelObjectFactory.create_batch(3)
+        for workflow_object in workflow_objects:
+            self.handler_backend.register(PostTransitionHooking, test_callback, workflow_object, self.field_name)
+
+        BasicTestModel.river.my_field.unhook(BasicTestModel.objects.filter(pk__in=[workflow_objects[0].pk, workflow_objects[1].pk]))
+
+        assert_that(self.handler_backend.get_callbacks(PostTransitionHooking, workflow_objects[0], self.field_name), empty())
+        assert_that(self.handler_backend.get_callbacks(PostTransitionHooking, workflow_objects[1], self.field_name), empty())
+        assert_that(self.handler_backend.get_callbacks(PostTransitionHooking, workflow_objects[2], self.field_name), has_length(1))
+        assert_that(Callback.objects.filter(object_id=str(workflow_objects[2].pk)), has_length(1))
+        assert_that(Callback.objects.all(), has_length(1))
+
+    def test_shouldNotLookTheCallbacksUpAgainUntilTheyChange(self):
+        workflow_object = BasicTestModelObjectFactory().model
+
+        assert_that(self.handler_backend.get_callbacks(PostTransitionHooking, workflow_object, self.field_name), empty())
+        assert_that(self.handler_backend.has_callbacks(PostTransitionHooking), equal_to(False))
+        with CaptureQueriesContext(connection) as queries:
+            assert_that(self.handler_backend.get_callbacks(PostTransitionHooking, workflow_object, self.field_name), empty())
+            assert_that(self.handler_backend.has_callbacks(PostTransitionHooking), equal_to(False))
+        assert_that(queries.captured_queries, empty())
+
+        Callback.objects.create(
+            hash='%s.%s_object%s_field_name%s' % (PostTransitionHooking.__module__, PostTransitionHooking.__name__, workflow_object.pk, self.field_name),
+            method='%s.%s' % (test_callback.__module__, test_callback.__name__),
+            hooking_cls='%s.%s' % (PostTransitionHooking.__module__, PostTransitionHooking.__name__),
+            object_id=str(workflow_object.pk),
+            field_name=self.field_name,
+        )
+
+        assert_that(self.handler_backend.has_callbacks(PostTransitionHooking), equal_to(True))
+        assert_that(self.handler_backend.get_callbacks(PostTransitionHooking, workflow_object, self.field_name), has_item(has_property("__name__", test_callback.__name__)))
+
+    def test_shouldLookTheCallbacksUpAgainWhenTheyAreChangedInAnotherProcess(self):
+        workflow_object = BasicTestModelObjectFactory().model
+
+        assert_that(self.handler_backend.get_callbacks(PostTransitionHooking, workflow_object, self.field_name), empty())
+
+        Callback.objects.bulk_create([Callback(
+            hash='%s.%s_object%s_field_name%s' % (PostTransitionHooking.__module__, PostTransitionHooking.__name__, workflow_object.pk, self.field_name),
+            method='%s.%s' % (test_callback.__module__, test_callback.__name__),
+            hooking_cls='%s.%s' % (PostTransitionHooking.__module__, PostTransitionHooking.__name__),
+            object_id=str(workflow_object.pk),
+            field_name=self.field_name,
+        )])
+
+        assert_that(self.handler_backend.get_callbacks(PostTransitionHooking, workflow_object, self.field_name), empty())
+
+        caches[app_config.CACHE_ALIAS].set(VERSION_CACHE_KEY, uuid4().hex, None)
+
+        assert_that(self.handler_backend.get_callbacks(PostTransitionHooking, workflow_object, self.field_name), has_item(has_property("__name__", test_callback.__name__)))
+
+    def test_shouldNotReturnTheCallbacksUnregisteredByAnotherBackend(self):
+        workflow_object = BasicTestModelObjectFactory().model
+        backend_a, backend_b = DatabaseHookingBackend(), DatabaseHookingBackend()
+
+        backend_a.register(PostTransitionHooking, test_callback, workflow_object, self.field_name)
+        assert_that(backend_b.get_callbacks(PostTransitionHooking, workflow_object, self.field_name), has_item(has_property("__name__", test_callback.__name__)))
+
+        backend_a.unregister(PostTransitionHooking, workflow_object, self.field_name)
+        assert_that(backend_b.get_callbacks(PostTransitionHooking, workflow_object, self.field_name), empty())
+
+    def test_shouldNotReturnTheCallbacksDeletedInAnotherProcess(self):
+        workflow_object = BasicTestModelObjectFactory().model
+        Callback.objects.bulk_create([self.callback_row(workflow_object)])
+        backend = DatabaseHookingBackend()
+
+        assert_that(backend.get_callbacks(PostTransitionHooking, workflow_object, self.field_name), has_item(has_property("__name__", test_callback.__name__)))
+
+        raw_delete(Callback.objects.filter(object_id=str(workflow_object.pk)))
+        caches[app_config.CACHE_ALIAS].set(VERSION_CACHE_KEY, uuid4().hex, None)
+
+        assert_that(backend.get_callbacks(PostTransitionHooking, workflow_object, self.field_name), empty())
+
+    def callback_row(self, workflow_object, method=None):
+        return Callback(
+            hash='%s.%s_object%s_field_name%s' % (PostTransitionHooking.__module__, PostTransitionHooking.__name__, workflow_object.pk if workflow_object else '', self.field_name),
+            method=method or '%s.%s' % (test_callback.__module__, test_callback.__name__),
+            hooking_cls='%s.%s' % (PostTransitionHooking.__module__, PostTransitionHooking.__name__),
+            object_id=str(workflow_object.pk) if workflow_object else None,
+            field_name=self.field_name,
+        )
+
+    def test_shouldOnlyLoadTheClassLevelCallbacksInitially(self):
+        workflow_object = BasicTestModelObjectFactory().model
+        class_callback, object_callback = Callback.objects.bulk_create([self.callback_row(None), self.callback_row(workflow_object)])
+
+        handler_backend = DatabaseHookingBackend()
+        handler_backend.initialize_callbacks()
+
+        assert_that(handler_backend.callbacks, has_key(class_callback.hash))
+        assert_that(handler_backend.callbacks, is_not(has_key(object_callback.hash)))
+
+        assert_that(handler_backend.get_callbacks(PostTransitionHooking, workflow_object, self.field_name), has_length(1))
+        assert_that(handler_backend.callbacks, has_key(object_callback.hash))
+
+    def test_shouldKeepTheCallbacksOfTheLeastRecentlyUsedWorkflowObjectsOnlyInTheDatabase(self):
+        workflow_objects = BasicTestModelObjectFactory.create_batch(3)
+        handler_backend = DatabaseHookingBackend(cache_size=2)
+        hashes = [handler_backend.register(PostTransitionHooking, test_callback, workflow_object, self.field_name) for workflow_object in workflow_objects]
+
+        assert_that(handler_backend.callbacks, is_not(has_key(hashes[0])))
+        assert_that(handler_backend.callbacks, has_key(hashes[1]))
+        assert_that(handler_backend.callbacks, has_key(hashes[2]))
+
+        assert_that(handler_backend.get_callbacks(PostTransitionHooking, workflow_objects[0], self.field_name), has_length(1))
+        assert_that(handler_backend.callbacks, has_key(hashes[0]))
+        assert_that(handler_backend.callbacks, is_not(has_key(hashes[1])))
+        assert_that(handler_backend.callbacks, has_key(hashes[2]))
+
+    def test_shouldNotTryToImportAMissingCallbackAgain(self):
+        workflow_object = BasicTestModelObjectFactory().model
+        Callback.objects.bulk_create([self.callback_row(workflow_object, method='river.tests.missing_module.test_callback')])
+        handler_backend = DatabaseHookingBackend()
+
+        with patch.object(LOGGER, 'warning') as warning:
+            assert_that(handler_backend.get_callbacks(PostTransitionHooking, workflow_object, self.field_name), empty())
+            handler_backend.invalidate()
+            assert_that(handler_backend.get_callbacks(PostTransitionHooking, workflow_object, self.field_name), empty())
+
+        assert_that(warning.call_args_list, has_length(1))
+
+    def test_shouldWriteTheCallbacksRegisteredDuringAppLoadingAtOnce(self):
+        state1 = StateObjectFactory(label="state3")
+        state2 = StateObjectFactory(label="state4")
+        with patch.object(apps, 'ready', False):
+            handler_backend = DatabaseHookingBackend()
+            hashes = [
+                handler_backend.register(PostTransitionHooking, test_callback, None, self.field_name, source_state=state, destination_state=state2)
+                for state in [state1, state2]
+            ]
+
+        assert_that(Callback.objects.all(), empty())
+        assert_that(handler_backend.get_callbacks(PostTransitionHooking, None, self.field_name, source_state=state1, destination_state=state2), has_length(1))
+
+        with CaptureQueriesContext(connection) as queries:
+            handler_backend.flush()
+        assert_that([query['sql'] for query in queries.captured_queries if query['sql'].startswith(('SELECT', 'INSERT', 'UPDATE'))], has_length(2))
+        assert_that(Callback.objects.filter(hash__in=hashes), has_length(2))
+
+    def test_shouldNotWriteTheCallbacksRegisteredDuringAppLoadingWhichAreNotChanged(self):
+        with patch.object(apps, 'ready', False):
+            handler_backend = DatabaseHookingBackend()
+            callback_hash = handler_backend.register(PostTransitionHooking, test_callback, None, self.field_name)
+        handler_backend.flush()
+
+        with patch.object(apps, 'ready', False):
+            handler_backend = DatabaseHookingBackend()
+            handler_backend.register(PostTransitionHooking, test_callback, None, self.field_name)
+        with CaptureQueriesContext(connection) as queries:
+            handler_backend.flush()
+        assert_that([query['sql'] for query in queries.captured_queries if query['sql'].startswith(('INSERT', 'UPDATE'))], empty())
+
+        Callback.objects.filter(hash=callback_hash).update(method='river.tests.missing_module.test_callback')
+        with patch.object(apps, 'ready', False):
+            handler_backend = DatabaseHookingBackend()
+            handler_backend.register(PostTransitionHooking, test_callback, None, self.field_name)
+        handler_backend.flush()
+        assert_that(Callback.objects.get(hash=callback_hash).method, equal_to('%s.%s' % (test_callback.__module__, test_callback.__name__)))
+
+    def test_shouldNotWriteTheCallbacksUnregisteredDuringAppLoading(self):
+        workflow_object = BasicTestModelObjectFactory().model
+        with patch.object(apps, 'ready', False):
+            handler_backend = DatabaseHookingBackend()
+            class_hash = handler_backend.register(PostTransitionHooking, test_callback, None, self.field_name)
+            object_hash = handler_backend.register(PostTransitionHooking, test_callback, workflow_object, self.field_name)
+            handler_backend.unregister(PostTransitionHooking, None, self.field_name)
+            handler_backend.unregister_objects([PostTransitionHooking], [workflow_object.pk], [self.field_name])
+        handler_backend.flush()
+
+        assert_that(Callback.objects.filter(hash__in=[class_hash, object_hash]), empty())
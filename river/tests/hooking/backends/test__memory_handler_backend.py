@@ -1,9 +1,14 @@
+import timeit
+from collections import namedtuple
+from itertools import chain, combinations
+
 from django.contrib.contenttypes.models import ContentType
-from django.test import TestCase
-from hamcrest import assert_that, has_value, is_not, has_key, has_property, has_length, has_item
+from django.test import TestCase, SimpleTestCase
+from hamcrest import assert_that, has_value, is_not, has_key, has_property, has_length, has_item, less_than, equal_to
 
 from river.config import app_config
 from river.hooking.backends.loader import callback_backend
+from river.hooking.backends.memory import MemoryHookingBackend
 from river.hooking.transition import PostTransitionHooking
 from river.models.factories import PermissionObjectFactory, StateObjectFactory, WorkflowFactory, TransitionApprovalMetaFactory
 from river.tests.models import BasicTestModel
@@ -16,6 +21,24 @@ def test_callback(*args, **kwargs):
     pass
 
 
+Instance = namedtuple('Instance', ['pk'])
+
+
+class PowersetHookingBackend(MemoryHookingBackend):
+    """
+    The dispatch which tries the hash of every subset of the given arguments. It is only kept to compare against.
+    """
+
+    def get_callbacks(self, hooking_cls, workflow_object, field_name, *args, **kwargs):
+        callbacks = []
+        for names in chain.from_iterable(combinations(list(kwargs.keys()), n) for n in range(len(kwargs) + 1)):
+            callback_hash = hooking_cls.get_hash(workflow_object, field_name, **{name: kwargs.get(name) for name in names})
+            callback = self.callbacks.get(self.get_hooking_class_prefix(hooking_cls) + callback_hash)
+            if callback:
+                callbacks.append(callback)
+        return callbacks
+
+
 # noinspection DuplicatedCode
 class MemoryHookingBackendTest(TestCase):
     def setUp(self):
@@ -38,6 +61,7 @@ class MemoryHookingBackendTest(TestCase):
         app_config.HOOKING_BACKEND_CLASS = 'river.hooking.backends.memory.MemoryHookingBackend'
         self.handler_backend = callback_backend
         self.handler_backend.callbacks = {}
+        self.handler_backend.dispatch_table = {}
 
     def test_shouldRegisterAHooking(self):
         workflow_objects = BasicTestModelObjectFactory.create_batch(2)
@@ -94,3 +118,49 @@ class MemoryHookingBackendTest(TestCase):
 
         assert_that(self.handler_backend.callbacks, is_not(has_key(hooking_hash)))
         assert_that(self.handler_backend.callbacks, is_not(has_value(has_property("__name__", test_callback.__name__))))
+
+
+class MemoryHookingBackendDispatchBenchmarkTest(SimpleTestCase):
+    SIZES = [10, 100, 1000]
+    NUMBER = 2000
+
+    def build(self, backend_cls, size):
+        backend = backend_cls()
+        states = [Instance(pk=pk) for pk in range(10)]
+        for pk in range(size):
+            workflow_object = Instance(pk=pk)
+            backend.register(PostTransitionHooking, test_callback, workflow_object, "my_field")
+            backend.register(PostTransitionHooking, test_callback, workflow_object, "my_field", source_state=states[pk % 10], destination_state=states[(pk + 1) % 10])
+        backend.register(PostTransitionHooking, test_callback, None, "my_field")
+        return backend
+
+    def dispatch_cost(self, backend, size):
+        workflow_object = Instance(pk=size // 2)
+        kwargs = dict(source_state=Instance(pk=workflow_object.pk % 10), destination_state=Instance(pk=(workflow_object.pk + 1) % 10), transition_approval=Instance(pk=1))
+
+        def dispatch():
+            return backend.get_callbacks(PostTransitionHooking, workflow_object, "my_field", **kwargs) + backend.get_callbacks(PostTransitionHooking, None, "my_field", **kwargs)
+
+        assert_that(dispatch(), has_length(3))
+        return min(timeit.repeat(dispatch, number=self.NUMBER, repeat=3)) / self.NUMBER
+
+    def test_shouldDispatchInConstantTimeRegardlessOfTheNumberOfCallbacks(self):
+        costs = {}
+        for size in self.SIZES:
+            costs[size] = (self.dispatch_cost(self.build(MemoryHookingBackend, size), size), self.dispatch_cost(self.build(PowersetHookingBackend, size), size))
+            print("%5d callbacks: dispatch table %.2fus, powerset %.2fus" % (size * 2 + 1, costs[size][0] * 1e6, costs[size][1] * 1e6))
+
+        for size in self.SIZES:
+            assert_that(costs[size][0], less_than(costs[size][1]))
+        assert_that(costs[self.SIZES[-1]][0], less_than(costs[self.SIZES[0]][0] * 3))
+
+    def test_shouldMatchTheCallbacksOfThePowersetDispatch(self):
+        backend = self.build(MemoryHookingBackend, 20)
+        powerset_backend = self.build(PowersetHookingBackend, 20)
+        for pk in range(20):
+            for source_state in range(10):
+                kwargs = dict(source_state=Instance(pk=source_state), destination_state=Instance(pk=(source_state + 1) % 10))
+                assert_that(
+                    len(backend.get_callbacks(PostTransitionHooking, Instance(pk=pk), "my_field", **kwargs)),
+                    equal_to(len(powerset_backend.get_callbacks(PostTransitionHooking, Instance(pk=pk), "my_field", **kwargs)))
+                )
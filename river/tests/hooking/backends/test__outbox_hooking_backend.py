@@ -0,0 +1,139 @@
+from datetime import timedelta
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command, CommandError
+from django.db import transaction
+from django.test import TestCase
+from django.utils import timezone
+from hamcrest import assert_that, equal_to, has_length, empty, none, contains_string, greater_than, calling, raises
+from mock import patch
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+from river.hooking.backends.outbox import OutboxHookingBackend
+from river.models import OutboxEntry, TransitionApproval
+from river.models.factories import PermissionObjectFactory, UserObjectFactory, StateObjectFactory, WorkflowFactory, TransitionApprovalMetaFactory
+from river.models.fields.objectid import to_object_id
+from river.tests.models import BasicTestModel
+from river.tests.models.factories import BasicTestModelObjectFactory
+
+__author__ = 'ahmetdal'
+
+deliveries = []
+
+
+def recording_callback(workflow_object, field_name, *args, **kwargs):
+    deliveries.append((workflow_object, field_name, kwargs))
+
+
+def failing_callback(workflow_object, field_name, *args, **kwargs):
+    raise ValueError("failed")
+
+
+# noinspection DuplicatedCode
+class OutboxHookingBackendTest(TestCase):
+
+    def setUp(self):
+        del deliveries[:]
+        self.backend = OutboxHookingBackend(max_attempts=2, backoff=10)
+
+        self.authorized_user = UserObjectFactory(user_permissions=[PermissionObjectFactory()])
+        self.state1 = StateObjectFactory(label="state1")
+        self.state2 = StateObjectFactory(label="state2")
+
+        content_type = ContentType.objects.get_for_model(BasicTestModel)
+        workflow = WorkflowFactory(initial_state=self.state1, content_type=content_type, field_name="my_field")
+        TransitionApprovalMetaFactory.create(
+            workflow=workflow,
+            source_state=self.state1,
+            destination_state=self.state2,
+            priority=0,
+            permissions=self.authorized_user.user_permissions.all()
+        )
+        self.workflow_object = BasicTestModelObjectFactory().model
+
+    def approve(self, callback):
+        with patch('river.hooking.hooking.callback_backend', self.backend):
+            self.workflow_object.river.my_field.hook_post_transition(callback)
+            self.workflow_object.river.my_field.approve(as_user=self.authorized_user)
+
+    def test_shouldWriteTheCallbacksToTheOutboxInsteadOfRunningThem(self):
+        self.approve(recording_callback)
+
+        assert_that(deliveries, empty())
+        entry = OutboxEntry.objects.get()
+        assert_that(entry.method, equal_to('%s.%s' % (recording_callback.__module__, recording_callback.__name__)))
+        assert_that(entry.object_id, equal_to(to_object_id(self.workflow_object)))
+        assert_that(entry.field_name, equal_to("my_field"))
+
+    def test_shouldNotWriteTheCallbacksToTheOutboxWhenTheApprovalIsRolledBack(self):
+        try:
+            with transaction.atomic():
+                self.approve(recording_callback)
+                raise RuntimeError()
+        except RuntimeError:
+            pass
+
+        assert_that(OutboxEntry.objects.all(), empty())
+
+    def test_shouldDeliverTheCallbacksInTheOutbox(self):
+        self.approve(recording_callback)
+
+        assert_that(self.backend.drain(), equal_to((1, 0)))
+
+        assert_that(deliveries, has_length(1))
+        workflow_object, field_name, kwargs = deliveries[0]
+        assert_that(workflow_object, equal_to(self.workflow_object))
+        assert_that(field_name, equal_to("my_field"))
+        assert_that(kwargs, equal_to({'transition_approval': TransitionApproval.objects.filter(workflow_object=self.workflow_object).get()}))
+        assert_that(OutboxEntry.objects.all(), empty())
+        assert_that(self.backend.drain(), equal_to((0, 0)))
+
+    def test_shouldRetryTheFailedCallbacksWithABackoffUntilTheyRunOutOfAttempts(self):
+        self.approve(failing_callback)
+
+        assert_that(self.backend.drain(), equal_to((0, 1)))
+        entry = OutboxEntry.objects.get()
+        assert_that(entry.attempts, equal_to(1))
+        assert_that(entry.last_error, contains_string("ValueError: failed"))
+        assert_that(entry.available_at, greater_than(timezone.now() + timedelta(seconds=5)))
+        assert_that(self.backend.drain(), equal_to((0, 0)))
+
+        OutboxEntry.objects.update(available_at=timezone.now())
+        assert_that(self.backend.drain(), equal_to((0, 1)))
+        entry = OutboxEntry.objects.get()
+        assert_that(entry.attempts, equal_to(2))
+        assert_that(entry.available_at, none())
+
+    def test_shouldClaimTheEntriesInBatches(self):
+        self.approve(recording_callback)
+        for _ in range(2):
+            OutboxEntry.objects.create(
+                hooking_cls='river.hooking.transition.PostTransitionHooking',
+                method='%s.%s' % (recording_callback.__module__, recording_callback.__name__),
+                content_type=ContentType.objects.get_for_model(BasicTestModel),
+                object_id=self.workflow_object.pk,
+                field_name="my_field",
+            )
+
+        claimed = OutboxEntry.objects.claim(2, lease=60)
+
+        assert_that(claimed, has_length(2))
+        assert_that(OutboxEntry.objects.claim(2, lease=60), has_length(1))
+        assert_that(OutboxEntry.objects.claim(2, lease=60), empty())
+
+    def test_shouldDrainTheOutboxWithTheCommand(self):
+        self.approve(recording_callback)
+
+        out = StringIO()
+        with patch('river.management.commands.river_drain_outbox.callback_backend', self.backend):
+            call_command('river_drain_outbox', stdout=out)
+
+        assert_that(out.getvalue(), contains_string("1 outbox entries are delivered and 0 are failed."))
+        assert_that(deliveries, has_length(1))
+
+    def test_shouldNotDrainTheOutboxWhenTheBackendIsNotAnOutbox(self):
+        assert_that(calling(call_command).with_args('river_drain_outbox'), raises(CommandError))
@@ -0,0 +1,103 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.test import TransactionTestCase
+from hamcrest import assert_that, equal_to, has_length, empty
+
+from river.hooking.backends.loader import callback_backend
+from river.hooking.completed import CompletedEvent
+from river.hooking.transition import TransitionEvent
+from river.models import TransitionApproval
+from river.models.factories import PermissionObjectFactory, UserObjectFactory, StateObjectFactory, WorkflowFactory, TransitionApprovalMetaFactory
+from river.tests.models import BasicTestModel
+from river.tests.models.factories import BasicTestModelObjectFactory
+
+__author__ = 'ahmetdal'
+
+
+# noinspection DuplicatedCode
+class BatchHookingTest(TransactionTestCase):
+
+    def setUp(self):
+        callback_backend.callbacks = {}
+        callback_backend.dispatch_table = {}
+        self.batches = []
+
+        self.authorized_user = UserObjectFactory(user_permissions=[PermissionObjectFactory()])
+        self.state1 = StateObjectFactory(label="state1")
+        self.state2 = StateObjectFactory(label="state2")
+
+        content_type = ContentType.objects.get_for_model(BasicTestModel)
+        workflow = WorkflowFactory(initial_state=self.state1, content_type=content_type, field_name="my_field")
+        TransitionApprovalMetaFactory.create(
+            workflow=workflow,
+            source_state=self.state1,
+            destination_state=self.state2,
+            priority=0,
+            permissions=self.authorized_user.user_permissions.all()
+        )
+        self.workflow_objects = list(BasicTestModelObjectFactory.create_batch(3))
+
+    def tearDown(self):
+        callback_backend.callbacks = {}
+        callback_backend.dispatch_table = {}
+
+    def batch_callback(self, events):
+        self.batches.append(events)
+
+    def approve_all(self):
+        for workflow_object in self.workflow_objects:
+            workflow_object.river.my_field.approve(as_user=self.authorized_user)
+
+    def test_shouldDeliverTheTransitionsOfATransactionInOneCallOnceItIsCommitted(self):
+        BasicTestModel.river.my_field.hook_post_transition_batch(self.batch_callback)
+
+        with transaction.atomic():
+            self.approve_all()
+            assert_that(self.batches, empty())
+
+        assert_that(self.batches, has_length(1))
+        assert_that(self.batches[0], equal_to([
+            TransitionEvent(workflow_object, "my_field", self.state1, self.state2, TransitionApproval.objects.filter(workflow_object=workflow_object).get())
+            for workflow_object in self.workflow_objects
+        ]))
+
+    def test_shouldNotDeliverTheTransitionsOfATransactionWhichIsRolledBack(self):
+        BasicTestModel.river.my_field.hook_post_transition_batch(self.batch_callback)
+
+        try:
+            with transaction.atomic():
+                self.approve_all()
+                raise RuntimeError()
+        except RuntimeError:
+            pass
+
+        assert_that(self.batches, empty())
+
+        with transaction.atomic():
+            self.workflow_objects[0].river.my_field.approve(as_user=self.authorized_user)
+        assert_that(self.batches, has_length(1))
+        assert_that([event.workflow_object for event in self.batches[0]], equal_to([self.workflow_objects[0]]))
+
+    def test_shouldDeliverTheTransitionsOfEveryTransactionSeparately(self):
+        BasicTestModel.river.my_field.hook_post_transition_batch(self.batch_callback)
+
+        self.approve_all()
+
+        assert_that(self.batches, has_length(3))
+        assert_that([len(events) for events in self.batches], equal_to([1, 1, 1]))
+
+    def test_shouldOnlyDeliverTheTransitionsMatchingTheCriteria(self):
+        BasicTestModel.river.my_field.hook_post_transition_batch(self.batch_callback, source_state=self.state2)
+
+        with transaction.atomic():
+            self.approve_all()
+
+        assert_that(self.batches, empty())
+
+    def test_shouldDeliverTheCompletionsOfATransactionInOneCall(self):
+        BasicTestModel.river.my_field.hook_post_complete_batch(self.batch_callback)
+
+        with transaction.atomic():
+            self.approve_all()
+
+        assert_that(self.batches, equal_to([[CompletedEvent(workflow_object, "my_field") for workflow_object in self.workflow_objects]]))
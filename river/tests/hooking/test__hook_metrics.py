@@ -0,0 +1,125 @@
+import pickle
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.test import TestCase
+from hamcrest import assert_that, equal_to, has_length, has_entries, same_instance, contains_string, has_item, calling, raises, instance_of
+from mock import patch
+
+from river.config import app_config
+from river.hooking.backends.loader import callback_backend
+from river.hooking.metrics import hook_metrics, MeasuredCallback, LOGGER, HookMetrics
+from river.hooking.transition import PostTransitionHooking
+from river.models.factories import PermissionObjectFactory, UserObjectFactory, StateObjectFactory, WorkflowFactory, TransitionApprovalMetaFactory
+from river.tests.models import BasicTestModel
+from river.tests.models.factories import BasicTestModelObjectFactory
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+__author__ = 'ahmetdal'
+
+
+def recording_callback(*args, **kwargs):
+    pass
+
+
+def failing_callback(*args, **kwargs):
+    raise ValueError("failed")
+
+
+# noinspection DuplicatedCode
+class HookMetricsTest(TestCase):
+
+    def setUp(self):
+        callback_backend.callbacks = {}
+        callback_backend.dispatch_table = {}
+        hook_metrics.reset()
+        app_config.HOOK_METRICS_ENABLED = True
+
+        self.authorized_user = UserObjectFactory(user_permissions=[PermissionObjectFactory()])
+        state1 = StateObjectFactory(label="state1")
+        state2 = StateObjectFactory(label="state2")
+
+        content_type = ContentType.objects.get_for_model(BasicTestModel)
+        workflow = WorkflowFactory(initial_state=state1, content_type=content_type, field_name="my_field")
+        TransitionApprovalMetaFactory.create(
+            workflow=workflow,
+            source_state=state1,
+            destination_state=state2,
+            priority=0,
+            permissions=self.authorized_user.user_permissions.all()
+        )
+        self.workflow_object = BasicTestModelObjectFactory().model
+
+    def tearDown(self):
+        app_config.HOOK_METRICS_ENABLED = False
+        app_config.SLOW_HOOK_THRESHOLD = None
+        hook_metrics.reset()
+        callback_backend.callbacks = {}
+        callback_backend.dispatch_table = {}
+
+    def test_shouldNotMeasureTheCallbacksWhenItIsDisabled(self):
+        app_config.HOOK_METRICS_ENABLED = False
+
+        assert_that(hook_metrics.measure(PostTransitionHooking, recording_callback), same_instance(recording_callback))
+
+    def test_shouldRecordTheMetricsOfTheCallbacks(self):
+        self.workflow_object.river.my_field.hook_post_transition(recording_callback)
+        self.workflow_object.river.my_field.approve(as_user=self.authorized_user)
+
+        stats = hook_metrics.stats()
+        assert_that(stats, has_length(1))
+        assert_that(stats[0], has_entries(
+            hooking_cls='river.hooking.transition.PostTransitionHooking',
+            callback='%s.recording_callback' % __name__,
+            count=1,
+            errors=0,
+        ))
+
+    def test_shouldRecordTheErrorsOfTheCallbacks(self):
+        self.workflow_object.river.my_field.hook_post_transition(failing_callback)
+
+        assert_that(calling(self.workflow_object.river.my_field.approve).with_args(as_user=self.authorized_user), raises(ValueError))
+        assert_that(hook_metrics.stats()[0], has_entries(callback='%s.failing_callback' % __name__, count=1, errors=1))
+
+    def test_shouldLogTheSlowCallbacksWithTheirArguments(self):
+        app_config.HOOK_METRICS_ENABLED = False
+        app_config.SLOW_HOOK_THRESHOLD = 0
+        self.workflow_object.river.my_field.hook_post_transition(recording_callback)
+
+        with patch.object(LOGGER, 'warning') as warning:
+            self.workflow_object.river.my_field.approve(as_user=self.authorized_user)
+
+        logs = [call[0][0] for call in warning.call_args_list]
+        assert_that(logs, has_item(contains_string("Callback '%s.recording_callback' of hooking 'river.hooking.transition.PostTransitionHooking'" % __name__)))
+        assert_that(logs, has_item(contains_string("transition_approval")))
+        assert_that(hook_metrics.stats(), has_length(0))
+
+    def test_shouldReportTheMetricsOfAllTheProcesses(self):
+        processes = [HookMetrics() for _ in range(3)]
+        for process in processes:
+            process.record('river.hooking.transition.PostTransitionHooking', '%s.recording_callback' % __name__, 0.1, False)
+            process.publish()
+
+        assert_that(len(set(process._slot for process in processes)), equal_to(3))  # pylint: disable=protected-access
+        assert_that(hook_metrics.stats()[0], has_entries(callback='%s.recording_callback' % __name__, count=3))
+
+    def test_shouldPickleTheMeasuredCallbacks(self):
+        measured_callback = pickle.loads(pickle.dumps(hook_metrics.measure(PostTransitionHooking, recording_callback)))
+
+        assert_that(measured_callback, instance_of(MeasuredCallback))
+        assert_that(measured_callback.callback, same_instance(recording_callback))
+        assert_that(measured_callback.metrics, same_instance(hook_metrics))
+
+    def test_shouldReportTheMetricsWithTheCommand(self):
+        self.workflow_object.river.my_field.hook_post_transition(recording_callback)
+        self.workflow_object.river.my_field.approve(as_user=self.authorized_user)
+
+        out = StringIO()
+        call_command('river_hook_stats', '--reset', stdout=out)
+
+        assert_that(out.getvalue(), contains_string("%s.recording_callback (river.hooking.transition.PostTransitionHooking): count=1" % __name__))
+        assert_that(hook_metrics.stats(), equal_to([]))
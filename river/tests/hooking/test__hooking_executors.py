@@ -0,0 +1,128 @@
+import time
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.test import TransactionTestCase, SimpleTestCase
+from hamcrest import assert_that, equal_to, has_item, contains_string
+from mock import patch
+
+from river.hooking import executors
+from river.hooking.executors import OnCommitHookingExecutor, LOGGER
+from river.models.factories import PermissionObjectFactory, UserObjectFactory, StateObjectFactory, WorkflowFactory, TransitionApprovalMetaFactory
+from river.tests.models import BasicTestModel
+from river.tests.models.factories import BasicTestModelObjectFactory
+
+__author__ = 'ahmetdal'
+
+
+# noinspection DuplicatedCode
+class OnCommitHookingExecutorTest(TransactionTestCase):
+
+    def setUp(self):
+        self.executor = OnCommitHookingExecutor(max_workers=1)
+        self.calls = []
+
+        self.authorized_user = UserObjectFactory(user_permissions=[PermissionObjectFactory()])
+        self.state1 = StateObjectFactory(label="state1")
+        self.state2 = StateObjectFactory(label="state2")
+
+        content_type = ContentType.objects.get_for_model(BasicTestModel)
+        workflow = WorkflowFactory(initial_state=self.state1, content_type=content_type, field_name="my_field")
+        TransitionApprovalMetaFactory.create(
+            workflow=workflow,
+            source_state=self.state1,
+            destination_state=self.state2,
+            priority=0,
+            permissions=self.authorized_user.user_permissions.all()
+        )
+        self.workflow_object = BasicTestModelObjectFactory().model
+
+        def pre_transition(*args, **kwargs):
+            self.calls.append('pre_transition')
+
+        def post_transition(*args, **kwargs):
+            self.calls.append('post_transition')
+
+        self.workflow_object.river.my_field.hook_pre_transition(pre_transition)
+        self.workflow_object.river.my_field.hook_post_transition(post_transition)
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def test_shouldRunThePostTransitionCallbacksOnceTheTransactionIsCommitted(self):
+        with patch('river.hooking.hooking.hooking_executor', self.executor):
+            with transaction.atomic():
+                self.workflow_object.river.my_field.approve(as_user=self.authorized_user)
+                assert_that(self.calls, equal_to(['pre_transition']))
+        self.executor.shutdown()
+
+        assert_that(self.calls, equal_to(['pre_transition', 'post_transition']))
+        assert_that(BasicTestModel.objects.get(pk=self.workflow_object.pk).my_field, equal_to(self.state2))
+
+    def test_shouldNotRunThePostTransitionCallbacksWhenTheTransactionIsRolledBack(self):
+        with patch('river.hooking.hooking.hooking_executor', self.executor):
+            try:
+                with transaction.atomic():
+                    self.workflow_object.river.my_field.approve(as_user=self.authorized_user)
+                    raise RuntimeError()
+            except RuntimeError:
+                pass
+        self.executor.shutdown()
+
+        assert_that(self.calls, equal_to(['pre_transition']))
+        assert_that(BasicTestModel.objects.get(pk=self.workflow_object.pk).my_field, equal_to(self.state1))
+
+
+def slow_callback(*args, **kwargs):
+    time.sleep(0.5)
+
+
+def failing_callback(*args, **kwargs):
+    raise ValueError("failed")
+
+
+class OnCommitHookingExecutorTimeoutTest(SimpleTestCase):
+
+    def test_shouldLogAndCancelTheCallbacksWhichTimeOut(self):
+        executor = OnCommitHookingExecutor(max_workers=1, timeout=0.1)
+        with patch.object(LOGGER, 'warning') as warning:
+            running = executor.submit(slow_callback)
+            waiting = executor.submit(slow_callback)
+            running.result()
+            executor.shutdown()
+
+        logs = [call[0][0] for call in warning.call_args_list]
+        assert_that(waiting.cancelled(), equal_to(True))
+        assert_that(logs, has_item(contains_string("couldn't be finished in 0.1 seconds")))
+        assert_that(logs, has_item(contains_string("couldn't be started in 0.1 seconds")))
+
+    def test_shouldLogTheCallbacksWhichFail(self):
+        executor = OnCommitHookingExecutor(max_workers=1)
+        with patch.object(LOGGER, 'error') as error:
+            executor.submit(failing_callback)
+            executor.shutdown()
+
+        assert_that([call[0][0] for call in error.call_args_list], has_item(contains_string("failing_callback' has failed")))
+
+    def test_shouldRunTheCallbacksOnAProcessPool(self):
+        executor = OnCommitHookingExecutor(pool='process', max_workers=1)
+        try:
+            assert_that(executor.submit(time.sleep, 0).result(), equal_to(None))
+        finally:
+            executor.shutdown()
+        assert_that(executor._pool, equal_to(None))  # pylint: disable=protected-access
+
+    def test_shouldCloseTheDatabaseConnectionsOfTheWorkersAroundTheCallbacks(self):
+        executor = OnCommitHookingExecutor(max_workers=1)
+        with patch('river.hooking.executors.close_old_connections') as close_old_connections:
+            try:
+                executor.submit(time.sleep, 0).result()
+            finally:
+                executor.shutdown()
+        assert_that(close_old_connections.call_count, equal_to(2))
+
+    def test_shouldCloseTheInheritedDatabaseConnectionsOnlyOnceInAWorkerProcess(self):
+        with patch.object(executors, '_worker_pid', None), patch('river.hooking.executors.connections') as connections:
+            executors.close_inherited_connections()
+            executors.close_inherited_connections()
+        assert_that(connections.close_all.call_count, equal_to(1))
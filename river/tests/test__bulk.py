@@ -0,0 +1,36 @@
+from django.db.models.signals import post_delete
+from django.test import TestCase
+from hamcrest import assert_that, equal_to, empty, has_length
+
+from river.models.callback import Callback
+from river.utils.bulk import raw_delete
+
+__author__ = 'ahmetdal'
+
+
+class RawDeleteTest(TestCase):
+
+    def setUp(self):
+        Callback.objects.bulk_create([
+            Callback(hash='hash%s' % index, method='method', hooking_cls='hooking_cls', object_id=str(index), field_name='my_field')
+            for index in range(3)
+        ])
+
+    def test_shouldDeleteTheRowsOfTheQuerysetWithoutTheSignals(self):
+        deleted = []
+
+        def receiver(*args, **kwargs):
+            deleted.append(kwargs['instance'])
+
+        post_delete.connect(receiver, sender=Callback)
+        try:
+            assert_that(raw_delete(Callback.objects.filter(object_id__in=['0', '1'])), equal_to(2))
+        finally:
+            post_delete.disconnect(receiver, sender=Callback)
+
+        assert_that(deleted, empty())
+        assert_that(Callback.objects.all(), has_length(1))
+
+    def test_shouldReturnZeroWhenNothingIsDeleted(self):
+        assert_that(raw_delete(Callback.objects.filter(object_id='3')), equal_to(0))
+        assert_that(Callback.objects.all(), has_length(3))
@@ -0,0 +1,121 @@
+import importlib
+import uuid
+
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.db.models import F
+from django.db.models.functions import Cast
+from django.test import TestCase
+from hamcrest import assert_that, equal_to, instance_of, has_item, has_length, contains_string, is_not, calling, raises
+from mock import patch, MagicMock
+
+from river.config import app_config
+from river.models import TransitionApproval
+from river.models.factories import PermissionObjectFactory, UserObjectFactory, StateObjectFactory, TransitionApprovalMetaFactory, WorkflowFactory
+from river.models.fields.objectid import to_object_id, object_id_expression
+from river.tests.models import BasicTestModel
+from river.tests.models.factories import BasicTestModelObjectFactory
+
+__author__ = 'ahmetdal'
+
+UUID = uuid.UUID('1b4e28ba-2fa1-11d2-883f-0016d3cca427')
+
+normalize_object_ids = importlib.import_module('river.migrations.0003_typed_object_id').normalize_object_ids
+
+
+# noinspection PyMethodMayBeStatic,DuplicatedCode
+class ObjectIdTest(TestCase):
+
+    def setUp(self):
+        self.authorized_permission = PermissionObjectFactory()
+        self.authorized_user = UserObjectFactory(user_permissions=[self.authorized_permission])
+
+        state1 = StateObjectFactory(label="state1")
+        state2 = StateObjectFactory(label="state2")
+
+        workflow = WorkflowFactory(initial_state=state1, content_type=ContentType.objects.get_for_model(BasicTestModel), field_name="my_field")
+        TransitionApprovalMetaFactory.create(
+            workflow=workflow,
+            source_state=state1,
+            destination_state=state2,
+            priority=0,
+            permissions=[self.authorized_permission]
+        )
+
+    def normalize(self, has_native_uuid_field=False):
+        schema_editor = MagicMock()
+        schema_editor.connection.alias = connection.alias
+        schema_editor.connection.features.has_native_uuid_field = has_native_uuid_field
+        normalize_object_ids(apps, schema_editor)
+
+    def test_shouldKeepTheObjectIdsAsCharByDefault(self):
+        workflow_object = BasicTestModelObjectFactory().model
+
+        assert_that(app_config.OBJECT_ID_TYPE, equal_to('char'))
+        assert_that(to_object_id(workflow_object), equal_to(str(workflow_object.pk)))
+
+    @patch.object(app_config, 'OBJECT_ID_TYPE', 'char')
+    def test_shouldConvertTheObjectIdsToCharInCharMode(self):
+        workflow_object = BasicTestModelObjectFactory().model
+
+        assert_that(to_object_id(workflow_object), equal_to(str(workflow_object.pk)))
+        assert_that(to_object_id(workflow_object.pk), equal_to(str(workflow_object.pk)))
+        assert_that(object_id_expression(), instance_of(Cast))
+
+    @patch.object(app_config, 'OBJECT_ID_TYPE', 'uuid')
+    def test_shouldConvertTheObjectIdsToUUIDInUUIDMode(self):
+        assert_that(to_object_id(str(UUID)), equal_to(UUID))
+        assert_that(to_object_id(UUID.hex), equal_to(UUID))
+        assert_that(to_object_id(UUID), equal_to(UUID))
+        assert_that(object_id_expression(), instance_of(F))
+
+    @patch.object(app_config, 'OBJECT_ID_TYPE', 'char')
+    def test_shouldJoinTheApprovalsWithTheWorkflowObjectsInCharMode(self):
+        workflow_object = BasicTestModelObjectFactory().model
+
+        available_approvals = BasicTestModel.river.my_field.get_available_approvals(as_user=self.authorized_user)
+
+        assert_that(str(available_approvals.query), contains_string('CAST('))
+        assert_that(available_approvals, has_length(1))
+        assert_that(BasicTestModel.river.my_field.get_on_approval_objects(as_user=self.authorized_user), has_item(workflow_object))
+
+    @patch.object(app_config, 'OBJECT_ID_TYPE', 'uuid')
+    def test_shouldJoinTheApprovalsWithTheWorkflowObjectsWithoutACastInUUIDMode(self):
+        available_approvals = BasicTestModel.river.my_field.get_available_approvals(as_user=self.authorized_user)
+
+        assert_that(str(available_approvals.query), contains_string('"river_object_id"'))
+        assert_that(str(available_approvals.query), is_not(contains_string('CAST(')))
+
+    @patch.object(app_config, 'OBJECT_ID_TYPE', 'char')
+    def test_shouldNotNormalizeTheObjectIdsInCharMode(self):
+        BasicTestModelObjectFactory()
+        TransitionApproval.objects.update(object_id='not-a-number')
+
+        self.normalize()
+
+        assert_that(list(TransitionApproval.objects.values_list('object_id', flat=True)), equal_to(['not-a-number']))
+
+    def test_shouldNormalizeTheUUIDObjectIdsWhenTheDatabaseHasNoNativeUUIDType(self):
+        BasicTestModelObjectFactory()
+        TransitionApproval.objects.update(object_id=str(UUID))
+
+        with patch.object(app_config, 'OBJECT_ID_TYPE', 'uuid'):
+            self.normalize(has_native_uuid_field=True)
+            assert_that(list(TransitionApproval.objects.values_list('object_id', flat=True)), equal_to([str(UUID)]))
+
+            self.normalize(has_native_uuid_field=False)
+            assert_that(list(TransitionApproval.objects.values_list('object_id', flat=True)), equal_to([UUID.hex]))
+
+    def test_shouldFailToMigrateTheObjectIdsWhichAreNotUUIDsInUUIDMode(self):
+        BasicTestModelObjectFactory()
+
+        with patch.object(app_config, 'OBJECT_ID_TYPE', 'uuid'):
+            assert_that(calling(self.normalize), raises(ValueError, "is not a valid uuid"))
+
+    def test_shouldFailToMigrateTheObjectIdsWhichAreNotIntegersInIntegerMode(self):
+        BasicTestModelObjectFactory()
+        TransitionApproval.objects.update(object_id='not-a-number')
+
+        with patch.object(app_config, 'OBJECT_ID_TYPE', 'integer'):
+            assert_that(calling(self.normalize), raises(ValueError, "is not a valid integer"))
@@ -0,0 +1,77 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from hamcrest import assert_that, empty, has_length, has_entries
+
+from river.hooking.backends.loader import callback_backend
+from river.models import TransitionApproval
+from river.models.factories import StateObjectFactory, TransitionApprovalMetaFactory, WorkflowFactory
+from river.signals import ApproveSignal, TransitionSignal, OnCompleteSignal, pre_approve, post_transition
+from river.tests.models import BasicTestModel
+from river.tests.models.factories import BasicTestModelObjectFactory
+
+__author__ = 'ahmetdal'
+
+
+# noinspection PyMethodMayBeStatic,DuplicatedCode
+class SignalsTest(TestCase):
+
+    def setUp(self):
+        self.reset_callback_backend()
+        self.content_type = ContentType.objects.get_for_model(BasicTestModel)
+        self.state1 = StateObjectFactory(label="state1")
+        self.state2 = StateObjectFactory(label="state2")
+        workflow = WorkflowFactory(initial_state=self.state1, content_type=self.content_type, field_name="my_field")
+        TransitionApprovalMetaFactory.create(workflow=workflow, source_state=self.state1, destination_state=self.state2, priority=0)
+
+        self.workflow_object = BasicTestModelObjectFactory().model
+
+    def tearDown(self):
+        self.reset_callback_backend()
+
+    def reset_callback_backend(self):
+        callback_backend.callbacks = {}
+        callback_backend.dispatch_table = {}
+        if hasattr(callback_backend, '_lookups'):
+            callback_backend._lookups.clear()  # pylint: disable=protected-access
+
+    def fire_signals(self):
+        workflow_object = BasicTestModel.objects.get(pk=self.workflow_object.pk)
+        approval = TransitionApproval.objects.filter(workflow_object=workflow_object).get()
+        with CaptureQueriesContext(connection) as queries:
+            with ApproveSignal(workflow_object, "my_field", approval), TransitionSignal(True, workflow_object, "my_field", approval), \
+                    OnCompleteSignal(workflow_object, "my_field"):
+                pass
+        return [query for query in queries.captured_queries if 'river_callback' not in query['sql']]
+
+    def test_shouldNotComputeThePayloadWhenNobodyIsListening(self):
+        assert_that(self.fire_signals(), empty())
+
+    def test_shouldComputeThePayloadWhenThereIsAReceiver(self):
+        received = []
+
+        def receiver(*args, **kwargs):
+            received.append(kwargs)
+
+        pre_approve.connect(receiver)
+        post_transition.connect(receiver)
+        try:
+            assert_that(self.fire_signals(), has_length(2))
+        finally:
+            pre_approve.disconnect(receiver)
+            post_transition.disconnect(receiver)
+
+        assert_that(received, has_length(2))
+        assert_that(received[1], has_entries(source_state=self.state1, destination_state=self.state2))
+
+    def test_shouldComputeThePayloadWhenAHookingHasACallback(self):
+        received = []
+
+        def callback(*args, **kwargs):
+            received.append(kwargs)
+
+        BasicTestModel.river.my_field.hook_post_transition(callback)
+
+        assert_that(self.fire_signals(), has_length(2))
+        assert_that(received, has_length(1))
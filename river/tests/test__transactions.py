@@ -0,0 +1,31 @@
+from django.db import transaction
+from django.test import TransactionTestCase
+from hamcrest import assert_that, equal_to
+
+from river.utils.transactions import is_pending_on_commit
+
+__author__ = 'ahmetdal'
+
+
+def callback():
+    pass
+
+
+class IsPendingOnCommitTest(TransactionTestCase):
+
+    def test_shouldBePendingUntilTheTransactionIsCommitted(self):
+        with transaction.atomic():
+            assert_that(is_pending_on_commit(callback), equal_to(False))
+            transaction.on_commit(callback)
+            assert_that(is_pending_on_commit(callback), equal_to(True))
+        assert_that(is_pending_on_commit(callback), equal_to(False))
+
+    def test_shouldNotBePendingOnceTheTransactionIsRolledBack(self):
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    transaction.on_commit(callback)
+                    raise RuntimeError()
+            except RuntimeError:
+                pass
+            assert_that(is_pending_on_commit(callback), equal_to(False))
@@ -0,0 +1,132 @@
+import os
+import tempfile
+
+from django.contrib.contenttypes.models import ContentType
+from django.core import serializers
+from django.core.management import call_command, CommandError
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils.six import StringIO
+from hamcrest import assert_that, equal_to, has_length, less_than, calling, raises
+from mock import patch
+
+from river.core.workflowgraph import workflow_graph_registry
+from river.models import State, TransitionApprovalMeta, Workflow, TransitionApproval
+from river.models.factories import StateObjectFactory, PermissionObjectFactory, GroupObjectFactory
+from river.tests.models import BasicTestModel
+from river.tests.models.factories import BasicTestModelObjectFactory
+
+__author__ = 'ahmetdal'
+
+
+# noinspection DuplicatedCode
+class WorkflowDefinitionTest(TestCase):
+
+    def test_shouldImportTheWorkflowDefinition(self):
+        permission = PermissionObjectFactory()
+        group = GroupObjectFactory()
+        closed = StateObjectFactory(label="Closed")
+
+        workflow = Workflow.objects.import_definition(
+            BasicTestModel, "my_field", "open",
+            states=["Open", {"label": "In Progress", "description": "Someone is on it"}, "Resolved"],
+            transitions=[
+                {"source_state": "open", "destination_state": "in-progress", "permissions": [permission]},
+                {"source_state": "in-progress", "destination_state": "resolved", "groups": [group]},
+                {"source_state": "in-progress", "destination_state": "resolved", "priority": 1},
+                {"source_state": "resolved", "destination_state": "in-progress"},
+                {"source_state": "resolved", "destination_state": closed},
+            ]
+        )
+
+        assert_that(workflow.content_type, equal_to(ContentType.objects.get_for_model(BasicTestModel)))
+        assert_that(workflow.initial_state.slug, equal_to("open"))
+        assert_that(State.objects.get(slug="in-progress").description, equal_to("Someone is on it"))
+        assert_that(State.objects.filter(slug="closed"), has_length(1))
+
+        metas = {(meta.source_state.slug, meta.destination_state.slug, meta.priority): meta for meta in TransitionApprovalMeta.objects.filter(workflow=workflow)}
+        assert_that(metas, has_length(5))
+        assert_that(list(metas[("open", "in-progress", 0)].permissions.all()), equal_to([permission]))
+        assert_that(list(metas[("in-progress", "resolved", 0)].groups.all()), equal_to([group]))
+
+        parents = {meta.pk: set(meta.parents.values_list('pk', flat=True)) for meta in metas.values()}
+        assert_that(parents[metas[("open", "in-progress", 0)].pk], equal_to(set()))
+        assert_that(parents[metas[("in-progress", "resolved", 0)].pk], equal_to({metas[("open", "in-progress", 0)].pk, metas[("resolved", "in-progress", 0)].pk}))
+        assert_that(parents[metas[("in-progress", "resolved", 1)].pk], equal_to({metas[("open", "in-progress", 0)].pk, metas[("resolved", "in-progress", 0)].pk}))
+        assert_that(parents[metas[("resolved", "in-progress", 0)].pk], equal_to({metas[("in-progress", "resolved", 0)].pk, metas[("in-progress", "resolved", 1)].pk}))
+        assert_that(parents[metas[("resolved", "closed", 0)].pk], equal_to({metas[("in-progress", "resolved", 0)].pk, metas[("in-progress", "resolved", 1)].pk}))
+
+    def test_shouldImportTheWorkflowDefinitionWithAFixedNumberOfQueries(self):
+        states = ["state%s" % index for index in range(100)]
+        with CaptureQueriesContext(connection) as queries:
+            Workflow.objects.import_definition(
+                BasicTestModel, "my_field", states[0],
+                states=states,
+                transitions=[{"source_state": source, "destination_state": destination} for source, destination in zip(states, states[1:])]
+            )
+        assert_that(len(queries.captured_queries), less_than(15))
+        assert_that(TransitionApprovalMeta.objects.filter(parents__isnull=False), has_length(98))
+
+    def test_shouldInitializeTheApprovalsOfTheImportedWorkflow(self):
+        Workflow.objects.import_definition(
+            BasicTestModel, "my_field", "state1",
+            states=["state1", "state2", "state3"],
+            transitions=[{"source_state": "state1", "destination_state": "state2"}, {"source_state": "state2", "destination_state": "state3"}]
+        )
+        workflow_graph_registry.invalidate()
+
+        workflow_object = BasicTestModelObjectFactory().model
+
+        assert_that(workflow_object.my_field.slug, equal_to("state1"))
+        assert_that(TransitionApproval.objects.filter(workflow_object=workflow_object), has_length(2))
+
+    def test_shouldNotImportATransitionOfAStateWhichDoesNotExist(self):
+        assert_that(
+            calling(Workflow.objects.import_definition).with_args(
+                BasicTestModel, "my_field", "state1", states=["state1"], transitions=[{"source_state": "state1", "destination_state": "state2"}]
+            ),
+            raises(State.DoesNotExist)
+        )
+        assert_that(Workflow.objects.all(), has_length(0))
+
+    def test_shouldRebuildTheParentsOfAWorkflow(self):
+        workflow = Workflow.objects.import_definition(
+            BasicTestModel, "my_field", "state1",
+            states=["state1", "state2", "state3"],
+            transitions=[{"source_state": "state1", "destination_state": "state2"}, {"source_state": "state2", "destination_state": "state3"}]
+        )
+        TransitionApprovalMeta.parents.through.objects.all().delete()
+
+        call_command('river_rebuild_meta_graph', 'tests.BasicTestModel.my_field', stdout=StringIO())
+
+        child = TransitionApprovalMeta.objects.get(workflow=workflow, source_state__slug="state2")
+        assert_that(list(child.parents.values_list('source_state__slug', flat=True)), equal_to(["state1"]))
+        assert_that(calling(call_command).with_args('river_rebuild_meta_graph', 'tests.BasicTestModel.other_field', stdout=StringIO()), raises(CommandError))
+
+
+# noinspection DuplicatedCode
+class WorkflowFixtureTest(TransactionTestCase):
+
+    def test_shouldRebuildTheParentsOnceWhenTheFixtureIsLoaded(self):
+        workflow = Workflow.objects.import_definition(
+            BasicTestModel, "my_field", "Open",
+            states=["Open", "In Progress", "Resolved"],
+            transitions=[{"source_state": "open", "destination_state": "in-progress"}, {"source_state": "in-progress", "destination_state": "resolved"}]
+        )
+        metas = list(TransitionApprovalMeta.objects.filter(workflow=workflow))
+        fixture = serializers.serialize('json', list(State.objects.all()) + [workflow] + metas, fields=['slug', 'label', 'content_type', 'field_name', 'initial_state', 'workflow', 'source_state', 'destination_state', 'priority'])
+        State.objects.all().delete()
+
+        path = os.path.join(tempfile.mkdtemp(), 'workflow.json')
+        with open(path, 'w') as fixture_file:
+            fixture_file.write(fixture.replace('"in-progress"', '"In Progress"'))
+
+        with CaptureQueriesContext(connection) as queries, patch.object(workflow_graph_registry, 'on_definition_changed') as on_definition_changed:
+            call_command('loaddata', path, verbosity=0)
+        assert_that([query['sql'] for query in queries.captured_queries if 'river_transitionapprovalmeta_parents' in query['sql']], has_length(2))
+        assert_that(on_definition_changed.call_count, equal_to(1))
+
+        assert_that(State.objects.filter(slug="In Progress"), has_length(1))
+        child = TransitionApprovalMeta.objects.get(workflow=workflow, source_state__slug="In Progress")
+        assert_that(list(child.parents.values_list('source_state__slug', flat=True)), equal_to(["open"]))
@@ -0,0 +1,45 @@
+from django.db.models import QuerySet
+
+__author__ = 'ahmetdal'
+
+
+def batches(workflow_objects, batch_size):
+    """
+    Yields the primary keys of the given workflow objects in chunks. Querysets are paginated by primary key
+    so that they are never loaded into the memory at once.
+    """
+    if isinstance(workflow_objects, QuerySet):
+        pks = workflow_objects.order_by('pk').values_list('pk', flat=True)
+        last_pk = None
+        while True:
+            batch = list((pks if last_pk is None else pks.filter(pk__gt=last_pk))[:batch_size])
+            if not batch:
+                return
+            yield batch
+            last_pk = batch[-1]
+    else:
+        pks = [getattr(workflow_object, 'pk', workflow_object) for workflow_object in workflow_objects]
+        for start in range(0, len(pks), batch_size):
+            yield pks[start:start + batch_size]
+
+
+def bulk_add(many_to_many, pairs, using=None):
+    """
+    Inserts (source id, target id) pairs into the through table of the given many to many descriptor with a single query.
+    """
+    field = many_to_many.field
+    source, target = field.m2m_field_name() + '_id', field.m2m_reverse_field_name() + '_id'
+    many_to_many.through.objects.using(using).bulk_create([many_to_many.through(**{source: source_id, target: target_id}) for source_id, target_id in pairs])
+
+
+def raw_delete(queryset):
+    """
+    Deletes the rows of the given queryset with a single query and returns how many of them are deleted. Neither the
+    delete signals are sent nor the related objects are collected, so it is only for the models that nothing refers
+    to. It uses ``QuerySet._raw_delete`` which is there as it is from Django 1.9 on, and falls back to a regular
+    delete otherwise.
+    """
+    delete = getattr(queryset, '_raw_delete', None)
+    if delete is None:
+        return queryset.delete()[0]
+    return delete(queryset.db)
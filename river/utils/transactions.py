@@ -0,0 +1,16 @@
+from django.db import transaction
+
+__author__ = 'ahmetdal'
+
+
+def is_pending_on_commit(callback, using=None):
+    """
+    Tells whether the given callback is registered with ``transaction.on_commit`` and still waits for the transaction
+    to be committed. The callbacks of a rolled back transaction are dropped without being called, so this is the only
+    way to tell that they will never be. It reads the ``run_on_commit`` list of the connection whose entries start
+    with the savepoint ids and the callback from Django 1.9 on.
+    """
+    if callback is None:
+        return False
+    connection = transaction.get_connection(using)
+    return connection.in_atomic_block and any(entry[1] is callback for entry in getattr(connection, 'run_on_commit', ()))
@@ -27,7 +27,8 @@ setup(
         "mock",
         "factory-boy",
         "django-mptt",
-        "django_cte"
+        "django_cte",
+        "contextlib2; python_version < '3'"
     ],
     include_package_data=True,
     zip_safe=False,